@@ -0,0 +1,58 @@
+import asyncio
+import logging
+
+log = logging.getLogger("ferb.async_feed")
+
+
+class AsyncFeed:
+    """
+    Lee un sensor bloqueante en el executor a un periodo fijo y comparte el último valor
+    entre todos los suscriptores async. Sin importar cuántos clientes SSE haya, solo hay
+    una lectura en curso por sensor y ningún cliente ocupa un hilo mientras espera.
+    """
+
+    def __init__(self, read_fn, period):
+        self.read_fn = read_fn
+        self.period = period
+        self.value = None
+        self.version = 0
+        self.subscribers = 0
+        self._cond = None
+        self._task = None
+
+    def _ensure_running(self):
+        if self._cond is None:
+            self._cond = asyncio.Condition()
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._poll())
+
+    async def _poll(self):
+        loop = asyncio.get_running_loop()
+        while self.subscribers > 0:
+            try:
+                value = await loop.run_in_executor(None, self.read_fn)
+            except Exception as e:
+                log.warning("AsyncFeed: error leyendo el sensor: %s", e)
+                value = None
+            async with self._cond:
+                self.value = value
+                self.version += 1
+                self._cond.notify_all()
+            await asyncio.sleep(self.period)
+
+    async def subscribe(self):
+        """
+        Generador async que produce cada lectura nueva del sensor.
+        """
+        self.subscribers += 1
+        self._ensure_running()
+        seen = self.version
+        try:
+            while True:
+                async with self._cond:
+                    await self._cond.wait_for(lambda: self.version > seen)
+                    seen = self.version
+                    value = self.value
+                yield value
+        finally:
+            self.subscribers -= 1
@@ -1,6 +1,14 @@
-import raspy_qmc5883l
+import logging
+import math
+import struct
+import threading
 import time
 
+log = logging.getLogger("ferb.brujula")
+
+# Output data rate del QMC5883L (bits 2-3 del registro de control 1)
+ODR_BITS = {10: 0b0000, 50: 0b0100, 100: 0b1000, 200: 0b1100}
+
 
 class Brujula:
     # UCAB_CALIBRATION = [
@@ -20,16 +28,163 @@ class Brujula:
     ]
     UCAB_DECLINATION = -15.9
 
-    def __init__(self, i2c_bus=1, calibration=None, declination=None):
+    def __init__(self, i2c_bus=1, calibration=None, declination=None, sensor=None):
         """
         Initialize the compass sensor with the specified I2C bus, calibration, and declination.
+        sensor: sensor alternativo con get_bearing() (ver simulador.py); si se indica no se abre el bus.
         """
-        self.sensor = raspy_qmc5883l.QMC5883L(i2c_bus=i2c_bus)
+        if sensor is None:
+            import raspy_qmc5883l
+
+            sensor = raspy_qmc5883l.QMC5883L(i2c_bus=i2c_bus)
+        self.sensor = sensor
         if calibration is not None:
             self.sensor.calibration = calibration
 
         if declination is not None:
             self.sensor.declination = declination
+        self.max_age = 1.0  # Segundos tras los que heading considera vieja la última muestra
+        # Muestreador en segundo plano
+        self.muestras = 0
+        self.errores = 0
+        self._lectura = None  # (rumbo filtrado, grados/s, time.monotonic(), seq)
+        self._sampler_thread = None
+        self._sampler_running = False
+        self._cond = threading.Condition()
+
+    def _leer_rumbo(self):
+        """
+        Una lectura del sensor en grados, con calibración y declinación. Con el QMC5883L lee
+        solo los 6 bytes de X/Y/Z en una transacción (get_bearing también lee la temperatura).
+        """
+        bus = getattr(self.sensor, "bus", None)
+        if bus is None:
+            return self.sensor.get_bearing()
+        x, y, _ = struct.unpack("<3h", bytes(bus.read_i2c_block_data(self.sensor.address, 0x00, 6)))
+        c = self.sensor.calibration
+        xc = x * c[0][0] + y * c[0][1] + c[0][2]
+        yc = x * c[1][0] + y * c[1][1] + c[1][2]
+        return (math.degrees(math.atan2(yc, xc)) + self.sensor.declination) % 360
+
+    def start_sampler(self, rate_hz=10, tau=0.2):
+        """
+        Inicia un hilo que lee el sensor a rate_hz (su output data rate: 10, 50, 100 o 200 Hz),
+        filtra el rumbo (constante de tiempo tau segundos; sobre ángulos, sin salto en 0°/360°)
+        y publica el último rumbo y la velocidad angular para todos los consumidores.
+        """
+        if self._sampler_running:
+            return
+        bus = getattr(self.sensor, "bus", None)
+        if bus is not None and rate_hz in ODR_BITS and rate_hz != 10:
+            # raspy_qmc5883l deja el sensor a 10 Hz; modo continuo, 2 G y OSR 512 como la librería
+            bus.write_byte_data(self.sensor.address, 0x09, 0b00000001 | ODR_BITS[rate_hz])
+        self.rate_hz = rate_hz
+        self.tau = tau
+        self._sampler_running = True
+        self._sampler_thread = threading.Thread(target=self._sampler_loop)
+        self._sampler_thread.daemon = True
+        self._sampler_thread.start()
+
+    def stop_sampler(self):
+        self._sampler_running = False
+        with self._cond:
+            self._cond.notify_all()
+        if self._sampler_thread and threading.current_thread() != self._sampler_thread:
+            self._sampler_thread.join(timeout=1)
+        self._sampler_thread = None
+
+    def _sampler_loop(self):
+        periodo = 1.0 / self.rate_hz
+        rumbo = None
+        velocidad = 0.0
+        t_anterior = None
+        seq = 0
+        proxima = time.monotonic()
+        while self._sampler_running:
+            proxima += periodo
+            try:
+                bruto = self._leer_rumbo()
+            except Exception as e:
+                log.warning("Brújula: error leyendo el sensor: %s", e)
+                bruto = None
+            ahora = time.monotonic()
+            if bruto is None:
+                self.errores += 1
+            elif rumbo is None:
+                rumbo, t_anterior = bruto, ahora
+            else:
+                # Filtro alfa-beta: predice con la velocidad angular y corrige con una fracción
+                # del residuo. El residuo se envuelve a [-180, 180): 359° y 1° están a 2°.
+                # A velocidad constante no queda atrasado como una media móvil.
+                dt = max(ahora - t_anterior, 1e-3)
+                alpha = 1.0 - math.exp(-dt / self.tau) if self.tau > 0 else 1.0
+                beta = alpha * alpha / (2.0 - alpha)
+                prediccion = rumbo + velocidad * dt
+                residuo = (bruto - prediccion + 180) % 360 - 180
+                rumbo = (prediccion + alpha * residuo) % 360
+                velocidad += beta * residuo / dt
+                t_anterior = ahora
+            if bruto is not None:
+                seq += 1
+                self.muestras += 1
+                with self._cond:
+                    self._lectura = (rumbo, velocidad, ahora, seq)
+                    self._cond.notify_all()
+            espera = proxima - time.monotonic()
+            if espera > 0:
+                time.sleep(espera)
+            else:
+                proxima = time.monotonic()  # Atrasado (I2C lento): no acumular lecturas
+
+    def lectura(self):
+        """
+        (rumbo filtrado, velocidad angular en grados/s, time.monotonic(), seq) de la última
+        muestra, o None si no hay una reciente.
+        """
+        lectura = self._lectura
+        if lectura is None or time.monotonic() - lectura[2] > self.max_age:
+            return None
+        return lectura
+
+    @property
+    def heading(self):
+        """
+        Último rumbo filtrado en grados, sin tocar el bus. Sin muestreador, lee el sensor.
+        """
+        if not self._sampler_running:
+            return self.sensor.get_bearing()
+        lectura = self.lectura()
+        return lectura[0] if lectura is not None else None
+
+    @property
+    def angular_rate(self):
+        """
+        Velocidad angular en grados/s (positiva en sentido horario), o None.
+        """
+        lectura = self.lectura()
+        return lectura[1] if lectura is not None else None
+
+    def wait_for_heading(self, after_seq=0, timeout=None):
+        """
+        Espera una muestra con seq mayor que after_seq y la devuelve (ver lectura()), o None.
+        """
+        with self._cond:
+            self._cond.wait_for(
+                lambda: not self._sampler_running or (self._lectura is not None and self._lectura[3] > after_seq),
+                timeout,
+            )
+            if self._lectura is not None and self._lectura[3] > after_seq:
+                return self._lectura
+        return None
+
+    def stats(self):
+        lectura = self.lectura()
+        return {
+            "heading": lectura[0] if lectura else None,
+            "angular_rate": lectura[1] if lectura else None,
+            "muestras": self.muestras,
+            "errores": self.errores,
+        }
 
     def run(self):
         """
@@ -1,160 +1,135 @@
-from gpiozero import Robot, Motor
 from time import sleep
+import logging
+import os
 import cv2
-from picamera2 import Picamera2
-import threading
+import asyncio
 from perrito import perrito_mode
-from gps import GPS
-from brujula import Brujula
+from hardware import crear_hardware
 from modo_obstaculos import modo_obstaculos
-from math import radians, sin, cos, sqrt, atan2, degrees
+import geodesia
+from navegacion import ControladorNavegacion, ColaNavegacion
 from modo_gestos_control import modo_gestos_control
 from collections import deque
+from frame_bus import FrameBus
+from mjpeg import MjpegBroadcaster, AsyncMjpegClient, mjpeg_part
+from async_feed import AsyncFeed
+from movimiento import PlanificadorMovimiento
+from modos import SupervisorModos
+from traza import Trazador
+from telemetria import GrabadorTelemetria
+
+log = logging.getLogger("ferb.ferb")
 
 
 class Ferb:
     def __init__(
-        self, left_motor_pins=(21, 26), right_motor_pins=(0, 25), initial_mode="manual"
+        self,
+        left_motor_pins=(21, 26),
+        right_motor_pins=(0, 25),
+        initial_mode="manual",
+        backend=None,
+        hardware=None,
+        continuous_timeout=2.0,
+        telemetry=None,
     ):
         """
         Setup the robot with the given motor pins.
-        """
-        self.robot = Robot(
-            left=Motor(*left_motor_pins, enable=18),
-            right=Motor(*right_motor_pins, enable=27),
-        )
+        backend: "hw" (Raspberry Pi), "gpiod" (Raspberry Pi, motores por libgpiod) o "sim"
+        (simulador sin hardware); por defecto FERB_BACKEND.
+        hardware: backend ya construido (ver hardware.py); tiene prioridad sobre backend.
+        continuous_timeout: segundos sin comandos tras los que se detiene un movimiento continuo.
+        telemetry: carpeta donde grabar la telemetría (o un GrabadorTelemetria ya creado); por
+        defecto FERB_TELEMETRY, y sin grabar si no está definida.
+        """
+        if hardware is None:
+            hardware = crear_hardware(
+                backend, left_motor_pins=left_motor_pins, right_motor_pins=right_motor_pins
+            )
+        self.hardware = hardware
+        self.robot = hardware.robot
         self.current_mode = initial_mode
         self.camera = None
-        self.dog_thread_running = False  # Para controlar el hilo del perrito
-        self.dog_thread = None
+        self.frame_bus = None  # Único productor de frames; los consumidores se suscriben
+        self.mjpeg = None  # Codificador MJPEG compartido por todos los espectadores
+        self._stream_overlay = None  # Anotación de los modos sobre el stream MJPEG
         self.camera_failed = False  # Track camera failure state
-        self._continuous_move_thread = None
-        self._continuous_move_running = False
-        self._continuous_direction = None
-        self._continuous_speed = 1
+        # Grabador de telemetría: set_wheels y set_mode escriben un registro cada uno
+        telemetry = telemetry if telemetry is not None else os.environ.get("FERB_TELEMETRY")
+        if isinstance(telemetry, str):
+            telemetry = GrabadorTelemetria(telemetry) if telemetry else None
+        self.telemetria = telemetry
+        # Latencia por etapa de los modos (captura -> percepción -> motores), ver /metrics
+        self.traza = Trazador()
+        # Único hilo de motores: comandos con duración y continuos; el llamador no espera
+        self.movimiento = PlanificadorMovimiento(
+            self.set_wheels, hombre_muerto=continuous_timeout, trazador=self.traza
+        )
         # gps
-        self.gps = GPS()
+        self.gps = hardware.gps
+        self.gps.start_reader()  # Drena el UART en segundo plano; el último fix queda en cache
+        self._last_fix_seq = -1
         self.gps_history_size = 3  # Number of readings to average
         self.gps_position_history = deque(maxlen=self.gps_history_size)
         # brujula
-        self.brujula = Brujula(
-            i2c_bus=4,
-            calibration=Brujula.UCAB_CALIBRATION,
-            declination=Brujula.UCAB_DECLINATION,
-        )
+        self.brujula = hardware.brujula
+        # Un solo hilo lee el sensor; navegación, giros y clientes SSE leen el rumbo cacheado
+        self.brujula.start_sampler()
+        if self.telemetria is not None:
+            # Hilos propios esperan cada fix y cada muestra; la cámara solo si está encendida
+            self.telemetria.start(gps=self.gps, brujula=self.brujula, frame_bus=lambda: self.frame_bus)
+            self.telemetria.modo(self.current_mode)
+        # streams async: una lectura compartida por sensor para todos los clientes SSE
+        self._gps_feed = AsyncFeed(self.gps.read_data, period=1)
+        self._compass_feed = AsyncFeed(lambda: self.brujula.heading, period=0.25)
         # navegacion
-        self.obstaculos_thread_running = False  # Para controlar el hilo de obstáculos
-        self.obstaculos_thread = None
         self.ruta = []
+        self.navigation_telemetry = {}
+        self.navegacion = ColaNavegacion(self.navigate)  # Rutas en segundo plano, de una en una
         # gestos
-        self.gestos_thread_running = False  # Para controlar el hilo de gestos
-        self.gestos_thread = None
-
-    def _dog_handler(self):
-        """
-        Private method to handle perrito mode
-        """
-        while self.dog_thread_running:
-            if self.current_mode == "dog":
-                print("entro a modo perrito")
-                perrito_mode(self)
-            sleep(0.5)  # Pequeña pausa para no saturar la CPU
-
-    def start_dog_thread(self):
-        """
-        Starts the thread that prints "perrito" when current_mode is "dog".
-        """
-        if not self.dog_thread_running:
-            self.dog_thread_running = True
-            self.dog_thread = threading.Thread(target=self._dog_handler)
-            self.dog_thread.daemon = (
-                True  # Hace que el hilo se cierre cuando el programa principal termina
-            )
-            self.dog_thread.start()
-            print("Hilo 'perrito' iniciado.")
-
-    def stop_dog_thread(self):
-        """
-        Stops the thread that prints "perrito".
-        """
-        if self.dog_thread_running:
-            self.dog_thread_running = False
-            if self.dog_thread and threading.current_thread() != self.dog_thread:
-                self.dog_thread.join()  # Espera a que el hilo termine su ejecución actual
-            print("Hilo 'perrito' detenido.")
-
-    def _obstaculos_handler(self):
-        """
-        Private method to handle obstaculos mode
-        """
-        while self.obstaculos_thread_running:
-            if self.current_mode == "obstaculos":
-                print("entro a modo obstaculos")
-                modo_obstaculos(self)
-            sleep(0.5)
-
-    def start_obstaculos_thread(self):
-        """
-        Starts the thread for obstaculos mode.
-        """
-        if not hasattr(self, 'obstaculos_thread_running') or not self.obstaculos_thread_running:
-            self.obstaculos_thread_running = True
-            self.obstaculos_thread = threading.Thread(target=self._obstaculos_handler)
-            self.obstaculos_thread.daemon = True
-            self.obstaculos_thread.start()
-            print("Hilo 'obstaculos' iniciado.")
-
-    def stop_obstaculos_thread(self):
-        """
-        Stops the thread for obstaculos mode.
-        """
-        if hasattr(self, 'obstaculos_thread_running') and self.obstaculos_thread_running:
-            self.obstaculos_thread_running = False
-            if self.obstaculos_thread and threading.current_thread() != self.obstaculos_thread:
-                self.obstaculos_thread.join()
-            print("Hilo 'obstaculos' detenido.")
-
-    def _gestos_handler(self):
-        """
-        Private method to handle gestos mode
-        """
-        while self.gestos_thread_running:
-            if self.current_mode == "gestos":
-                print("entro a modo gestos")
-                modo_gestos_control(self)
-            sleep(0.5)
+        self.gesture_pipeline = None  # Pipeline de gestos activo (ver modo_gestos_control)
+        self.last_gesture_stats = {"running": False}
+        # perrito
+        self.dog_controller = None  # Controlador de seguimiento activo (ver perrito)
+        self.last_dog_stats = {"running": False}
+        # Un solo hilo corre el comportamiento del modo activo
+        self.modos = SupervisorModos(
+            self,
+            {
+                "dog": perrito_mode,
+                "obstaculos": modo_obstaculos,
+                "gestos": modo_gestos_control,
+            },
+        )
 
-    def start_gestos_thread(self):
+    def set_mode(self, mode):
         """
-        Starts the thread for gestos mode.
+        Cambia de modo sin bloquear: el comportamiento anterior se cancela y el nuevo arranca
+        en el hilo del supervisor en cuanto aquel termina.
+        Cualquier modo que no sea "navegacion" cancela la ruta en curso y las encoladas: si
+        no, la siguiente ruta de la cola volvería a pasar a navegacion al arrancar.
         """
-        if not hasattr(self, 'gestos_thread_running') or not self.gestos_thread_running:
-            self.gestos_thread_running = True
-            self.gestos_thread = threading.Thread(target=self._gestos_handler)
-            self.gestos_thread.daemon = True
-            self.gestos_thread.start()
-            print("Hilo 'gestos' iniciado.")
+        if mode != "navegacion":
+            self.navegacion.cancelar_todo()
+        self.modos.cambiar(mode)
+        if self.telemetria is not None:
+            self.telemetria.modo(mode)
 
-    def stop_gestos_thread(self):
+    def mode_stats(self):
         """
-        Stops the thread for gestos mode.
+        Modo activo y latencia de los cambios de modo (ms, p50/p95).
         """
-        if hasattr(self, 'gestos_thread_running') and self.gestos_thread_running:
-            self.gestos_thread_running = False
-            if self.gestos_thread and threading.current_thread() != self.gestos_thread:
-                self.gestos_thread.join()
-            print("Hilo 'gestos' detenido.")
+        return self.modos.stats()
 
     def start_camera(self, camera_index=0):
         """
         Initialize the camera.
         """
         if self.camera_failed:
-            print("Camera previously failed to initialize. Skipping re-initialization.")
+            log.warning("Camera previously failed to initialize. Skipping re-initialization.")
             raise RuntimeError("Camera is in a failed state.")
         if self.camera is None:
             try:
-                self.camera = Picamera2()
+                self.camera = self.hardware.crear_camara()
                 self.camera.configure(
                     self.camera.create_preview_configuration(
                         raw={"size": (820, 616)},
@@ -162,9 +137,11 @@ class Ferb:
                     )
                 )
                 self.camera.start()
-                sleep(2)
+                sleep(self.hardware.camera_warmup)
+                self.frame_bus = FrameBus(self.camera)
+                self.frame_bus.start()
             except Exception as e:
-                print(f"Error initializing camera: {e}")
+                log.error("Error initializing camera: %s", e)
                 # Picamera2 may leave a broken object and background thread after failure.
                 # This is a known issue and cannot be fully avoided in user code.
                 self.stop_camera()  # Ensure cleanup
@@ -180,113 +157,176 @@ class Ferb:
         """
         Release the camera resource.
         """
+        if self.mjpeg is not None:
+            self.mjpeg.stop()
+            self.mjpeg = None
+        if self.frame_bus is not None:
+            self.frame_bus.stop()
+            self.frame_bus = None
         if self.camera is not None:
             try:
                 self.camera.close()
             except Exception as e:
-                print(f"Error releasing camera: {e}")
+                log.warning("Error releasing camera: %s", e)
             self.camera = None
         self.camera_failed = False  # Allow future attempts after explicit stop
 
+    def subscribe_frames(self, name, mode="latest"):
+        """
+        Inicia la cámara si hace falta y suscribe un consumidor al bus de frames.
+        mode="latest" entrega solo el frame más reciente; mode="every" entrega todos en orden.
+        """
+        if self.frame_bus is None or not self.frame_bus.running:
+            self.stop_camera()
+            self.start_camera()
+        return self.frame_bus.subscribe(name, mode)
+
+    def frame_stats(self):
+        """
+        Estadísticas del bus de frames: fps de captura y fps/descartes por consumidor.
+        """
+        if self.frame_bus is None:
+            return {"running": False, "subscribers": []}
+        stats = self.frame_bus.stats()
+        if self.mjpeg is not None:
+            stats["mjpeg"] = self.mjpeg.stats()
+        return stats
+
+    def gesture_stats(self):
+        """
+        Métricas del modo gestos: ms de inferencia, uso de la ROI y latencia gesto -> motor.
+        """
+        pipeline = self.gesture_pipeline
+        if pipeline is not None:
+            return pipeline.stats()
+        return self.last_gesture_stats
+
+    def metrics(self):
+        """
+        Latencia por etapa de cada pipeline en ms (p50/p95/p99/max), desde la captura del
+        frame hasta el comando a los motores.
+        """
+        return self.traza.metricas()
+
+    def dog_stats(self):
+        """
+        Métricas del modo perrito: ruedas actuales y reacción captura -> comando (ms, p50/p95).
+        """
+        controlador = self.dog_controller
+        if controlador is not None:
+            stats = controlador.stats()
+            stats["running"] = True
+            return stats
+        return self.last_dog_stats
+
+    def _camera_error_part(self):
+        """
+        Frame JPEG con un mensaje de error, para avisar al espectador que la cámara falló.
+        """
+        import numpy as np
+
+        img = np.zeros((100, 480, 3), dtype=np.uint8)
+        cv2.putText(
+            img,
+            "Camera error",
+            (10, 60),
+            cv2.FONT_HERSHEY_SIMPLEX,
+            2,
+            (0, 0, 255),
+            3,
+        )
+        ret, jpeg = cv2.imencode(".jpg", img)
+        return mjpeg_part(jpeg.tobytes()) if ret else None
+
     def camera_stream(self):
         """
         Generator that yields camera frames as JPEG for streaming.
         """
         try:
-            self.start_camera()
+            client = self._ensure_mjpeg().subscribe()
         except Exception as e:
+            log.error("Camera stream unavailable: %s", e)
             # Yield a single frame with an error message as JPEG
-            import numpy as np
-
-            img = np.zeros((100, 480, 3), dtype=np.uint8)
-            cv2.putText(
-                img,
-                "Camera error",
-                (10, 60),
-                cv2.FONT_HERSHEY_SIMPLEX,
-                2,
-                (0, 0, 255),
-                3,
-            )
-            ret, jpeg = cv2.imencode(".jpg", img)
-            if ret:
-                yield (
-                    b"--frame\r\n"
-                    b"Content-Type: image/jpeg\r\n\r\n" + jpeg.tobytes() + b"\r\n"
-                )
+            part = self._camera_error_part()
+            if part:
+                yield part
             return
-        while True:
-            if self.camera is None:
-                break
-            try:
-                img = self.camera.capture_array()
-                ret, jpeg = cv2.imencode(".jpg", img)
-                if not ret:
-                    continue
-                yield (
-                    b"--frame\r\n"
-                    b"Content-Type: image/jpeg\r\n\r\n" + jpeg.tobytes() + b"\r\n"
-                )
-            except Exception as e:
-                print(f"Camera streaming error: {e}")
-                self.stop_camera()
-                break
+        yield from client.broadcaster.stream(client)
+
+    async def camera_stream_async(self):
+        """
+        Versión async de camera_stream: el espectador espera frames en el event loop.
+        """
+        loop = asyncio.get_running_loop()
+        try:
+            # Iniciar la cámara bloquea unos segundos; hacerlo fuera del event loop
+            broadcaster = await loop.run_in_executor(None, self._ensure_mjpeg)
+        except Exception as e:
+            log.error("Camera stream unavailable: %s", e)
+            part = self._camera_error_part()
+            if part:
+                yield part
+            return
+        client = broadcaster.subscribe(AsyncMjpegClient)
+        async for part in broadcaster.stream_async(client):
+            yield part
+
+    def _ensure_mjpeg(self):
+        """
+        Devuelve el codificador MJPEG compartido, iniciando la cámara si hace falta.
+        Cada frame se codifica una sola vez sin importar cuántos espectadores haya.
+        """
+        if self.frame_bus is None or not self.frame_bus.running:
+            self.stop_camera()
+            self.start_camera()
+        if self.mjpeg is None or self.mjpeg.frame_bus is not self.frame_bus:
+            self.mjpeg = MjpegBroadcaster(self.frame_bus)
+            self.mjpeg.overlay = self._stream_overlay
+        return self.mjpeg
+
+    def set_stream_overlay(self, overlay):
+        """
+        Registra una función frame -> None que dibuja sobre el stream MJPEG (None la quita).
+        Corre en el hilo codificador, así que solo se dibuja cuando hay espectadores.
+        """
+        self._stream_overlay = overlay
+        if self.mjpeg is not None:
+            self.mjpeg.overlay = overlay
 
     def cleanup(self):
         """
         Cleanup the robot resources.
         """
-        self.stop_dog_thread()  # Asegúrate de detener el hilo del perrito al limpiar
-        self.stop_obstaculos_thread()  # Detén el hilo de obstáculos también
-        self.stop_gestos_thread()  # Detén el hilo de gestos también
+        self.modos.close()  # Cancela el comportamiento del modo activo
+        self.navegacion.cancelar_todo()
+        self.movimiento.close()
         self.stop_camera()
-        self.robot.close()
-
-    def _continuous_move_worker(self):
-        """
-        Mantiene el robot moviéndose en la dirección indicada hasta que se cambie o se detenga.
-        """
-        while self._continuous_move_running:
-            direction = self._continuous_direction
-            speed = self._continuous_speed
-            if direction == "forward":
-                self.robot.forward(speed)
-            elif direction == "backward":
-                self.robot.backward(speed)
-            elif direction == "left":
-                self.robot.left(speed)
-            elif direction == "right":
-                self.robot.right(speed)
-            elif direction == "stop" or direction is None:
-                self.robot.stop()
-            # Repite cada 0.2 segundos para mantener el movimiento
-            sleep(0.2)
+        self.gps.close()
+        self.brujula.stop_sampler()
+        if self.telemetria is not None:
+            self.telemetria.close()
+        self.hardware.close()
 
     def start_continuous_move(self, direction, speed=1):
         """
-        Inicia el movimiento continuo en la dirección dada.
+        Inicia el movimiento continuo en la dirección dada. Si no se repite el comando antes
+        de continuous_timeout segundos, el robot se detiene (hombre muerto).
         """
-        self.stop_continuous_move()
-        self._continuous_direction = direction
-        self._continuous_speed = speed
-        if direction != "stop":
-            self._continuous_move_running = True
-            self._continuous_move_thread = threading.Thread(
-                target=self._continuous_move_worker
-            )
-            self._continuous_move_thread.daemon = True
-            self._continuous_move_thread.start()
+        return self.movimiento.mantener(direction, speed)
 
     def stop_continuous_move(self):
         """
         Detiene el movimiento continuo.
         """
-        self._continuous_move_running = False
-        if self._continuous_move_thread:
-            self._continuous_move_thread.join(timeout=1)
-        self._continuous_move_thread = None
-        self._continuous_direction = None
-        self.robot.stop()
+        self.movimiento.detener()
+
+    def set_wheels(self, left, right):
+        """
+        Fija la velocidad de cada rueda en [-1, 1] (negativo = hacia atrás) sin bloquear.
+        """
+        self.robot.value = (left, right)
+        if self.telemetria is not None:
+            self.telemetria.motores(left, right)
 
     def move(
         self,
@@ -297,198 +337,195 @@ class Ferb:
     ):
         """
         Handle movement.
-        Si continuous=True, mantiene el movimiento hasta que se mande otra dirección o stop.
-        Si continuous=False, solo mueve una vez (como en el index.html).
+        Si continuous=True, mantiene el movimiento hasta que se mande otra dirección o stop
+        (repitiendo el comando al menos cada continuous_timeout segundos).
+        Si continuous=False, mueve durante duration segundos y se detiene (como en el index.html).
+        Vuelve de inmediato; un comando nuevo reemplaza al que esté en curso.
         """
-        print("Current mode:", self.current_mode)
-        print("Direction:", direction)
-        print("Speed:", speed)
+        log.debug("move %s speed=%s continuous=%s (modo %s)", direction, speed, continuous, self.current_mode)
         if continuous:
-            if direction == "stop":
-                self.stop_continuous_move()
-            else:
-                self.start_continuous_move(direction, speed)
-        else:
-            self.stop_continuous_move()  # Detén cualquier movimiento continuo previo
-            if direction == "forward":
-                print("Moving forward")
-                self.robot.forward(speed)
-                sleep(duration)
-            elif direction == "backward":
-                self.robot.backward(speed)
-                sleep(duration)
-            elif direction == "left":
-                self.robot.left(speed)
-                sleep(duration)
-            elif direction == "right":
-                self.robot.right(speed)
-                sleep(duration)
+            return self.start_continuous_move(direction, speed)
+        # No bloquea: reemplaza cualquier movimiento previo y se detiene cuando vence duration
+        return self.movimiento.ejecutar(direction, speed, duration)
+
+    def move_sequence(self, pasos):
+        """
+        Ejecuta [(dirección, velocidad, duración), ...] uno tras otro sin bloquear y luego
+        se detiene. Devuelve el id del plan (ver PlanificadorMovimiento.terminado/esperar).
+        """
+        return self.movimiento.secuencia(pasos)
+
+    def _gps_event(self, data):
+        """
+        Convierte una lectura del GPS en un evento SSE con latitud y longitud.
+        """
+        lat = None
+        lon = None
+        # Intenta extraer latitud y longitud del objeto data
+        if data:
+            # Si data es un dict o tiene atributos lat/lon
+            if isinstance(data, dict):
+                lat = data.get("lat") or data.get("latitude")
+                lon = data.get("lon") or data.get("longitude")
             else:
-                self.robot.stop()
+                lat = getattr(data, "lat", None) or getattr(data, "latitude", None)
+                lon = getattr(data, "lon", None) or getattr(data, "longitude", None)
+        if lat is not None and lon is not None:
+            return f"data: {lat},{lon}\n\n"
+        return "data: El GPS no se ha posicionado. Muévase a un sitio más despejado.\n\n"
 
     def gps_stream(self):
         """
         Generator que produce solo latitud y longitud, o un mensaje si no hay fix.
         """
         while True:
-            data = self.gps.read_data()
-            lat = None
-            lon = None
-            # Intenta extraer latitud y longitud del objeto data
-            if data:
-                # Si data es un dict o tiene atributos lat/lon
-                if isinstance(data, dict):
-                    lat = data.get("lat") or data.get("latitude")
-                    lon = data.get("lon") or data.get("longitude")
-                else:
-                    lat = getattr(data, "lat", None) or getattr(data, "latitude", None)
-                    lon = getattr(data, "lon", None) or getattr(data, "longitude", None)
-            if lat is not None and lon is not None:
-                yield f"data: {lat},{lon}\n\n"
-            else:
-                yield "data: El GPS no se ha posicionado. Muévase a un sitio más despejado.\n\n"
-
+            yield self._gps_event(self.gps.read_data())
             sleep(1)
 
+    async def gps_stream_async(self):
+        """
+        Versión async de gps_stream. Todos los clientes comparten una sola lectura por periodo.
+        """
+        async for data in self._gps_feed.subscribe():
+            yield self._gps_event(data)
+
+    def _compass_event(self, bearing):
+        """
+        Convierte una lectura de la brújula en un evento SSE.
+        """
+        if bearing is not None:
+            return f"data: {bearing:.2f}\n\n"
+        return "data: Error al obtener la dirección de la brújula.\n\n"
+
     def compass_stream(self):
         """
         Generator que produce la dirección de la brújula.
         """
         while True:
-            bearing = self.brujula.sensor.get_bearing()
-            if bearing is not None:
-                yield f"data: {bearing:.2f}\n\n"
-            else:
-                yield "data: Error al obtener la dirección de la brújula.\n\n"
+            yield self._compass_event(self.brujula.heading)
             sleep(0.25)
 
+    async def compass_stream_async(self):
+        """
+        Versión async de compass_stream. Todos los clientes comparten una sola lectura por periodo.
+        """
+        async for bearing in self._compass_feed.subscribe():
+            yield self._compass_event(bearing)
+
     def start_navigation(self, ruta):
         """
-        Inicia la navegación especificando una ruta.
+        Encola la navegación de una ruta y devuelve su TrabajoNavegacion sin esperar a que termine.
         """
-        print("Iniciando navegación con la ruta:", ruta)
-        self.ruta = ruta
-        self.navigate()
+        log.info("Encolando navegación con la ruta: %s", ruta)
+        return self.navegacion.enviar(ruta)
 
     def haversine(self, lat1, lon1, lat2, lon2):
         """
         Calcula la distancia en metros entre dos coordenadas GPS.
         """
-        R = 6371000  # Radio de la Tierra en metros
-        lat1, lon1, lat2, lon2 = map(radians, [lat1, lon1, lat2, lon2])
-        dlat = lat2 - lat1
-        dlon = lon2 - lon1
-        a = sin(dlat / 2) ** 2 + cos(lat1) * cos(lat2) * sin(dlon / 2) ** 2
-        c = 2 * atan2(sqrt(a), sqrt(1 - a))
-        return R * c
+        return float(geodesia.haversine(lat1, lon1, lat2, lon2))
 
     def bearing_to(self, lat1, lon1, lat2, lon2):
         """
         Calcula el rumbo (en grados) del punto actual al objetivo.
         """
-        lat1 = radians(lat1)
-        lat2 = radians(lat2)
-        dlon = radians(lon2 - lon1)
-        x = sin(dlon) * cos(lat2)
-        y = cos(lat1) * sin(lat2) - sin(lat1) * cos(lat2) * cos(dlon)
-        initial_bearing = atan2(x, y)
-        initial_bearing = degrees(initial_bearing)
-        compass_bearing = (initial_bearing + 360) % 360
-        return compass_bearing
-
-    def get_current_position(self):
-        """
-        Lee la posición actual del GPS (lat, lon) y aplica promediado para mitigar el drift.
-        Devuelve None si no hay fix válido o si no hay suficientes datos para promediar.
-        """
-        raw_data = self.gps.read_data()
-        
-        if isinstance(raw_data, dict) and raw_data.get("lat", None) is not None and raw_data.get("lon", None) is not None:
-            current_lat = float(raw_data["lat"])
-            current_lon = float(raw_data["lon"])
-            
-            # Add current valid reading to history
-            self.gps_position_history.append((current_lat, current_lon))
-            
-            # Only average if we have enough readings
-            if len(self.gps_position_history) == self.gps_history_size:
-                avg_lat = sum(p[0] for p in self.gps_position_history) / self.gps_history_size
-                avg_lon = sum(p[1] for p in self.gps_position_history) / self.gps_history_size
-                return avg_lat, avg_lon
-            else:
-                # Not enough data yet, return the latest valid reading or wait
-                # For this implementation, we'll return None until buffer is full.
-                # You could also return the raw_data here if you want faster updates,
-                # but with less smoothing.
-                print(f"GPS: Acumulando datos ({len(self.gps_position_history)}/{self.gps_history_size})...")
-                return None
+        return float(geodesia.bearing(lat1, lon1, lat2, lon2))
+
+    def get_current_position(self, timeout=2):
+        """
+        Espera el siguiente fix del GPS (lat, lon) y aplica promediado para mitigar el drift.
+        Devuelve None si no llega un fix nuevo a tiempo o si no hay suficientes datos para promediar.
+        """
+        fix = self.gps.wait_for_fix(self._last_fix_seq, timeout=timeout)
+        if fix is None:
+            return None
+        self._last_fix_seq = fix.seq
+
+        # Add current valid reading to history
+        self.gps_position_history.append((fix.lat, fix.lon))
+
+        # Only average if we have enough readings
+        if len(self.gps_position_history) == self.gps_history_size:
+            avg_lat = sum(p[0] for p in self.gps_position_history) / self.gps_history_size
+            avg_lon = sum(p[1] for p in self.gps_position_history) / self.gps_history_size
+            return avg_lat, avg_lon
         else:
-            # Clear history if no valid fix to avoid averaging stale data
-            # if len(self.gps_position_history) > 0:
-            #     print("GPS: Sin fix válido, limpiando historial de GPS.")
-            #     self.gps_position_history.clear()
+            # Not enough data yet; the next fix arrives within one GPS update period
+            log.debug("GPS: Acumulando datos (%d/%d)...", len(self.gps_position_history), self.gps_history_size)
             return None
 
     def get_current_heading(self):
         """
-        Obtiene el heading actual de la brújula.
+        Obtiene el heading actual de la brújula (filtrado, del muestreador; sin I2C).
         """
-        return self.brujula.sensor.get_bearing()
+        return self.brujula.heading
 
     def turn_to_heading(self, target_heading, tolerance=5):
         """
         Gira el robot hasta que el heading esté dentro del tolerance (grados).
         """
-        while True:
-            current_heading = self.get_current_heading()
-            if current_heading is None:
+        try:
+            while True:
+                current_heading = self.get_current_heading()
+                if current_heading is None:
+                    sleep(0.1)
+                    continue
+                diff = (target_heading - current_heading + 360) % 360
+                if diff < tolerance or diff > 360 - tolerance:
+                    break
+                # Por el planificador: si este lazo se atasca, el hombre muerto detiene el giro
+                self.movimiento.mantener("right" if diff < 180 else "left", 0.5, hombre_muerto=0.5)
                 sleep(0.1)
-                continue
-            diff = (target_heading - current_heading + 360) % 360
-            if diff < tolerance or diff > 360 - tolerance:
-                self.robot.stop()
-                break
-            elif diff < 180:
-                self.robot.right(speed=0.5)
-            else:
-                self.robot.left(speed=0.5)
-            sleep(0.1)
-        self.robot.stop()
-
-    def navigate(self, threshold=1.5, avance_time=5):
-        """
-        Navega a través de la ruta especificada (self.ruta).
+        finally:
+            self.movimiento.detener()
+
+    def navigate(self, ruta=None, threshold=1.5, rate_hz=10, detener=None, pausado=None, progreso=None):
+        """
+        Navega a través de la ruta indicada (o self.ruta) con un controlador continuo:
+        corrige el rumbo en cada tick sin detenerse entre waypoints.
+        Pasa el robot al modo "navegacion", lo que cancela el comportamiento del modo activo
+        (perrito, obstáculos, gestos); si otro modo toma el control, la navegación se detiene
+        y set_mode cancela también las rutas encoladas.
+        Las ruedas van por el planificador de movimiento, con un hombre muerto de unos
+        pocos ticks.
         threshold: distancia en metros para considerar que llegó al punto.
-        avance_time: tiempo en segundos para avanzar antes de volver a chequear.
+        rate_hz: frecuencia del lazo de control.
+        detener/pausado/progreso: ver ControladorNavegacion.run.
+        Devuelve True si se completó la ruta.
         """
+        if ruta is not None:
+            self.ruta = ruta
         if not self.ruta:
             raise ValueError("No hay ruta definida para navegar.")
-        for idx, punto in enumerate(self.ruta):
-            target_lat = punto.lat
-            target_lon = punto.lng
-            while True:
-                pos = self.get_current_position()
-                if not pos:
-                    print("Esperando señal GPS...")
-                    sleep(1)
-                    continue
-                lat, lon = pos
-                self.gps_position_history.clear()
-                dist = self.haversine(lat, lon, target_lat, target_lon)
-                print(f"Punto {idx+1}/{len(self.ruta)}: Distancia al objetivo: {dist:.2f} m")
-                if dist < threshold:
-                    print(f"Punto {idx+1} alcanzado.")
-                    self.robot.stop()
-                    break
-                bearing = self.bearing_to(lat, lon, target_lat, target_lon)
-                print(f"Rumbo objetivo: {bearing:.2f}°")
-                self.turn_to_heading(bearing)
-                print(f"Avanzando {avance_time} segundos...")
-                self.robot.forward(speed=1)
-                sleep(avance_time)
-                self.robot.stop()
-                print("Reevaluando posición...")
-        print("Ruta completada.")
-        self.ruta = []
+        if detener is not None and detener():
+            return False  # Cancelada antes de arrancar: no se le quita el control al modo activo
+        if self.current_mode != "navegacion":
+            log.info("Navegación: se cancela el modo %s", self.current_mode)
+            self.set_mode("navegacion")
+            self.modos.esperar(timeout=2)  # Que el comportamiento anterior suelte los motores
+        # Tramos precalculados una vez; cada iteración es aritmética 2D en la proyección local
+        ruta = geodesia.Ruta.desde_coordenadas(self.ruta)
+        hombre_muerto = 5.0 / rate_hz
+        controlador = ControladorNavegacion(
+            leer_fix=lambda: self.gps.latest_fix(self.gps.max_fix_age),
+            leer_rumbo=self.get_current_heading,
+            aplicar_ruedas=lambda izq, der: self.movimiento.mantener_ruedas(
+                izq, der, "navegacion", hombre_muerto=hombre_muerto
+            ),
+            rate_hz=rate_hz,
+            threshold=threshold,
+        )
+
+        def cancelada():
+            return self.current_mode != "navegacion" or (detener is not None and detener())
+
+        try:
+            completada = controlador.run(ruta, detener=cancelada, progreso=progreso, pausado=pausado)
+        finally:
+            self.navigation_telemetry = controlador.telemetria
+            self.ruta = []
+        log.info("Ruta completada." if completada else "Navegación detenida.")
+        log.info("Telemetría de navegación: %s", controlador.telemetria)
+        return completada
 
 
@@ -1,10 +1,10 @@
 from gpiozero import Robot, Motor
-import gpiod
 from time import sleep
 import cv2
 from picamera2 import Picamera2
 import threading
 from perrito import perrito_mode
+from motores_gpiod import MotoresGpiod, PWMSoftware
 
 # Pines para el Motor Izquierdo
 MOTOR_LEFT_FORWARD_PIN = 18    # GPIO 17 -> L298N IN1
@@ -23,21 +23,14 @@ class Ferb:
         """
         Setup the robot with the given motor pins.
         """
-        self.chip = gpiod.Chip("gpiochip0")
-        self.lines = {
-            "left_forward": self.chip.get_line(MOTOR_LEFT_FORWARD_PIN),
-            "left_backward": self.chip.get_line(MOTOR_LEFT_BACKWARD_PIN),
-            "left_ena": self.chip.get_line(MOTOR_LEFT_ENA_PIN),
-            "right_forward": self.chip.get_line(MOTOR_RIGHT_FORWARD_PIN),
-            "right_backward": self.chip.get_line(MOTOR_RIGHT_BACKWARD_PIN),
-            "right_enb": self.chip.get_line(MOTOR_RIGHT_ENB_PIN),
-            "chip": self.chip # Guardamos el chip para poder cerrarlo en finally
-        }
-        for name, line_obj in self.lines.items():
-            if name != "chip": # No solicitar el chip mismo
-                line_obj.request(consumer=f"motor_{name}", type=gpiod.LINE_REQ_DIR_OUT)
-                # Asegurarse de que estén apagadas al inicio
-                line_obj.set_value(0)
+        # Las seis líneas en un solo bulk request; dirección y enable se escriben juntos
+        self.motores = MotoresGpiod(
+            (MOTOR_LEFT_FORWARD_PIN, MOTOR_LEFT_BACKWARD_PIN),
+            (MOTOR_RIGHT_FORWARD_PIN, MOTOR_RIGHT_BACKWARD_PIN),
+            (MOTOR_LEFT_ENA_PIN, MOTOR_RIGHT_ENB_PIN),
+            chip="gpiochip0",
+            pwm=PWMSoftware(),
+        )
 
         # self.robot = Robot(left=Motor(*left_motor_pins, enable=12), right=Motor(*right_motor_pins, enable=13))
         self.current_mode = initial_mode
@@ -50,72 +43,39 @@ class Ferb:
         self._continuous_direction = None
         self._continuous_speed = 1
 
-    def _set_motor_direction(self, forward_line, backward_line, forward_state, backward_state):
-        """Función interna para establecer la dirección de un motor."""
-        forward_line.set_value(forward_state)
-        backward_line.set_value(backward_state)
-
-    def _enable_motor(self, ena_line, enable=True):
-        """Función interna para habilitar/deshabilitar un motor."""
-        ena_line.set_value(1 if enable else 0)
-
-    def move_forward(self, duration=1):
+    def move_forward(self, duration=1, speed=1):
         """Mueve ambos motores hacia adelante."""
         print(f"Moviendo ambos motores hacia adelante por {duration} segundos...")
-        # Motor Izquierdo adelante
-        self._set_motor_direction(self.lines["left_forward"], self.lines["left_backward"], 1, 0)
-        self._enable_motor(self.lines["left_ena"], True)
-        # Motor Derecho adelante
-        self._set_motor_direction(self.lines["right_forward"], self.lines["right_backward"], 1, 0)
-        self._enable_motor(self.lines["right_enb"], True)
+        self.motores.forward(speed)
         sleep(duration)
         self.stop_all_motors()
 
-    def move_backward(self, duration=1):
+    def move_backward(self, duration=1, speed=1):
         """Mueve ambos motores hacia atrás."""
         print(f"Moviendo ambos motores hacia atrás por {duration} segundos...")
-        # Motor Izquierdo atrás
-        self._set_motor_direction(self.lines["left_forward"], self.lines["left_backward"], 0, 1)
-        self._enable_motor(self.lines["left_ena"], True)
-        # Motor Derecho atrás
-        self._set_motor_direction(self.lines["right_forward"], self.lines["right_backward"], 0, 1)
-        self._enable_motor(self.lines["right_enb"], True)
+        self.motores.backward(speed)
         sleep(duration)
         self.stop_all_motors()
 
-    def turn_left(self, duration=0.5):
+    def turn_left(self, duration=0.5, speed=1):
         """Gira el carro hacia la izquierda (motor izquierdo atrás, motor derecho adelante)."""
         print(f"Girando a la izquierda por {duration} segundos...")
-        # Motor Izquierdo atrás
-        self._set_motor_direction(self.lines["left_forward"], self.lines["left_backward"], 0, 1)
-        self._enable_motor(self.lines["left_ena"], True)
-        # Motor Derecho adelante
-        self._set_motor_direction(self.lines["right_forward"], self.lines["right_backward"], 1, 0)
-        self._enable_motor(self.lines["right_enb"], True)
+        self.motores.left(speed)
         sleep(duration)
         self.stop_all_motors()
 
-    def turn_right(self, duration=0.5):
+    def turn_right(self, duration=0.5, speed=1):
         """Gira el carro hacia la derecha (motor izquierdo adelante, motor derecho atrás)."""
         print(f"Girando a la derecha por {duration} segundos...")
-        # Motor Izquierdo adelante
-        self._set_motor_direction(self.lines["left_forward"], self.lines["left_backward"], 1, 0)
-        self._enable_motor(self.lines["left_ena"], True)
-        # Motor Derecho atrás
-        self._set_motor_direction(self.lines["right_forward"], self.lines["right_backward"], 0, 1)
-        self._enable_motor(self.lines["right_enb"], True)
+        self.motores.right(speed)
         sleep(duration)
         self.stop_all_motors()
 
     def stop_all_motors(self):
         """Detiene ambos motores."""
         print("Deteniendo todos los motores...")
-        # Deshabilitar ambos ENA/ENB para cortar la energía
-        self._enable_motor(self.lines["left_ena"], False)
-        self._enable_motor(self.lines["right_enb"], False)
-        # Asegurarse de que las direcciones estén en LOW
-        self._set_motor_direction(self.lines["left_forward"], self.lines["left_backward"], 0, 0)
-        self._set_motor_direction(self.lines["right_forward"], self.lines["right_backward"], 0, 0)
+        # Enables y direcciones en LOW con una sola escritura
+        self.motores.stop()
 
     def _dog_handler(self):
         """
@@ -233,11 +193,7 @@ class Ferb:
         self.stop_dog_thread() # Asegúrate de detener el hilo del perrito al limpiar
         self.stop_camera()
         # self.robot.close()
-        # Liberar cada línea individualmente
-        for name, line_obj in self.lines.items():
-            if name != "chip": # No intentar liberar el objeto chip
-                line_obj.release()
-        self.lines["chip"].close() # Cerrar el chip GPIO al final
+        self.motores.close()  # Libera el bulk request y cierra el chip GPIO
 
     def _continuous_move_worker(self):
         """
@@ -248,16 +204,16 @@ class Ferb:
             speed = self._continuous_speed
             if direction == "forward":
                 # self.robot.forward(speed)
-                self.move_forward(0.2)
+                self.move_forward(0.2, speed)
             elif direction == "backward":
                 # self.robot.backward(speed)
-                self.move_backward(0.2)
+                self.move_backward(0.2, speed)
             elif direction == "left":
                 # self.robot.left(speed)
-                self.turn_left(0.2)
+                self.turn_left(0.2, speed)
             elif direction == "right":
                 # self.robot.right(speed)
-                self.turn_right(0.2)
+                self.turn_right(0.2, speed)
             elif direction == "stop" or direction is None:
                 # self.robot.stop()
                 self.stop_all_motors()
@@ -309,19 +265,19 @@ class Ferb:
                 print("Moving forward")
                 # self.robot.forward(speed)
                 # sleep(duration)
-                self.move_forward(duration)
+                self.move_forward(duration, speed)
             elif direction == "backward":
                 # self.robot.backward(speed)
                 # sleep(duration)
-                self.move_backward(duration)
+                self.move_backward(duration, speed)
             elif direction == "left":
                 # self.robot.left(speed)
                 # sleep(duration)
-                self.turn_left(duration)
+                self.turn_left(duration, speed)
             elif direction == "right":
                 # self.robot.right(speed)
                 # sleep(duration)
-                self.turn_right(duration)
+                self.turn_right(duration, speed)
             else:
                 # self.robot.stop()
                 self.stop_all_motors()
@@ -0,0 +1,256 @@
+import logging
+import threading
+import time
+import numpy as np
+
+log = logging.getLogger("ferb.frame_bus")
+
+
+class FakeCamera:
+    """
+    Fuente de frames sintética con la misma interfaz que Picamera2 (start/capture_array/close).
+    Sirve para medir el bus de frames sin el robot.
+    """
+
+    def __init__(self, size=(320, 240), fps=30.0):
+        self.width, self.height = size
+        self.fps = fps
+        self._frame = np.zeros((self.height, self.width, 3), dtype=np.uint8)
+        self._count = 0
+        self._next_time = None
+
+    def start(self):
+        self._next_time = time.monotonic()
+
+    def capture_array(self):
+        """
+        Devuelve un frame nuevo respetando la tasa configurada.
+        Una barra vertical se desplaza en cada frame para que sean distinguibles.
+        """
+        if self._next_time is None:
+            self.start()
+        if self.fps:
+            delay = self._next_time - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            self._next_time = max(self._next_time + 1.0 / self.fps, time.monotonic())
+        self._frame[:] = 40
+        x = self._count % self.width
+        self._frame[:, x : x + 8] = (255, 255, 255)
+        self._count += 1
+        return self._frame
+
+    def close(self):
+        self._next_time = None
+
+
+class FrameSubscription:
+    """
+    Suscripción de un consumidor al bus de frames.
+    mode="latest": cada lectura devuelve el frame más reciente (los intermedios se cuentan como descartados).
+    mode="every": cada lectura devuelve el siguiente frame en orden mientras siga en el ring buffer.
+    """
+
+    def __init__(self, bus, name, mode="latest"):
+        if mode not in ("latest", "every"):
+            raise ValueError(f"Modo de suscripción inválido: {mode}")
+        self.bus = bus
+        self.name = name
+        self.mode = mode
+        self.buffer = None  # Copia privada del frame, reutilizada en cada lectura
+        self.last_seq = -1
+        self.frames = 0
+        self.dropped = 0
+        self.closed = False
+        self._start_time = time.monotonic()
+
+    def read(self, timeout=1.0):
+        """
+        Espera un frame nuevo y devuelve (seq, timestamp, frame), o None si vence el timeout
+        o el bus se detuvo. El frame es el buffer privado de la suscripción: se sobrescribe
+        en la siguiente lectura.
+        """
+        return self.bus._read(self, timeout)
+
+    @property
+    def detenido(self):
+        """
+        True si read() ya no va a devolver frames: la suscripción se cerró o el hilo de
+        captura terminó (bus.error tiene la causa si fue un error de la cámara).
+        """
+        return self.closed or not self.bus.running
+
+    def fps(self):
+        elapsed = time.monotonic() - self._start_time
+        return self.frames / elapsed if elapsed > 0 else 0.0
+
+    def stats(self):
+        return {
+            "name": self.name,
+            "mode": self.mode,
+            "frames": self.frames,
+            "dropped": self.dropped,
+            "fps": round(self.fps(), 2),
+        }
+
+    def close(self):
+        self.bus.unsubscribe(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class FrameBus:
+    """
+    Bus de frames con un único productor: un hilo llama a source.capture_array() y copia
+    cada frame en un ring buffer de arrays preasignados, con número de secuencia y timestamp.
+    Los consumidores se suscriben con subscribe() en lugar de leer la cámara directamente.
+    """
+
+    def __init__(self, source, slots=4):
+        if slots < 3:
+            raise ValueError("El ring buffer necesita al menos 3 slots.")
+        self.source = source
+        self.slots = slots
+        self._frames = None  # Se asigna con el primer frame (forma desconocida hasta entonces)
+        self._slot_seq = [-1] * slots
+        self._slot_time = [0.0] * slots
+        self._seq = -1
+        self._cond = threading.Condition()
+        self._subscribers = []
+        self._thread = None
+        self._running = False
+        self._start_time = None
+        self.frames_captured = 0
+        self.capture_errors = 0
+        self.error = None  # Excepción que detuvo el hilo de captura, o None
+
+    @property
+    def running(self):
+        return self._running
+
+    def start(self):
+        """
+        Inicia el hilo de captura.
+        """
+        if self._running:
+            return
+        self._running = True
+        self.error = None
+        self._start_time = time.monotonic()
+        self._thread = threading.Thread(target=self._capture_loop)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self):
+        """
+        Detiene el hilo de captura y despierta a los consumidores que estén esperando.
+        """
+        self._running = False
+        with self._cond:
+            self._cond.notify_all()
+        if self._thread and threading.current_thread() != self._thread:
+            self._thread.join(timeout=2)
+        self._thread = None
+
+    def _capture_loop(self):
+        while self._running:
+            try:
+                img = self.source.capture_array()
+            except Exception as e:
+                log.error("FrameBus: la captura se detuvo: %s", e)
+                self.capture_errors += 1
+                self.error = e
+                break
+            if img is None:
+                continue
+            seq = self._seq + 1
+            slot = seq % self.slots
+            if self._frames is None or self._frames[0].shape != img.shape or self._frames[0].dtype != img.dtype:
+                self._frames = [np.empty_like(img) for _ in range(self.slots)]
+            # Invalidar el slot antes de escribirlo para que los lectores detecten la sobrescritura
+            with self._cond:
+                self._slot_seq[slot] = -1
+            np.copyto(self._frames[slot], img)
+            with self._cond:
+                self._slot_seq[slot] = seq
+                self._slot_time[slot] = time.monotonic()
+                self._seq = seq
+                self.frames_captured += 1
+                self._cond.notify_all()
+        self._running = False
+        with self._cond:
+            self._cond.notify_all()
+
+    def subscribe(self, name, mode="latest"):
+        """
+        Registra un consumidor y devuelve su FrameSubscription.
+        """
+        sub = FrameSubscription(self, name, mode)
+        with self._cond:
+            sub.last_seq = self._seq
+            self._subscribers.append(sub)
+        return sub
+
+    def unsubscribe(self, sub):
+        with self._cond:
+            sub.closed = True
+            if sub in self._subscribers:
+                self._subscribers.remove(sub)
+            self._cond.notify_all()
+
+    @property
+    def subscriber_count(self):
+        return len(self._subscribers)
+
+    def _read(self, sub, timeout):
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        while True:
+            with self._cond:
+                while self._seq <= sub.last_seq:
+                    if sub.closed or not self._running:
+                        return None
+                    remaining = None if deadline is None else deadline - time.monotonic()
+                    if remaining is not None and remaining <= 0:
+                        return None
+                    self._cond.wait(remaining)
+                if sub.mode == "latest":
+                    seq = self._seq
+                else:
+                    # El slot que escribe el productor queda fuera de la ventana válida
+                    seq = max(sub.last_seq + 1, self._seq - self.slots + 2)
+                slot = seq % self.slots
+                frames = self._frames
+            src = frames[slot]
+            if sub.buffer is None or sub.buffer.shape != src.shape or sub.buffer.dtype != src.dtype:
+                sub.buffer = np.empty_like(src)
+            np.copyto(sub.buffer, src)
+            with self._cond:
+                valid = self._slot_seq[slot] == seq
+                stamp = self._slot_time[slot]
+            if not valid:
+                # El productor sobrescribió el slot durante la copia; reintentar
+                continue
+            sub.dropped += seq - sub.last_seq - 1
+            sub.last_seq = seq
+            sub.frames += 1
+            return seq, stamp, sub.buffer
+
+    def stats(self):
+        """
+        Devuelve fps de captura y, por consumidor, fps y frames descartados.
+        """
+        elapsed = time.monotonic() - self._start_time if self._start_time else 0
+        with self._cond:
+            subs = list(self._subscribers)
+        return {
+            "running": self._running,
+            "frames_captured": self.frames_captured,
+            "capture_errors": self.capture_errors,
+            "error": None if self.error is None else str(self.error),
+            "capture_fps": round(self.frames_captured / elapsed, 2) if elapsed > 0 else 0.0,
+            "subscribers": [sub.stats() for sub in subs],
+        }
@@ -0,0 +1,167 @@
+"""
+Funciones geodésicas vectorizadas con NumPy. Todas aceptan escalares o arrays de
+coordenadas en grados y devuelven metros o grados con la forma del broadcast.
+"""
+
+import math
+import numpy as np
+
+R_TIERRA = 6371000.0  # Radio medio de la Tierra en metros
+
+
+def haversine(lat1, lon1, lat2, lon2):
+    """
+    Distancia de gran círculo en metros entre dos coordenadas (o arrays de coordenadas).
+    """
+    lat1, lon1, lat2, lon2 = (np.radians(v) for v in (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * R_TIERRA * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def bearing(lat1, lon1, lat2, lon2):
+    """
+    Rumbo inicial en grados (0-360, 0 = norte) del punto 1 al punto 2.
+    """
+    lat1 = np.radians(lat1)
+    lat2 = np.radians(lat2)
+    dlon = np.radians(np.subtract(lon2, lon1))
+    x = np.sin(dlon) * np.cos(lat2)
+    y = np.cos(lat1) * np.sin(lat2) - np.sin(lat1) * np.cos(lat2) * np.cos(dlon)
+    return (np.degrees(np.arctan2(x, y)) + 360) % 360
+
+
+def cross_track(lat, lon, lat1, lon1, lat2, lon2):
+    """
+    Distancia en metros del punto (lat, lon) al gran círculo que pasa por 1 y 2.
+    Positiva si el punto queda a la derecha del tramo 1 -> 2.
+    """
+    d13 = haversine(lat1, lon1, lat, lon) / R_TIERRA
+    theta13 = np.radians(bearing(lat1, lon1, lat, lon))
+    theta12 = np.radians(bearing(lat1, lon1, lat2, lon2))
+    return np.arcsin(np.sin(d13) * np.sin(theta13 - theta12)) * R_TIERRA
+
+
+def along_track(lat, lon, lat1, lon1, lat2, lon2):
+    """
+    Distancia en metros desde el punto 1, a lo largo del tramo 1 -> 2, hasta la proyección
+    de (lat, lon) sobre el tramo. Negativa si la proyección cae antes del punto 1.
+    """
+    d13 = haversine(lat1, lon1, lat, lon) / R_TIERRA
+    xt = cross_track(lat, lon, lat1, lon1, lat2, lon2) / R_TIERRA
+    theta13 = np.radians(bearing(lat1, lon1, lat, lon))
+    theta12 = np.radians(bearing(lat1, lon1, lat2, lon2))
+    sign = np.sign(np.cos(theta12 - theta13))
+    return sign * np.arccos(np.clip(np.cos(d13) / np.cos(xt), -1.0, 1.0)) * R_TIERRA
+
+
+class ProyeccionLocal:
+    """
+    Proyección equirectangular anclada en un origen (x = este, y = norte, en metros).
+    A las distancias de una ruta del robot el error frente a haversine es despreciable,
+    y cada conversión son dos multiplicaciones.
+    """
+
+    def __init__(self, lat0, lon0):
+        self.lat0 = float(lat0)
+        self.lon0 = float(lon0)
+        self._m_por_grado_lat = np.radians(1.0) * R_TIERRA
+        self._m_por_grado_lon = self._m_por_grado_lat * np.cos(np.radians(self.lat0))
+
+    def to_xy(self, lat, lon):
+        """
+        (lat, lon) en grados -> (x, y) en metros respecto al origen.
+        """
+        x = (np.asarray(lon, dtype=float) - self.lon0) * self._m_por_grado_lon
+        y = (np.asarray(lat, dtype=float) - self.lat0) * self._m_por_grado_lat
+        return x, y
+
+    def to_latlon(self, x, y):
+        """
+        (x, y) en metros -> (lat, lon) en grados.
+        """
+        lat = self.lat0 + np.asarray(y, dtype=float) / self._m_por_grado_lat
+        lon = self.lon0 + np.asarray(x, dtype=float) / self._m_por_grado_lon
+        return lat, lon
+
+
+def rumbo_xy(dx, dy):
+    """
+    Rumbo en grados (0 = norte, sentido horario) de un vector (dx este, dy norte).
+    """
+    return (np.degrees(np.arctan2(dx, dy)) + 360) % 360
+
+
+class Ruta:
+    """
+    Ruta de waypoints precalculada una sola vez: proyección local anclada en el primer
+    punto, vectores, longitudes y rumbos de cada tramo y distancia acumulada. Las consultas
+    por iteración del lazo de navegación son aritmética 2D sobre estos arrays.
+    """
+
+    def __init__(self, lats, lons, origen=None):
+        self.lats = np.asarray(lats, dtype=float)
+        self.lons = np.asarray(lons, dtype=float)
+        if self.lats.size == 0:
+            raise ValueError("La ruta no tiene puntos.")
+        if origen is None:
+            origen = (self.lats[0], self.lons[0])
+        self.proyeccion = ProyeccionLocal(*origen)
+        x, y = self.proyeccion.to_xy(self.lats, self.lons)
+        self.xy = np.column_stack((x, y))
+        self.tramos = np.diff(self.xy, axis=0)  # (N-1, 2)
+        self.longitudes = np.hypot(self.tramos[:, 0], self.tramos[:, 1])
+        self.rumbos = rumbo_xy(self.tramos[:, 0], self.tramos[:, 1])
+        # Distancia que falta desde el inicio de cada waypoint hasta el final de la ruta
+        self.restante_desde = np.concatenate((np.cumsum(self.longitudes[::-1])[::-1], [0.0]))
+        # Copias en listas de floats: las consultas por tick evitan el overhead de NumPy en escalares
+        self._puntos = self.xy.tolist()
+        self._restante = self.restante_desde.tolist()
+
+    @classmethod
+    def desde_coordenadas(cls, puntos, origen=None):
+        """
+        Crea la ruta a partir de objetos con .lat/.lng (como models.Coordenada).
+        """
+        return cls([p.lat for p in puntos], [p.lng for p in puntos], origen)
+
+    def __len__(self):
+        return len(self.xy)
+
+    def to_xy(self, lat, lon):
+        return self.proyeccion.to_xy(lat, lon)
+
+    def distancia_a(self, idx, x, y):
+        """
+        Distancia en metros desde (x, y) al waypoint idx.
+        """
+        px, py = self._puntos[idx]
+        return math.hypot(px - x, py - y)
+
+    def rumbo_a(self, idx, x, y):
+        """
+        Rumbo en grados desde (x, y) al waypoint idx.
+        """
+        px, py = self._puntos[idx]
+        return math.degrees(math.atan2(px - x, py - y)) % 360
+
+    def distancia_restante(self, idx, x, y):
+        """
+        Distancia que falta para terminar la ruta yendo primero al waypoint idx.
+        """
+        return self.distancia_a(idx, x, y) + self._restante[idx]
+
+    def progreso_tramo(self, idx, x, y):
+        """
+        (along, cross) de (x, y) respecto al tramo que termina en el waypoint idx (idx >= 1).
+        along: metros recorridos del tramo; cross: desvío lateral, positivo a la derecha.
+        """
+        ax, ay = self._puntos[idx - 1]
+        bx, by = self._puntos[idx]
+        tx, ty = bx - ax, by - ay
+        largo = math.hypot(tx, ty)
+        if largo == 0:
+            return 0.0, 0.0
+        px, py = x - ax, y - ay
+        along = (px * tx + py * ty) / largo
+        cross = (px * ty - py * tx) / largo
+        return along, cross
@@ -1,5 +1,8 @@
+import time
+from collections import Counter, deque
 import cv2
 import mediapipe as mp
+import numpy as np
 
 mp_hands = mp.solutions.hands
 mp_drawing = mp.solutions.drawing_utils
@@ -7,6 +10,46 @@ mp_drawing = mp.solutions.drawing_utils
 # Índices de los puntos de referencia de los dedos
 FINGER_TIPS = [4, 8, 12, 16, 20]  # Pulgar, índice, medio, anular, meñique
 FINGER_PIPS = [2, 6, 10, 14, 18]  # Articulaciones intermedias
+_BITS = 1 << np.arange(5)  # Código de un gesto: bit i = dedo i extendido
+
+# Acción de cada gesto, por código (ver codigo_gesto). Cualquier otra mano es "stop".
+ACCIONES_GESTOS = {
+    0b00000: "forward",  # Puño
+    0b11111: "backward",  # Mano abierta
+    0b00010: "right",  # Solo índice
+    0b00110: "left",  # Índice y medio
+    0b00100: "spin",  # Solo medio
+}
+
+
+def landmarks_array(hand_landmarks):
+    """
+    Los 21 landmarks de una mano de MediaPipe como un array (21, 3) de x, y, z.
+    Si ya es un array se devuelve tal cual.
+    """
+    if isinstance(hand_landmarks, np.ndarray):
+        return hand_landmarks
+    return np.array([(lm.x, lm.y, lm.z) for lm in hand_landmarks.landmark], dtype=np.float32)
+
+
+def estados_dedos(puntos):
+    """
+    Dedos extendidos a partir de landmarks (..., 21, 3): array booleano (..., 5)
+    [pulgar, índice, medio, anular, meñique]. Acepta una mano o un lote de manos.
+    """
+    tips = puntos[..., FINGER_TIPS, :]
+    pips = puntos[..., FINGER_PIPS, :]
+    # Pulgar: comparar x (horizontal); los demás dedos: y (vertical, crece hacia abajo)
+    extendidos = tips[..., 1] < pips[..., 1]
+    extendidos[..., 0] = tips[..., 0, 0] > pips[..., 0, 0]
+    return extendidos
+
+
+def codigo_gesto(extendidos):
+    """
+    Código entero (0-31) de los dedos extendidos, para usar como clave de tabla.
+    """
+    return int(extendidos @ _BITS) if extendidos.ndim == 1 else extendidos @ _BITS
 
 
 def dedos_extendidos(hand_landmarks):
@@ -14,37 +57,80 @@ def dedos_extendidos(hand_landmarks):
     Recibe landmarks de una mano y retorna una lista booleana indicando si cada dedo está extendido.
     [pulgar, índice, medio, anular, meñique]
     """
-    dedos = []
-    # Pulgar: comparar x (horizontal) porque la mano puede estar rotada
-    if hand_landmarks.landmark[FINGER_TIPS[0]].x > hand_landmarks.landmark[FINGER_PIPS[0]].x:
-        dedos.append(True)
-    else:
-        dedos.append(False)
-    # Otros dedos: comparar y (vertical)
-    for tip, pip in zip(FINGER_TIPS[1:], FINGER_PIPS[1:]):
-        if hand_landmarks.landmark[tip].y < hand_landmarks.landmark[pip].y:
-            dedos.append(True)
-        else:
-            dedos.append(False)
-    return dedos
+    return estados_dedos(landmarks_array(hand_landmarks)).tolist()
+
+
+class MotorGestos:
+    """
+    Clasificación temporal de gestos. Cada inferencia vota por un código de gesto (o None
+    si no hubo mano) en una ventana deslizante; el gesto activo cambia solo cuando otro
+    junta al menos `entrar` votos y se suelta cuando el propio baja de `salir` votos
+    (histéresis). Los votos más viejos que max_edad segundos se descartan, así saltar
+    frames de inferencia no deja votos rancios. La acción sale de una tabla por código.
+    """
+
+    def __init__(self, tabla=None, ventana=5, entrar=3, salir=2, max_edad=1.0, accion_otro="stop"):
+        if not 0 < salir <= entrar <= ventana:
+            raise ValueError("Se requiere 0 < salir <= entrar <= ventana")
+        self.tabla = ACCIONES_GESTOS if tabla is None else tabla
+        self.ventana = ventana
+        self.entrar = entrar
+        self.salir = salir
+        self.max_edad = max_edad
+        self.accion_otro = accion_otro
+        self.votos = deque(maxlen=ventana)  # (t, código o None)
+        self.gesto = None  # Código del gesto activo
+        self.cambios = 0
+
+    @property
+    def accion(self):
+        """
+        Acción del gesto activo, o None si no hay gesto estable.
+        """
+        if self.gesto is None:
+            return None
+        return self.tabla.get(self.gesto, self.accion_otro)
+
+    def reset(self):
+        self.votos.clear()
+        self.gesto = None
+
+    def actualizar(self, hand_landmarks, t=None):
+        """
+        Registra el resultado de una inferencia (landmarks o None) y devuelve la acción activa.
+        """
+        if t is None:
+            t = time.monotonic()
+        codigo = None if hand_landmarks is None else codigo_gesto(estados_dedos(landmarks_array(hand_landmarks)))
+        self.votos.append((t, codigo))
+        while self.votos and t - self.votos[0][0] > self.max_edad:
+            self.votos.popleft()
+        conteo = Counter(c for _, c in self.votos)
+        candidato, n = conteo.most_common(1)[0]
+        if self.gesto is not None and conteo[self.gesto] < self.salir:
+            self.gesto = None
+            self.cambios += 1
+        if candidato is not None and candidato != self.gesto and n >= self.entrar:
+            self.gesto = candidato
+            self.cambios += 1
+        return self.accion
 
 
 def modo_gestos(robot):
     """
     Modo de gestos: procesa frames y detecta qué dedos están extendidos usando MediaPipe.
     """
-    with mp_hands.Hands(static_image_mode=False, max_num_hands=1, min_detection_confidence=0.9) as hands:
+    frames = robot.subscribe_frames("gestos_debug")
+    with frames, mp_hands.Hands(static_image_mode=False, max_num_hands=1, min_detection_confidence=0.9) as hands:
         while True:
             if robot.current_mode != "gestos":
                 print("Modo gestos detenido.")
                 break
-            if robot.camera is None:
-                print("Error: Cámara no inicializada.")
-                continue
-            frame = robot.camera.capture_array()
-            if frame is None:
+            item = frames.read()
+            if item is None:
                 print("Error: No se pudo capturar frame de la cámara.")
                 continue
+            _, _, frame = item
             frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
             results = hands.process(frame_rgb)
             if results.multi_hand_landmarks:
@@ -1,67 +1,255 @@
+import logging
 import serial
 import time
-import pynmea2
+import threading
+import nmea
+from dataclasses import dataclass
+from typing import Optional
+
+log = logging.getLogger("ferb.gps")
+
+# Bytes sin fin de línea que se guardan entre lecturas. Una sentencia NMEA tiene a lo sumo
+# 82; más que esto es ruido o un baudrate equivocado.
+MAX_PENDIENTE = 512
+
+
+@dataclass(frozen=True)
+class GPSFix:
+    """
+    Último fix publicado por el lector del GPS. Es inmutable: el lector reemplaza la
+    referencia completa, así que cualquier hilo puede leerlo sin locks.
+    """
+
+    seq: int
+    lat: float
+    lon: float
+    timestamp: float  # time.monotonic() al recibir la sentencia RMC
+    satellites: Optional[int] = None  # GGA
+    hdop: Optional[float] = None  # GGA
+    speed_kmh: Optional[float] = None  # RMC/VTG
+    course: Optional[float] = None  # RMC/VTG, grados verdaderos
+
+    @property
+    def age(self):
+        """
+        Segundos desde que se recibió el fix.
+        """
+        return time.monotonic() - self.timestamp
+
+    def as_dict(self):
+        return {"lat": self.lat, "lon": self.lon}
+
 
 class GPS:
-    def __init__(self, port="/dev/ttyAMA0", baudrate=38400, timeout=0.5):
+    def __init__(self, port="/dev/ttyAMA0", baudrate=38400, timeout=0.5, source=None):
         """
         Initialize the GPS module with the specified serial port and settings.
+        source: fuente NMEA alternativa (ver gps_sources.GPSSource); si se indica no se abre el puerto.
         """
         self.port = port
         self.baudrate = baudrate
         self.timeout = timeout
         self.ser = None
-        self.connect()
-        
+        self.max_fix_age = 2.0  # Segundos tras los que read_data considera viejo el fix
+        # Lector en segundo plano
+        self.fix = None  # Último GPSFix publicado
+        self.sentences_read = 0
+        self.bytes_discarded = 0  # Ruido sin fin de línea descartado por el lector
+        self._reader_thread = None
+        self._reader_running = False
+        self._fix_cond = threading.Condition()
+        self._gga = {}
+        self._vtg = {}
+        if source is not None:
+            self.ser = source
+        else:
+            self.connect()
+
     def connect(self):
         """
         Connect to the GPS module.
         """
         try:
             self.ser = serial.Serial(self.port, self.baudrate, timeout=self.timeout)
-            print(f"Connected to GPS on {self.port} at {self.baudrate} baud.")
+            log.info("Connected to GPS on %s at %s baud.", self.port, self.baudrate)
         except serial.SerialException as e:
-            print(f"Failed to connect to GPS: {e}")
+            log.error("Failed to connect to GPS: %s", e)
+
+    def start_reader(self):
+        """
+        Inicia un hilo que drena el UART continuamente, procesa todas las sentencias NMEA
+        y publica el fix más reciente en self.fix.
+        """
+        if self._reader_running:
+            return
+        self._reader_running = True
+        self._reader_thread = threading.Thread(target=self._reader_loop)
+        self._reader_thread.daemon = True
+        self._reader_thread.start()
+
+    def stop_reader(self):
+        """
+        Detiene el hilo lector.
+        """
+        self._reader_running = False
+        with self._fix_cond:
+            self._fix_cond.notify_all()
+        if self._reader_thread and threading.current_thread() != self._reader_thread:
+            self._reader_thread.join(timeout=2)
+        self._reader_thread = None
+
+    def _read_chunk(self):
+        # Con pyserial se lee todo lo disponible de una vez; otras fuentes entregan líneas
+        waiting = getattr(self.ser, "in_waiting", 0)
+        if waiting:
+            return self.ser.read(waiting)
+        return self.ser.readline()
+
+    def _recortar(self, pending):
+        """
+        Limita los bytes pendientes: si el stream no trae fin de línea, se conserva solo
+        desde el último "$" (el comienzo de la sentencia en curso), o nada.
+        """
+        if len(pending) <= MAX_PENDIENTE:
+            return pending
+        inicio = pending.rfind(b"$")
+        resto = pending[inicio:] if inicio >= 0 and len(pending) - inicio <= MAX_PENDIENTE else b""
+        self.bytes_discarded += len(pending) - len(resto)
+        return resto
+
+    def _reader_loop(self):
+        pending = b""
+        while self._reader_running:
+            if not self.ser or not self.ser.is_open:
+                time.sleep(1)
+                continue
+            try:
+                chunk = self._read_chunk()
+                if not chunk:
+                    continue
+                self.sentences_read += chunk.count(b"\n")
+                sentences, pending = nmea.parse_buffer(pending + chunk)
+                pending = self._recortar(pending)
+                for sentence in sentences:
+                    self._handle(sentence)
+            except serial.SerialException as e:
+                log.error("GPS: Error leyendo el puerto serial: %s", e)
+                time.sleep(1)
+            except Exception:
+                # Cualquier otro error no debe matar el hilo en silencio
+                log.exception("GPS: Error inesperado en el lector")
+                pending = b""
+                time.sleep(1)
+
+    def process_sentence(self, line):
+        """
+        Procesa una sentencia NMEA (bytes o str). Las GGA/VTG se guardan para enriquecer
+        el siguiente fix; una RMC válida publica un GPSFix nuevo.
+        """
+        if isinstance(line, str):
+            line = line.encode("ascii", "ignore")
+        self.sentences_read += 1
+        sentence = nmea.parse_sentence(line)
+        if sentence is not None:
+            self._handle(sentence)
+
+    def _handle(self, sentence):
+        kind = sentence[0]
+        if kind == nmea.GGA:
+            _, _, satellites, hdop, _, _ = sentence
+            self._gga = {"satellites": satellites, "hdop": hdop}
+        elif kind == nmea.VTG:
+            _, course, speed_kmh = sentence
+            self._vtg = {"speed_kmh": speed_kmh, "course": course}
+        elif kind == nmea.RMC:
+            _, valid, lat, lon, speed_knots, course = sentence
+            if not valid or lat is None or lon is None or (lat == 0.0 and lon == 0.0):
+                return
+            self._publish(
+                lat,
+                lon,
+                speed_kmh=speed_knots * 1.852 if speed_knots is not None else self._vtg.get("speed_kmh"),
+                course=course if course is not None else self._vtg.get("course"),
+            )
+
+    def _publish(self, lat, lon, speed_kmh=None, course=None):
+        previous = self.fix
+        fix = GPSFix(
+            seq=previous.seq + 1 if previous else 0,
+            lat=lat,
+            lon=lon,
+            timestamp=time.monotonic(),
+            satellites=self._gga.get("satellites"),
+            hdop=self._gga.get("hdop"),
+            speed_kmh=speed_kmh,
+            course=course,
+        )
+        with self._fix_cond:
+            self.fix = fix
+            self._fix_cond.notify_all()
+
+    def latest_fix(self, max_age=None):
+        """
+        Devuelve el último GPSFix en O(1), o None si no hay fix o es más viejo que max_age.
+        """
+        fix = self.fix
+        if fix is None or (max_age is not None and fix.age > max_age):
+            return None
+        return fix
+
+    def wait_for_fix(self, after_seq=-1, timeout=None):
+        """
+        Espera un fix con seq mayor que after_seq (por defecto cualquier fix).
+        Devuelve el GPSFix, o None si vence el timeout.
+        """
+        with self._fix_cond:
+            self._fix_cond.wait_for(
+                lambda: not self._reader_running or (self.fix is not None and self.fix.seq > after_seq),
+                timeout,
+            )
+            fix = self.fix
+        if fix is None or fix.seq <= after_seq:
+            return None
+        return fix
 
     def read_data(self):
+        """
+        Devuelve {"lat", "lon"} del último fix válido, o None si no hay fix.
+        Con el lector en segundo plano activo no toca el puerto serial.
+        """
+        if self._reader_running:
+            fix = self.latest_fix(self.max_fix_age)
+            return fix.as_dict() if fix else None
+
         if not self.ser or not self.ser.is_open:
-            print("GPS not connected.")
+            log.warning("GPS not connected.")
             return None
 
         try:
-            newdata = self.ser.readline().decode('utf-8').strip()
-            if newdata.startswith(("$GNRMC", "$GPRMC")): # BN220 can output GNRMC or GPRMC
-                msg = pynmea2.parse(newdata)
-                # Check for GPS fix indicator (e.g., A = valid, V = invalid)
-                # For RMC, the status character is at position 2 of the parsed message.
-                if hasattr(msg, 'status') and msg.status == 'A':
-                    lat = msg.latitude
-                    lng = msg.longitude
-                    if lat != 0.0 or lng != 0.0: # Check if coordinates are truly zero
-                        return {"lat": lat, "lon": lng}
-                    else:
-                        print("GPS: Coordenadas 0.0, 0.0 - Posiblemente sin fix válido.")
-                        return None # Return None for no valid fix
-                else:
-                    # print(f"GPS: RMC sin fix válido: {newdata}") # For debugging
-                    return None
-            # else:
-                # print(f"GPS: Ignorando mensaje: {newdata}") # For debugging other NMEA sentences
-            return None # Return None if not a GNRMC or invalid
-        except (pynmea2.ParseError, UnicodeDecodeError) as e:
-            print(f"Error parsing GPS data: {e}")
-            return None
+            sentence = nmea.parse_sentence(self.ser.readline(), types=(nmea.RMC,))  # GNRMC o GPRMC
+            if sentence is None:
+                return None  # Not an RMC sentence or invalid checksum
+            _, valid, lat, lng, _, _ = sentence
+            # Check for GPS fix indicator (A = valid, V = invalid)
+            if not valid or lat is None or lng is None:
+                return None
+            if lat != 0.0 or lng != 0.0:  # Check if coordinates are truly zero
+                return {"lat": lat, "lon": lng}
+            log.info("GPS: Coordenadas 0.0, 0.0 - Posiblemente sin fix válido.")
+            return None  # Return None for no valid fix
         except serial.SerialTimeoutException:
-            print("GPS: Timeout reading serial data.") # For debugging
+            log.debug("GPS: Timeout reading serial data.")
             return None
 
     def close(self):
         """
         Close the GPS connection.
         """
+        self.stop_reader()
         if self.ser and self.ser.is_open:
             self.ser.close()
-            print("GPS connection closed.")
+            log.info("GPS connection closed.")
+
     def run(self):
         """
         Continuously read and print GPS data.
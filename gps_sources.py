@@ -0,0 +1,194 @@
+import abc
+import os
+import threading
+import time
+import nmea
+
+
+class GPSSource(abc.ABC):
+    """
+    Interfaz de una fuente de sentencias NMEA para GPS. Es el subconjunto de serial.Serial
+    que usa la clase GPS, así que un serial.Serial abierto también sirve como fuente.
+    Una subclase sin readline() falla al crearse, no en el hilo lector.
+    """
+
+    is_open = False
+
+    @abc.abstractmethod
+    def readline(self):
+        """
+        Devuelve la siguiente sentencia como bytes terminada en b"\\r\\n", o b"" si no hay datos.
+        """
+
+    def close(self):
+        self.is_open = False
+
+
+def extract_sentence(line):
+    """
+    Extrae la sentencia NMEA de una línea de log. Acepta NMEA crudo y las líneas que
+    graba log_gps_stream.py ("data: Received: $GNRMC,...").
+    Devuelve bytes sin fin de línea, o None si la línea no contiene NMEA.
+    """
+    if isinstance(line, str):
+        line = line.encode("ascii", "ignore")
+    start = line.find(b"$")
+    if start < 0:
+        return None
+    return line[start:].strip()
+
+
+def load_sentences(path):
+    """
+    Lee un log y devuelve la lista de sentencias NMEA que contiene.
+    """
+    sentences = []
+    with open(path, "rb") as f:
+        for line in f:
+            sentence = extract_sentence(line)
+            if sentence:
+                sentences.append(sentence)
+    return sentences
+
+
+def _nmea_seconds(sentence):
+    """
+    Segundos del día del campo hhmmss.ss de una RMC/GGA, o None si está vacío.
+    """
+    fields = sentence.split(b",", 2)
+    if len(fields) < 2 or len(fields[1]) < 6:
+        return None
+    try:
+        t = fields[1]
+        return int(t[0:2]) * 3600 + int(t[2:4]) * 60 + float(t[4:])
+    except ValueError:
+        return None
+
+
+class ReplaySource(GPSSource):
+    """
+    Reproduce sentencias NMEA grabadas (por ejemplo gps_stream.log).
+    speed=1 reproduce en tiempo real, speed=N N veces más rápido y speed=None lo más rápido posible.
+    El ritmo sale de la hora de las sentencias RMC; si está vacía se usa epoch_period por RMC.
+    """
+
+    def __init__(self, path=None, sentences=None, speed=1.0, epoch_period=1.0, loop=False):
+        self.sentences = sentences if sentences is not None else load_sentences(path)
+        self.speed = speed
+        self.epoch_period = epoch_period
+        self.loop = loop
+        self.is_open = True
+        self.index = 0
+        self._last_epoch = None  # (hora NMEA, time.monotonic()) de la última RMC entregada
+
+    def _pace(self, sentence):
+        if not self.speed or sentence[3:6] != b"RMC":
+            return
+        now = time.monotonic()
+        nmea_t = _nmea_seconds(sentence)
+        if self._last_epoch is not None:
+            last_nmea_t, last_wall = self._last_epoch
+            if nmea_t is not None and last_nmea_t is not None and nmea_t > last_nmea_t:
+                period = nmea_t - last_nmea_t
+            else:
+                period = self.epoch_period
+            delay = last_wall + period / self.speed - now
+            if delay > 0:
+                time.sleep(delay)
+                now += delay
+        self._last_epoch = (nmea_t, now)
+
+    def readline(self):
+        if not self.is_open:
+            return b""
+        if self.index >= len(self.sentences):
+            if not self.loop or not self.sentences:
+                self.is_open = False
+                return b""
+            self.index = 0
+            self._last_epoch = None
+        sentence = self.sentences[self.index]
+        self.index += 1
+        self._pace(sentence)
+        return sentence + b"\r\n"
+
+
+class PtyReplay:
+    """
+    Escribe una ReplaySource en un pseudo-terminal. self.port es la ruta del lado esclavo,
+    que se puede pasar a GPS(port=...) para probar también el camino de pyserial.
+    """
+
+    def __init__(self, source):
+        self.source = source
+        self._master, slave = os.openpty()
+        self.port = os.ttyname(slave)
+        self._slave = slave
+        self._running = True
+        self._thread = threading.Thread(target=self._write_loop)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def _write_loop(self):
+        while self._running:
+            line = self.source.readline()
+            if not line:
+                break
+            os.write(self._master, line)
+
+    def close(self):
+        self._running = False
+        self.source.close()
+        for fd in (self._master, self._slave):
+            try:
+                os.close(fd)
+            except OSError:
+                pass
+
+
+def _nmea(body):
+    body = body.encode("ascii")
+    return b"$" + body + f"*{nmea.checksum(body):02X}".encode("ascii")
+
+
+def _nmea_coord(value, is_lat):
+    hemi = ("N" if value >= 0 else "S") if is_lat else ("E" if value >= 0 else "W")
+    value = abs(value)
+    degrees = int(value)
+    minutes = round((value - degrees) * 60, 5)
+    if minutes >= 60:
+        # 59.999999' se redondea a 60.00000': pasa al grado siguiente
+        degrees += 1
+        minutes -= 60
+    if is_lat:
+        return f"{degrees:02d}{minutes:08.5f},{hemi}"
+    return f"{degrees:03d}{minutes:08.5f},{hemi}"
+
+
+def synthesize_epoch(lat, lon, seconds, speed_kmh=0.0, course=0.0, satellites=8, hdop=0.9):
+    """
+    Genera las sentencias GGA, VTG y RMC de un epoch con fix en la posición dada.
+    seconds es la hora del día en segundos.
+    """
+    h = int(seconds // 3600) % 24
+    m = int(seconds % 3600 // 60)
+    s = seconds % 60
+    hms = f"{h:02d}{m:02d}{s:05.2f}"
+    lat_s = _nmea_coord(lat, True)
+    lon_s = _nmea_coord(lon, False)
+    knots = speed_kmh / 1.852
+    return [
+        _nmea(f"GNGGA,{hms},{lat_s},{lon_s},1,{satellites:02d},{hdop:.2f},50.0,M,0.0,M,,"),
+        _nmea(f"GNVTG,{course:.1f},T,,M,{knots:.3f},N,{speed_kmh:.3f},K,A"),
+        _nmea(f"GNRMC,{hms},A,{lat_s},{lon_s},{knots:.3f},{course:.1f},010125,,,A,V"),
+    ]
+
+
+def synthesize_route(points, rate_hz=1.0, start_seconds=12 * 3600):
+    """
+    Genera sentencias NMEA con un epoch por cada (lat, lon) de points, a rate_hz epochs por segundo.
+    """
+    sentences = []
+    for i, (lat, lon) in enumerate(points):
+        sentences.extend(synthesize_epoch(lat, lon, start_seconds + i / rate_hz))
+    return sentences
@@ -0,0 +1,113 @@
+"""
+Capa de abstracción del hardware de Ferb. Un backend construye los motores (robot), el GPS,
+la brújula y la cámara; Ferb sólo usa sus interfaces. El backend se elige con
+crear_hardware(backend) o con la variable de entorno FERB_BACKEND ("hw", "gpiod" o "sim").
+"""
+
+import os
+from gps import GPS
+
+
+class HardwareReal:
+    """
+    Hardware de la Raspberry Pi: motores por gpiozero, GPS en /dev/ttyAMA0,
+    brújula QMC5883L en el bus I2C 4 y Picamera2.
+    """
+
+    camera_warmup = 2  # Segundos que tarda el sensor de la cámara en estabilizarse
+
+    def __init__(self, left_motor_pins=(21, 26), right_motor_pins=(0, 25), enable_pins=(18, 27)):
+        from brujula import Brujula
+
+        self.robot = self._crear_robot(left_motor_pins, right_motor_pins, enable_pins)
+        self.gps = GPS()
+        self.brujula = Brujula(
+            i2c_bus=4,
+            calibration=Brujula.UCAB_CALIBRATION,
+            declination=Brujula.UCAB_DECLINATION,
+        )
+
+    def _crear_robot(self, left_motor_pins, right_motor_pins, enable_pins):
+        from gpiozero import Robot, Motor
+
+        return Robot(
+            left=Motor(*left_motor_pins, enable=enable_pins[0]),
+            right=Motor(*right_motor_pins, enable=enable_pins[1]),
+        )
+
+    def crear_camara(self):
+        from picamera2 import Picamera2
+
+        return Picamera2()
+
+    def close(self):
+        self.robot.close()
+
+
+class HardwareGpiod(HardwareReal):
+    """
+    Como HardwareReal, pero los motores van por libgpiod (ver motores_gpiod.py): un solo bulk
+    request para todas las líneas y PWM por software, o por el kernel con pwm="sysfs"
+    (ENA/ENB en pines de PWM por hardware: 12 o 18 y 13 o 19, p. ej. enable_pins=(18, 13)).
+    """
+
+    def __init__(
+        self,
+        left_motor_pins=(21, 26),
+        right_motor_pins=(0, 25),
+        enable_pins=(18, 27),
+        chip="gpiochip0",
+        pwm="software",
+    ):
+        self.chip = chip
+        self.pwm = pwm
+        super().__init__(left_motor_pins, right_motor_pins, enable_pins)
+
+    def _crear_robot(self, left_motor_pins, right_motor_pins, enable_pins):
+        from motores_gpiod import MotoresGpiod, PWMSoftware, PWMSysfs
+
+        pwm = PWMSysfs(pines=enable_pins) if self.pwm == "sysfs" else PWMSoftware()
+        return MotoresGpiod(left_motor_pins, right_motor_pins, enable_pins, chip=self.chip, pwm=pwm)
+
+
+class HardwareSimulado:
+    """
+    Robot simulado sin hardware (ver simulador.py). El mundo integra la física en tiempo
+    real; se puede acceder a él con .mundo para colocar la pelota, obstáculos o leer la pose.
+    """
+
+    camera_warmup = 0
+    signo_giro = 1  # Las ruedas simuladas siguen movimiento.DIRECCIONES (ver perrito.SIGNO_GIRO)
+
+    def __init__(self, left_motor_pins=None, right_motor_pins=None, mundo=None, gps_rate_hz=1.0, seed=None):
+        """
+        Los pines de los motores se aceptan por compatibilidad con HardwareReal y se ignoran.
+        """
+        import simulador
+
+        self.mundo = mundo or simulador.MundoSimulado(seed=seed)
+        self.robot = simulador.RobotSimulado(self.mundo)
+        self.gps = GPS(source=simulador.FuenteGPSSimulada(self.mundo, rate_hz=gps_rate_hz))
+        self.brujula = simulador.BrujulaSimulada(self.mundo)
+        self._simulador = simulador
+        self.mundo.start()
+
+    def crear_camara(self):
+        return self._simulador.CamaraSimulada(self.mundo)
+
+    def close(self):
+        self.robot.close()
+        self.mundo.stop()
+
+
+BACKENDS = {"hw": HardwareReal, "gpiod": HardwareGpiod, "sim": HardwareSimulado}
+
+
+def crear_hardware(backend=None, **kwargs):
+    """
+    Construye el backend indicado, o el de FERB_BACKEND si es None (por defecto "hw").
+    """
+    backend = backend or os.environ.get("FERB_BACKEND", "hw")
+    if backend not in BACKENDS:
+        raise ValueError(f"Backend desconocido: {backend}. Opciones: {', '.join(BACKENDS)}")
+    return BACKENDS[backend](**kwargs)
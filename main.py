@@ -1,11 +1,17 @@
+import asyncio
+import json
+import logging
+from typing import Literal
 from fastapi import FastAPI, HTTPException
 from fastapi.responses import StreamingResponse
 from contextlib import asynccontextmanager
-from models import MoveRequest, ModeRequest, NavigationRequest
+from models import MoveRequest, ModeRequest, NavigationRequest, LogLevelRequest
 from ferb import Ferb
+import registro
 from fastapi.staticfiles import StaticFiles
 
 robot = None
+log = logging.getLogger("ferb.api")
 
 
 @asynccontextmanager
@@ -14,9 +20,12 @@ async def lifespan(app: FastAPI):
     Initialize the robot on startup.
     """
     global robot
+    # Logs en un hilo aparte: los lazos de control solo encolan (ver registro.py)
+    registro.configurar()
     robot = Ferb()
     yield
     robot.cleanup()
+    registro.close()
 
 
 app = FastAPI(
@@ -34,14 +43,16 @@ async def move(move_request: MoveRequest, continuous: bool = False):
     """
     Move the robot in the specified direction.
     Si continuous=True, el robot se moverá continuamente hasta recibir otra orden o stop.
+    Por seguridad se detiene si la orden no se repite en continuous_timeout segundos (2 s).
     """
     if robot is None:
         return {"message": "El robot no se ha inicializado"}
 
     if robot.current_mode == "manual":
-        print(
-            f"Moving robot - {move_request.direction} at speed {move_request.speed} (continuous={continuous})"
+        log.debug(
+            "Moving robot - %s at speed %s (continuous=%s)", move_request.direction, move_request.speed, continuous
         )
+        # move() no bloquea: el planificador de movimiento detiene el robot al vencer
         robot.move(move_request.direction, move_request.speed, continuous=continuous)
         return {
             "message": f"Se movió al robot - {move_request.direction} a velocidad {move_request.speed} (continuous={continuous})"
@@ -58,28 +69,23 @@ async def mode(mode_request: ModeRequest):
     """
     if robot is None:
         return {"message": "El robot no se ha inicializado"}
-    print(f"Changing mode to {mode_request.mode}")
-    robot.current_mode = mode_request.mode
-    if mode_request.mode != "dog":
-        if mode_request.mode == "gestos":
-            robot.stop_dog_thread()
-            robot.stop_obstaculos_thread()
-            robot.start_gestos_thread()
-        elif mode_request.mode == "obstaculos":
-            robot.stop_gestos_thread()
-            robot.stop_dog_thread()
-            robot.start_obstaculos_thread()
-        else:
-            robot.stop_obstaculos_thread()
-            robot.stop_dog_thread()
-            robot.stop_gestos_thread()
-    else:
-        robot.stop_obstaculos_thread()
-        robot.stop_gestos_thread()
-        robot.start_dog_thread()
+    log.info("Changing mode to %s", mode_request.mode)
+    # No bloquea: el supervisor cancela el modo anterior y arranca el nuevo
+    robot.set_mode(mode_request.mode)
     return {"message": f"Changing mode to {mode_request.mode}"}
 
 
+@app.get("/mode/stats")
+async def mode_stats():
+    """
+    Modo activo y latencia de los cambios de modo: pedido -> modo anterior detenido y nuevo
+    en marcha (ms, p50/p95, y el detalle del último cambio).
+    """
+    if robot is None:
+        return {"message": "El robot no se ha inicializado"}
+    return robot.mode_stats()
+
+
 @app.get("/camera/stream")
 async def camera_stream():
     """
@@ -89,13 +95,74 @@ async def camera_stream():
         return {"message": "El robot no se ha inicializado"}
     try:
         return StreamingResponse(
-            robot.camera_stream(),
+            robot.camera_stream_async(),
             media_type="multipart/x-mixed-replace; boundary=frame",
         )
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Camera error: {e}")
 
 
+@app.get("/camera/stats")
+async def camera_stats():
+    """
+    Estadísticas del bus de frames: fps de captura y fps/frames descartados por consumidor.
+    """
+    if robot is None:
+        return {"message": "El robot no se ha inicializado"}
+    return robot.frame_stats()
+
+
+@app.get("/gestos/stats")
+async def gestos_stats():
+    """
+    Métricas del modo gestos: ms de inferencia y latencia gesto -> motor (p50/p95).
+    """
+    if robot is None:
+        return {"message": "El robot no se ha inicializado"}
+    return robot.gesture_stats()
+
+
+@app.get("/metrics")
+async def metrics():
+    """
+    Latencia por etapa de los modos (entrega del frame, inferencia, decisión, motores y
+    total desde la captura) y despacho del planificador de movimiento, en ms p50/p95/p99.
+    """
+    if robot is None:
+        return {"message": "El robot no se ha inicializado"}
+    return robot.metrics()
+
+
+@app.get("/log/")
+async def log_stats():
+    """
+    Nivel de cada logger, archivo JSON lines y mensajes suprimidos por el límite de frecuencia.
+    """
+    return {"niveles": registro.niveles(), **registro.stats()}
+
+
+@app.post("/log/level")
+async def log_level(level_request: LogLevelRequest):
+    """
+    Cambia el nivel de log en caliente, de todo Ferb o de un módulo (p. ej. "ferb.perrito").
+    """
+    try:
+        registro.set_level(level_request.level, level_request.logger)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"niveles": registro.niveles()}
+
+
+@app.get("/perrito/stats")
+async def perrito_stats():
+    """
+    Métricas del modo perrito: ruedas y reacción captura -> comando de motores (p50/p95).
+    """
+    if robot is None:
+        return {"message": "El robot no se ha inicializado"}
+    return robot.dog_stats()
+
+
 @app.get("/gps/stream")
 async def gps_stream():
     """
@@ -104,7 +171,7 @@ async def gps_stream():
     if robot is None:
         return {"message": "El robot no se ha inicializado"}
     try:
-        return StreamingResponse(robot.gps_stream(), media_type="text/event-stream")
+        return StreamingResponse(robot.gps_stream_async(), media_type="text/event-stream")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"GPS error: {e}")
 
@@ -117,7 +184,7 @@ async def compass_stream():
     if robot is None:
         return {"message": "El robot no se ha inicializado"}
     try:
-        return StreamingResponse(robot.compass_stream(), media_type="text/event-stream")
+        return StreamingResponse(robot.compass_stream_async(), media_type="text/event-stream")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Compass error: {e}")
 
@@ -125,10 +192,80 @@ async def compass_stream():
 @app.post("/start-navigation/")
 async def start_navigation(navigation_request: NavigationRequest):
     """
-    Iniciar navegación especificando una ruta.
+    Encolar la navegación de una ruta. Responde de inmediato con el id del trabajo.
+    Al arrancar, el robot pasa al modo navegacion y se cancela el modo activo; cambiar a
+    otro modo detiene la navegación y cancela las rutas en cola.
+    """
+    if robot is None:
+        return {"message": "El robot no se ha inicializado"}
+    if not navigation_request.ruta:
+        raise HTTPException(status_code=400, detail="No hay puntos en la ruta.")
+
+    trabajo = robot.start_navigation(navigation_request.ruta)
+    return {"message": f"Navegación {trabajo.id} en cola", "job_id": trabajo.id}
+
+
+def _get_trabajo(job_id):
+    trabajo = robot.navegacion.get(job_id)
+    if trabajo is None:
+        raise HTTPException(status_code=404, detail=f"No existe la navegación {job_id}")
+    return trabajo
+
+
+@app.get("/navigation/")
+async def navigation_list():
+    """
+    Listar las navegaciones en cola, en curso y recientes.
+    """
+    if robot is None:
+        return {"message": "El robot no se ha inicializado"}
+    return {"jobs": robot.navegacion.listar()}
+
+
+@app.get("/navigation/{job_id}")
+async def navigation_status(job_id: str):
+    """
+    Progreso de una navegación: tramo actual, distancia restante y ETA.
+    """
+    if robot is None:
+        return {"message": "El robot no se ha inicializado"}
+    return _get_trabajo(job_id).to_dict()
+
+
+@app.post("/navigation/{job_id}/{action}")
+async def navigation_action(job_id: str, action: Literal["cancel", "pause", "resume"]):
+    """
+    Cancelar, pausar o reanudar una navegación.
     """
     if robot is None:
         return {"message": "El robot no se ha inicializado"}
+    trabajo = _get_trabajo(job_id)
+    if action == "cancel":
+        trabajo.cancelar()
+    elif action == "pause":
+        trabajo.pausar()
+    else:
+        trabajo.reanudar()
+    return trabajo.to_dict()
+
+
+@app.get("/navigation/{job_id}/stream")
+async def navigation_stream(job_id: str):
+    """
+    Stream del progreso de una navegación (Server-Sent Events) hasta que termine.
+    """
+    if robot is None:
+        return {"message": "El robot no se ha inicializado"}
+    trabajo = _get_trabajo(job_id)
+
+    async def eventos():
+        version = -1
+        while True:
+            if trabajo.version != version:
+                version = trabajo.version
+                yield f"data: {json.dumps(trabajo.to_dict())}\n\n"
+            if trabajo.terminado_ok:
+                break
+            await asyncio.sleep(0.5)
 
-    robot.start_navigation(navigation_request.ruta)
-    return {"message": "Navegación terminada"}
+    return StreamingResponse(eventos(), media_type="text/event-stream")
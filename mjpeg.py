@@ -0,0 +1,226 @@
+import asyncio
+import logging
+import queue
+import threading
+import cv2
+
+log = logging.getLogger("ferb.mjpeg")
+
+
+def mjpeg_part(jpeg_bytes):
+    """
+    Envuelve un JPEG como una parte del stream multipart/x-mixed-replace.
+    """
+    return b"--frame\r\nContent-Type: image/jpeg\r\n\r\n" + jpeg_bytes + b"\r\n"
+
+
+class MjpegClient:
+    """
+    Cola acotada de un espectador. Si el cliente es lento se descartan los frames viejos.
+    """
+
+    def __init__(self, broadcaster, max_queue=2):
+        self.broadcaster = broadcaster
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.sent = 0
+        self.dropped = 0
+        self.closed = False
+
+    def push(self, part):
+        while True:
+            try:
+                self.queue.put_nowait(part)
+                return
+            except queue.Full:
+                try:
+                    self.queue.get_nowait()
+                    self.dropped += 1
+                except queue.Empty:
+                    pass
+
+    def get(self, timeout=1.0):
+        """
+        Devuelve la siguiente parte MJPEG, o None si vence el timeout o el cliente se cerró.
+        """
+        try:
+            part = self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+        if part is not None:
+            self.sent += 1
+        return part
+
+    def close(self):
+        self.broadcaster.unsubscribe(self)
+
+
+class AsyncMjpegClient(MjpegClient):
+    """
+    Variante de MjpegClient con una asyncio.Queue: el espectador espera en el event loop
+    sin ocupar un hilo del threadpool.
+    """
+
+    def __init__(self, broadcaster, max_queue=2):
+        self.broadcaster = broadcaster
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize=max_queue)
+        self.sent = 0
+        self.dropped = 0
+        self.closed = False
+
+    def push(self, part):
+        # Se llama desde el hilo codificador
+        try:
+            self.loop.call_soon_threadsafe(self._push, part)
+        except RuntimeError:
+            # El event loop ya se cerró
+            self.closed = True
+
+    def _push(self, part):
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.dropped += 1
+        self.queue.put_nowait(part)
+
+    async def get(self, timeout=1.0):
+        try:
+            part = await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+        if part is not None:
+            self.sent += 1
+        return part
+
+
+class MjpegBroadcaster:
+    """
+    Codifica cada frame del bus a JPEG una sola vez y reparte los mismos bytes a todos
+    los espectadores conectados. El hilo codificador solo corre mientras haya clientes.
+    """
+
+    def __init__(self, frame_bus, quality=80, max_queue=2):
+        self.frame_bus = frame_bus
+        self.quality = quality
+        self.max_queue = max_queue
+        self._clients = []
+        self._lock = threading.Lock()
+        self._thread = None
+        self._running = False
+        self.frames_encoded = 0
+        self.overlay = None  # Función opcional frame -> None que anota el frame antes de codificarlo
+
+    @property
+    def client_count(self):
+        return len(self._clients)
+
+    def subscribe(self, client_class=MjpegClient):
+        """
+        Registra un espectador y arranca el codificador si no estaba corriendo.
+        """
+        client = client_class(self, self.max_queue)
+        with self._lock:
+            self._clients.append(client)
+            if not self._running:
+                self._running = True
+                self._thread = threading.Thread(target=self._encode_loop)
+                self._thread.daemon = True
+                self._thread.start()
+        return client
+
+    def unsubscribe(self, client):
+        with self._lock:
+            client.closed = True
+            if client in self._clients:
+                self._clients.remove(client)
+
+    def stop(self):
+        """
+        Detiene el codificador y despierta a los espectadores para que terminen.
+        """
+        with self._lock:
+            self._running = False
+            clients = list(self._clients)
+            self._clients.clear()
+        for client in clients:
+            client.closed = True
+            client.push(None)
+        if self._thread and threading.current_thread() != self._thread:
+            self._thread.join(timeout=2)
+        self._thread = None
+
+    def _encode_loop(self):
+        params = [cv2.IMWRITE_JPEG_QUALITY, self.quality]
+        sub = self.frame_bus.subscribe("mjpeg")
+        try:
+            while self._running:
+                with self._lock:
+                    if not self._clients:
+                        self._running = False
+                        break
+                item = sub.read()
+                if item is None:
+                    if not self.frame_bus.running:
+                        break
+                    continue
+                overlay = self.overlay
+                if overlay is not None:
+                    # El buffer es privado de esta suscripción: se puede dibujar sobre él
+                    overlay(item[2])
+                ret, jpeg = cv2.imencode(".jpg", item[2], params)
+                if not ret:
+                    continue
+                part = mjpeg_part(jpeg.tobytes())
+                self.frames_encoded += 1
+                with self._lock:
+                    clients = list(self._clients)
+                for client in clients:
+                    client.push(part)
+        except Exception as e:
+            log.warning("MJPEG: error codificando frame: %s", e)
+        finally:
+            sub.close()
+            with self._lock:
+                clients = []
+                # Si ya arrancó otro codificador, sus clientes no son de este hilo
+                if self._thread is threading.current_thread():
+                    self._running = False
+                    clients = list(self._clients)
+                    self._clients.clear()
+            # Avisar a los espectadores que el stream terminó
+            for client in clients:
+                client.closed = True
+                client.push(None)
+
+    def stream(self, client):
+        """
+        Generador de partes MJPEG para un espectador.
+        """
+        try:
+            while not client.closed:
+                part = client.get()
+                if part is None:
+                    continue
+                yield part
+        finally:
+            client.close()
+
+    async def stream_async(self, client):
+        """
+        Generador async de partes MJPEG para un AsyncMjpegClient.
+        """
+        try:
+            while not client.closed:
+                part = await client.get()
+                if part is None:
+                    continue
+                yield part
+        finally:
+            client.close()
+
+    def stats(self):
+        with self._lock:
+            clients = list(self._clients)
+        return {
+            "frames_encoded": self.frames_encoded,
+            "clients": [{"sent": c.sent, "dropped": c.dropped} for c in clients],
+        }
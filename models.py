@@ -26,3 +26,10 @@ class NavigationRequest(BaseModel):
     """Representa una solicitud de navegación."""
 
     ruta: list[Coordenada] = []  # Lista de coordenadas GPS que forman la ruta
+
+
+class LogLevelRequest(BaseModel):
+    """Representa un cambio de nivel de log."""
+
+    level: Literal["DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL"] = "INFO"
+    logger: str = "ferb"  # "ferb" o un módulo, p. ej. "ferb.perrito"
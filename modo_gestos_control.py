@@ -1,77 +1,329 @@
-import cv2
+import logging
+import threading
+import time
+from collections import deque
+import numpy as np
 import mediapipe as mp
-from gestos import dedos_extendidos
-from time import sleep
+from gestos import MotorGestos
+from modos import TokenCancelacion
+from traza import Trazador, percentil
 
 mp_hands = mp.solutions.hands
 mp_drawing = mp.solutions.drawing_utils
 
+log = logging.getLogger("ferb.gestos")
 
-def modo_gestos_control(robot):
+# Ruedas (izquierda, derecha) y segundos que dura cada acción si no se repite el gesto
+ACCIONES = {
+    "forward": ((1, 1), 0.5),
+    "backward": ((-1, -1), 0.5),
+    "right": ((1, -1), 0.5),
+    "left": ((-1, 1), 0.5),
+    "spin": ((1, -1), 1.0),
+    "stop": ((0, 0), 0.0),
+}
+
+
+class InferenciaManos:
     """
-    Modo de gestos con control: mueve el robot según el gesto detectado.
-    Usa la picamera (robot.camera.capture_array()).
+    Worker de inferencia de MediaPipe Hands. Lee siempre el frame más reciente del bus
+    (los que llegan durante una inferencia se descartan) y, si en el frame anterior hubo
+    una mano, procesa solo un recorte cuadrado alrededor de ella. Los landmarks se
+    devuelven en coordenadas normalizadas del frame completo.
+    La ROI reemplaza al seguimiento propio de MediaPipe, que supone un frame completo y
+    estable entre llamadas: con usar_roi, hands tiene que crearse con
+    static_image_mode=True. Sin ROI, MediaPipe sigue la mano solo (static_image_mode=False).
     """
-    with mp_hands.Hands(static_image_mode=False, max_num_hands=1, min_detection_confidence=0.5) as hands:
-        while True:
-            if robot.current_mode != "gestos":
-                print("Modo gestos control detenido.")
-                break
-            if robot.camera is None:
-                print("Error: Cámara no inicializada.")
+
+    def __init__(
+        self,
+        frames,
+        hands,
+        margen=0.5,
+        lado_min=96,
+        periodo_min=0.0,
+        historial=200,
+        trazador=None,
+        usar_roi=True,
+    ):
+        """
+        frames: suscripción al bus en modo "latest". hands: instancia de mp_hands.Hands.
+        usar_roi: recortar alrededor de la última mano (ver arriba el modo de hands).
+        margen: fracción del tamaño de la mano que se agrega a cada lado de la ROI.
+        lado_min: lado mínimo de la ROI en píxeles.
+        periodo_min: segundos mínimos entre inferencias, para ceder CPU (0 = sin límite).
+        trazador: traza.Trazador donde se abre la traza "gestos" de cada frame.
+        """
+        self.frames = frames
+        self.trazador = trazador or Trazador()
+        self.periodo_min = periodo_min
+        self.hands = hands
+        self.margen = margen
+        self.lado_min = lado_min
+        self.usar_roi = usar_roi
+        self.roi = None  # (x0, y0, x1, y1) en píxeles, o None para el frame completo
+        self.resultado = None  # (seq, ts del frame, hand_landmarks o None, ms de inferencia, traza)
+        self.inferencias = 0
+        self.con_mano = 0
+        self.con_roi = 0
+        self.inferencia_ms = deque(maxlen=historial)
+        self.error = None  # Por qué terminó el worker sin que lo detuvieran, o None
+        self._cond = threading.Condition()
+        self._running = False
+        self._thread = None
+
+    def start(self):
+        self._running = True
+        self.error = None
+        self._thread = threading.Thread(target=self._loop)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self):
+        self._running = False
+        with self._cond:
+            self._cond.notify_all()
+        if self._thread and threading.current_thread() != self._thread:
+            self._thread.join(timeout=2)
+        self._thread = None
+
+    def esperar(self, despues_de=-1, timeout=None):
+        """
+        Espera un resultado con seq mayor que despues_de. Devuelve el resultado o None.
+        """
+        with self._cond:
+            self._cond.wait_for(
+                lambda: not self._running or (self.resultado is not None and self.resultado[0] > despues_de),
+                timeout,
+            )
+            if self.resultado is not None and self.resultado[0] > despues_de:
+                return self.resultado
+        return None
+
+    def _calcular_roi(self, landmarks, ancho, alto):
+        xs = [lm.x for lm in landmarks.landmark]
+        ys = [lm.y for lm in landmarks.landmark]
+        cx = (min(xs) + max(xs)) / 2 * ancho
+        cy = (min(ys) + max(ys)) / 2 * alto
+        tam = max((max(xs) - min(xs)) * ancho, (max(ys) - min(ys)) * alto)
+        lado = min(max(tam * (1 + 2 * self.margen), self.lado_min), ancho, alto)
+        x0 = int(min(max(cx - lado / 2, 0), ancho - lado))
+        y0 = int(min(max(cy - lado / 2, 0), alto - lado))
+        return x0, y0, x0 + int(lado), y0 + int(lado)
+
+    def inferir(self, frame):
+        """
+        Corre MediaPipe sobre la ROI (o el frame completo) y devuelve los landmarks de la mano
+        en coordenadas del frame completo, o None.
+        """
+        alto, ancho = frame.shape[:2]
+        roi = self.roi
+        if roi is not None:
+            x0, y0, x1, y1 = roi
+            # MediaPipe necesita un array contiguo; el recorte es chico
+            entrada = np.ascontiguousarray(frame[y0:y1, x0:x1])
+            self.con_roi += 1
+        else:
+            entrada = frame
+        results = self.hands.process(entrada)
+        landmarks = results.multi_hand_landmarks[0] if results.multi_hand_landmarks else None
+        if landmarks is not None and roi is not None:
+            sx, sy = (x1 - x0) / ancho, (y1 - y0) / alto
+            for lm in landmarks.landmark:
+                lm.x = x0 / ancho + lm.x * sx
+                lm.y = y0 / alto + lm.y * sy
+                lm.z *= sx
+        # Sin mano en la ROI se vuelve a buscar en el frame completo
+        if self.usar_roi:
+            self.roi = self._calcular_roi(landmarks, ancho, alto) if landmarks is not None else None
+        return landmarks
+
+    def _loop(self):
+        proxima = 0.0
+        while self._running:
+            espera = proxima - time.monotonic()
+            if espera > 0:
+                time.sleep(espera)
+            item = self.frames.read(timeout=0.5)
+            if item is None:
+                if self.frames.detenido:
+                    self.error = f"La cámara dejó de capturar: {self.frames.bus.error}"
+                    break
                 continue
-            frame = robot.camera.capture_array()
-            if frame is None:
-                print("Error: No se pudo capturar frame de la cámara.")
+            seq, ts, frame = item
+            traza = self.trazador.frame("gestos", ts)
+            traza.marca("entrega")
+            t0 = time.perf_counter()
+            try:
+                landmarks = self.inferir(frame)
+            except Exception as e:
+                log.warning("Error en inferencia de gestos: %s", e)
+                self.roi = None
                 continue
-            # Picamera2 entrega RGB, convertir a BGR para mostrar y a RGB para MediaPipe
-            frame_rgb = frame if frame.shape[2] == 3 else cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-            results = hands.process(frame_rgb)
-            accion = None
-            if results.multi_hand_landmarks:
-                for hand_landmarks in results.multi_hand_landmarks:
-                    dedos = dedos_extendidos(hand_landmarks)
-                    print(dedos)
-                    # Lógica de control
-                    if dedos == [False, False, False, False, False]:
-                        accion = "forward"
-                        print("Gesto: Puño - Avanzar")
-                    elif dedos == [True, True, True, True, True]:
-                        accion = "backward"
-                        print("Gesto: Mano abierta - Retroceder")
-                    elif dedos == [False, True, False, False, False]:
-                        accion = "right"
-                        print("Gesto: Solo índice - Derecha")
-                    elif dedos == [False, True, True, False, False]:
-                        accion = "left"
-                        print("Gesto: Índice y medio - Izquierda")
-                    elif dedos == [False, False, True, False, False]:
-                        accion = "spin"
-                        print("Gesto: Solo medio - Giro")
-                    else:
-                        accion = "stop"
-                        print("Gesto: Otro - Stop")
-                    # Ejecutar acción
-                    if accion == "forward":
-                        robot.move("forward", duration=0.5)
-                    elif accion == "backward":
-                        robot.move("backward", duration=0.5)
-                    elif accion == "right":
-                        robot.move("right", duration=0.5)
-                    elif accion == "left":
-                        robot.move("left", duration=0.5)
-                    elif accion == "spin":
-                        robot.move("right", duration=0.5)
-                        robot.move("right", duration=0.5)
-                    else:
-                        robot.move("stop")
-                    # Mostrar landmarks sobre frame BGR
-                    frame_bgr = cv2.cvtColor(frame_rgb, cv2.COLOR_RGB2BGR)
-                    mp_drawing.draw_landmarks(frame_bgr, hand_landmarks, mp_hands.HAND_CONNECTIONS)
-            else:
-                # Si no hay mano, mostrar frame normal
-                frame_bgr = cv2.cvtColor(frame_rgb, cv2.COLOR_RGB2BGR)
-            if cv2.waitKey(1) & 0xFF == ord('q'):
-                break
-            sleep(0.2)
-        cv2.destroyAllWindows()
+            ms = (time.perf_counter() - t0) * 1000
+            traza.marca("inferencia")
+            proxima = time.monotonic() + self.periodo_min - ms / 1000
+            self.inferencias += 1
+            self.con_mano += landmarks is not None
+            self.inferencia_ms.append(ms)
+            with self._cond:
+                self.resultado = (seq, ts, landmarks, ms, traza)
+                self._cond.notify_all()
+
+    def stats(self):
+        ms = list(self.inferencia_ms)
+        return {
+            "inferencias": self.inferencias,
+            "con_mano": self.con_mano,
+            "con_roi": self.con_roi,
+            "inferencia_ms_p50": percentil(ms, 0.5),
+            "inferencia_ms_p95": percentil(ms, 0.95),
+            "frames": self.frames.stats(),
+        }
+
+
+class ComandoMotor:
+    """
+    Manda las acciones al planificador de movimiento del robot sin bloquear: cada acción es
+    un movimiento continuo cuyo hombre muerto es la duración de la acción, así que el robot
+    se detiene solo si el gesto no se repite. Registra la latencia gesto -> motor (captura
+    del frame hasta que el comando nuevo llega al planificador).
+    """
+
+    def __init__(self, robot, speed=1.0, historial=200):
+        self.movimiento = robot.movimiento
+        self.speed = speed
+        self.comandos = 0
+        self.latencia_ms = deque(maxlen=historial)
+        self._accion = "stop"
+        self._plan = self.movimiento.detener()
+
+    @property
+    def accion(self):
+        """
+        Acción vigente, o "stop" si el planificador ya la detuvo por vencimiento.
+        """
+        if self._accion != "stop" and self.movimiento.terminado(self._plan):
+            self._accion = "stop"
+        return self._accion
+
+    def aplicar(self, accion, ts_frame=None):
+        (izq, der), duracion = ACCIONES.get(accion, ACCIONES["stop"])
+        cambio = accion != self.accion
+        if accion == "stop":
+            self._plan = self.movimiento.detener()
+        else:
+            # El mismo gesto solo renueva el vencimiento en el planificador
+            self._plan = self.movimiento.mantener_ruedas(
+                izq * self.speed, der * self.speed, accion, hombre_muerto=duracion
+            )
+        self._accion = accion
+        if cambio:
+            self.comandos += 1
+            if ts_frame is not None:
+                self.latencia_ms.append((time.monotonic() - ts_frame) * 1000)
+
+    def detener(self):
+        self._plan = self.movimiento.detener()
+        self._accion = "stop"
+
+    def stats(self):
+        ms = list(self.latencia_ms)
+        return {
+            "accion": self.accion,
+            "comandos": self.comandos,
+            "latencia_ms_p50": percentil(ms, 0.5),
+            "latencia_ms_p95": percentil(ms, 0.95),
+        }
+
+
+class PipelineGestos:
+    """
+    Une el worker de inferencia, el motor de gestos (votación con histéresis) y el comando
+    de motores; expone las métricas de todos.
+    """
+
+    def __init__(
+        self, robot, frames, hands, speed=1.0, motor_gestos=None, periodo_min=0.0, trazador=None, usar_roi=True
+    ):
+        self.robot = robot
+        self.inferencia = InferenciaManos(
+            frames, hands, periodo_min=periodo_min, trazador=trazador, usar_roi=usar_roi
+        )
+        self.gestos = motor_gestos or MotorGestos()
+        self.comando = ComandoMotor(robot, speed)
+        self.landmarks = None  # Última mano detectada, para el overlay del stream
+
+    def run(self, activo):
+        """
+        Corre hasta que activo() devuelva False.
+        """
+        self.inferencia.start()
+        seq = -1
+        try:
+            while activo():
+                resultado = self.inferencia.esperar(seq, timeout=0.05)
+                if resultado is None:
+                    if self.inferencia.error is not None:
+                        raise RuntimeError(self.inferencia.error)
+                    continue
+                seq, ts, landmarks, _, traza = resultado
+                traza.marca("espera")  # Del worker de inferencia a este hilo
+                self.landmarks = landmarks
+                accion = self.gestos.actualizar(landmarks, ts)
+                traza.marca("decision")
+                if accion is None:
+                    continue  # Sin gesto estable: el comando vigente vence solo
+                if accion != self.comando.accion:
+                    log.info("Gesto: %s", accion)
+                self.comando.aplicar(accion, ts)
+                traza.fin()
+        finally:
+            self.inferencia.stop()
+            self.comando.detener()
+
+    def dibujar(self, frame):
+        landmarks = self.landmarks
+        if landmarks is not None:
+            mp_drawing.draw_landmarks(frame, landmarks, mp_hands.HAND_CONNECTIONS)
+
+    def stats(self):
+        return {
+            "running": True,
+            **self.inferencia.stats(),
+            **self.comando.stats(),
+            "gesto": self.gestos.accion,
+            "cambios_gesto": self.gestos.cambios,
+        }
+
+
+def modo_gestos_control(robot, hands_factory=None, token=None):
+    """
+    Modo de gestos con control: mueve el robot según el gesto detectado.
+    Usa la picamera a través del bus de frames del robot. La inferencia corre en su propio
+    hilo sobre el frame más reciente y los comandos a los motores no bloquean.
+    hands_factory: crea el detector de manos (por defecto mp_hands.Hands), para pruebas.
+    token: TokenCancelacion que termina el modo (por defecto, salir del modo "gestos").
+    """
+    token = token or TokenCancelacion(robot, "gestos")
+    try:
+        frames = robot.subscribe_frames("gestos")
+    except Exception as e:
+        log.error("No se pudo iniciar la cámara: %s", e)
+        return
+    if hands_factory is None:
+        # Cada llamada es una imagen independiente: la ROI de InferenciaManos hace de seguimiento
+        hands_factory = lambda: mp_hands.Hands(static_image_mode=True, max_num_hands=1, min_detection_confidence=0.5)
+    with frames, hands_factory() as hands:
+        pipeline = PipelineGestos(robot, frames, hands, trazador=robot.traza)
+        robot.gesture_pipeline = pipeline
+        # Los landmarks solo se dibujan en el stream, y solo mientras alguien lo está mirando
+        robot.set_stream_overlay(pipeline.dibujar)
+        try:
+            pipeline.run(lambda: not token.cancelado)
+        finally:
+            robot.set_stream_overlay(None)
+            robot.last_gesture_stats = pipeline.stats()
+            robot.last_gesture_stats["running"] = False
+            robot.gesture_pipeline = None
+    log.info("Modo gestos control detenido.")
@@ -1,45 +1,96 @@
-from obstaculos import detectar_obstaculos
-import cv2
-import time
-from time import sleep
+from obstaculos import DetectorObstaculos, dibujar_obstaculos
+from obstaculosORB import TrackerORB
+from modos import TokenCancelacion
+import logging
+
+log = logging.getLogger("ferb.obstaculos")
 
 # Parámetros de distancia y área para considerar un obstáculo
 DISTANCIA_MIN_CM = 30  # Si el obstáculo está más cerca que esto, se evita
 MIN_AREA = 2000
+# Procesar a media resolución: mismas cajas (±1 px a escala original) con ~4x menos píxeles
+ESCALA = 0.5
+ROI_INFERIOR = 1.0  # Frame completo: con una ROI las cajas se recortan y la distancia sale mayor
+HOMBRE_MUERTO = 0.5  # Segundos que sigue avanzando sin un frame que confirme el camino libre
+# Tiempo hasta la colisión (obstaculosORB.TrackerORB) por debajo del cual se esquiva, aunque
+# la caja del obstáculo no dé una distancia confiable
+TTC_MIN_S = 1.5
 
 
-def modo_obstaculos(robot):
+def modo_obstaculos(robot, token=None):
     """
     Modo de evasión de obstáculos: el robot avanza y esquiva si detecta un obstáculo cerca.
+    Corre hasta que se cancele token (por defecto, hasta salir del modo "obstaculos").
     """
+    token = token or TokenCancelacion(robot, "obstaculos")
+    try:
+        frames = robot.subscribe_frames("obstaculos")
+    except Exception as e:
+        log.error("No se pudo iniciar la cámara: %s", e)
+        return
+    ultimo = {"cajas": []}  # Últimas cajas detectadas, para el overlay del stream
+    tracker = TrackerORB()
+
+    def dibujar(frame):
+        dibujar_obstaculos(frame, ultimo["cajas"])
+        tracker.dibujar(frame)
+
+    # Las cajas y el TTC solo se dibujan en el stream, y solo mientras alguien lo está mirando
+    robot.set_stream_overlay(dibujar)
+    try:
+        _obstaculos_loop(robot, frames, ultimo, token, tracker)
+    finally:
+        robot.movimiento.detener()  # No dejar un plan en curso al cambiar de modo
+        robot.set_stream_overlay(None)
+        frames.close()
+
+
+def _obstaculos_loop(robot, frames, ultimo, token, tracker):
+    detector = None  # Se crea con la forma del primer frame y reutiliza sus buffers
+    maniobra = None  # Id del plan de esquive en curso; no se interrumpe con "forward"
     while True:
-        if robot.current_mode != "obstaculos":
-            print("Modo obstáculos detenido.")
+        if token.cancelado:
+            log.info("Modo obstáculos detenido.")
             break
 
-        if robot.camera is None:
-            print("Error: Cámara no inicializada.")
-            continue
-
-        frame = robot.camera.capture_array()
-        if frame is None:
-            print("Error: No se pudo capturar frame de la cámara.")
+        item = frames.read()
+        if item is None:
+            if frames.detenido:
+                # Sin cámara el modo no puede seguir: el supervisor lo da por terminado
+                raise RuntimeError(f"La cámara dejó de capturar: {frames.bus.error}")
+            log.warning("No se pudo capturar frame de la cámara.")
             continue
+        _, ts, frame = item
+        traza = robot.traza.frame("obstaculos", ts)
+        traza.marca("entrega")
 
-        frame, cajas = detectar_obstaculos(frame, min_area=MIN_AREA)
-        obstaculo_cerca = False
-        for (x, y, w, h), distancia in cajas:
-            if distancia is not None and distancia < DISTANCIA_MIN_CM:
-                obstaculo_cerca = True
-                print(f"Obstáculo detectado a {distancia:.1f} cm. Esquivando...")
-                break
+        if detector is None or detector.shape != frame.shape[:2]:
+            detector = DetectorObstaculos(
+                frame.shape, roi_inferior=ROI_INFERIOR, escala=ESCALA, min_area=MIN_AREA
+            )
+        cajas = detector.detectar(frame)
+        _, ttc = tracker.procesar(frame, ts)
+        traza.marca("inferencia")
+        ultimo["cajas"] = cajas
+        cerca = next((d for _, d in cajas if d is not None and d < DISTANCIA_MIN_CM), None)
+        acercandose = ttc is not None and ttc < TTC_MIN_S
 
-        if obstaculo_cerca:
+        # Los comandos no bloquean: se siguen procesando frames mientras el robot se mueve
+        esquivando = maniobra is not None and not robot.movimiento.terminado(maniobra)
+        traza.marca("decision")
+        if esquivando:
+            continue  # Sin comando nuevo: la traza de este frame no llega a los motores
+        if cerca is not None or acercandose:
+            if cerca is not None:
+                log.info("Obstáculo detectado a %.1f cm. Esquivando...", cerca)
+            else:
+                log.info("Obstáculo acercándose: colisión en %.1f s. Esquivando...", ttc)
             # Estrategia simple: retroceder y girar
-            robot.move("backward", duration=0.5)
-            robot.move("left", duration=0.5)
+            maniobra = robot.move_sequence([("backward", 1.0, 0.5), ("left", 1.0, 0.5)])
         else:
-            print("Camino libre. Avanzando.")
-            robot.move("forward", duration=0.5)
-
-        sleep(0.2)
+            if robot.movimiento.direccion != "forward":
+                log.info("Camino libre. Avanzando.")
+            # El primer frame libre arranca; los siguientes solo renuevan el vencimiento, así
+            # que si el lazo se atasca el robot se detiene
+            robot.movimiento.mantener("forward", 1.0, hombre_muerto=HOMBRE_MUERTO)
+        traza.fin()
@@ -0,0 +1,141 @@
+"""
+Supervisor de modos de Ferb: un solo hilo corre el comportamiento del modo activo (perrito,
+obstáculos, gestos...). Cambiar de modo no bloquea: cancela el token del comportamiento en
+curso y el hilo arranca el siguiente en cuanto el anterior devuelve.
+"""
+
+import logging
+import threading
+import time
+from collections import deque
+from traza import percentil
+
+log = logging.getLogger("ferb.modos")
+
+MODO_REPOSO = "manual"  # Modo al que se vuelve si un comportamiento termina solo
+
+
+class TokenCancelacion:
+    """
+    Avisa a un comportamiento que debe terminar. Si se crea con robot y modo, también queda
+    cancelado cuando robot.current_mode deja de ser ese modo, para poder correr los
+    comportamientos sin supervisor (pruebas, scripts).
+    """
+
+    def __init__(self, robot=None, modo=None):
+        self.robot = robot
+        self.modo = modo
+        self._evento = threading.Event()
+
+    def cancelar(self):
+        self._evento.set()
+
+    @property
+    def cancelado(self):
+        if self._evento.is_set():
+            return True
+        return self.robot is not None and self.robot.current_mode != self.modo
+
+    def esperar(self, timeout):
+        """
+        Duerme hasta timeout segundos o hasta que se cancele. Devuelve True si se canceló.
+        """
+        return self._evento.wait(timeout) or self.cancelado
+
+
+class SupervisorModos:
+    """
+    Corre a lo sumo un comportamiento a la vez. comportamientos: {modo: función(robot, token)};
+    los modos sin comportamiento (manual, navegacion) solo detienen el anterior. Mide la
+    latencia de cada cambio: desde cambiar() hasta que el comportamiento anterior terminó y
+    el nuevo arrancó.
+    """
+
+    def __init__(self, robot, comportamientos, historial=50):
+        self.robot = robot
+        self.comportamientos = comportamientos
+        self.modo = robot.current_mode
+        self.cambios = 0
+        self.latencia_ms = deque(maxlen=historial)
+        self.ultimo_cambio = None  # {"de", "a", "detener_ms", "latencia_ms"}
+        self._cond = threading.Condition()
+        self._pedido = None  # (modo, time.monotonic() del pedido)
+        self._token = None  # Token del comportamiento en curso
+        self._running = True
+        self._thread = threading.Thread(target=self._loop)
+        self._thread.daemon = True
+        self._thread.start()
+        if self.modo in comportamientos:
+            self.cambiar(self.modo)
+
+    def cambiar(self, modo):
+        """
+        Pide el cambio a modo y vuelve de inmediato.
+        """
+        with self._cond:
+            self.robot.current_mode = modo
+            self._pedido = (modo, time.monotonic())
+            if self._token is not None:
+                self._token.cancelar()
+            self._cond.notify_all()
+
+    def esperar(self, timeout=None):
+        """
+        Bloquea hasta que no haya cambios pendientes. Devuelve False si vence el timeout.
+        """
+        with self._cond:
+            return self._cond.wait_for(lambda: self._pedido is None or not self._running, timeout)
+
+    def _loop(self):
+        terminado = time.monotonic()  # Cuándo devolvió el último comportamiento
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._pedido is not None or not self._running)
+                if not self._running:
+                    return
+                (modo, t_pedido), self._pedido = self._pedido, None
+                anterior, self.modo = self.modo, modo
+                comportamiento = self.comportamientos.get(modo)
+                token = self._token = TokenCancelacion(self.robot, modo)
+                ahora = time.monotonic()
+                self.cambios += 1
+                self.latencia_ms.append((ahora - t_pedido) * 1000)
+                self.ultimo_cambio = {
+                    "de": anterior,
+                    "a": modo,
+                    "detener_ms": max(terminado - t_pedido, 0.0) * 1000,
+                    "latencia_ms": (ahora - t_pedido) * 1000,
+                }
+                self._cond.notify_all()
+            if comportamiento is None:
+                continue
+            log.info("entro a modo %s", modo)
+            try:
+                comportamiento(self.robot, token=token)
+            except Exception as e:
+                log.exception("Error en modo %s: %s", modo, e)
+            terminado = time.monotonic()
+            if not token.cancelado:
+                # Terminó por su cuenta (p. ej. sin cámara): el modo no queda activo sin nadie que lo corra
+                log.warning("El modo %s terminó solo; se pasa a %s", modo, MODO_REPOSO)
+                self.robot.set_mode(MODO_REPOSO)
+
+    def stats(self):
+        with self._cond:
+            ms = list(self.latencia_ms)
+            return {
+                "modo": self.modo,
+                "cambios": self.cambios,
+                "latencia_ms_p50": percentil(ms, 0.5),
+                "latencia_ms_p95": percentil(ms, 0.95),
+                "ultimo_cambio": self.ultimo_cambio,
+            }
+
+    def close(self):
+        with self._cond:
+            self._running = False
+            if self._token is not None:
+                self._token.cancelar()
+            self._cond.notify_all()
+        if threading.current_thread() != self._thread:
+            self._thread.join(timeout=2)
@@ -0,0 +1,344 @@
+"""
+Motores del L298N por libgpiod (API v1). Las cuatro líneas de dirección (y las dos de enable
+si el PWM es por software) se piden en un solo bulk request y cada cambio se escribe con un
+único set_values, así que la dirección y el enable de ambos motores cambian a la vez, sin
+estados intermedios. La velocidad se regula con PWM sobre ENA/ENB: por software (un hilo
+que conmuta las líneas enable) o por el subsistema PWM del kernel (/sys/class/pwm).
+"""
+
+import logging
+import os
+import threading
+import time
+
+log = logging.getLogger("ferb.motores")
+
+
+def _abrir_chip(chip):
+    """
+    Devuelve (chip, tipo de request de salida). chip puede ser un nombre ("gpiochip0") o un
+    objeto ya abierto con la interfaz de gpiod.Chip (por ejemplo ChipFalso).
+    """
+    if not isinstance(chip, str):
+        return chip, chip.LINE_REQ_DIR_OUT
+    import gpiod
+
+    return gpiod.Chip(chip), gpiod.LINE_REQ_DIR_OUT
+
+
+class PWMSoftware:
+    """
+    PWM por software sobre las líneas enable del bulk request. Con ciclo de trabajo 0 o 1 el
+    hilo duerme hasta el próximo cambio; solo conmuta mientras alguna rueda va a velocidad
+    intermedia.
+    """
+
+    lineas_enable = True  # Las líneas ENA/ENB van en el bulk request del controlador
+
+    def __init__(self, frecuencia=100):
+        self.periodo = 1.0 / frecuencia
+        self.ciclos = 0
+        self._duty = (0.0, 0.0)
+        self._escribir = None
+        self._cond = threading.Condition()
+        self._running = False
+        self._thread = None
+
+    def conectar(self, escribir):
+        """
+        escribir: función (ena, enb, duty) que escribe las líneas enable; duty es el ciclo de
+        trabajo con el que se calcularon, para descartar escrituras atrasadas.
+        """
+        self._escribir = escribir
+        self._running = True
+        self._thread = threading.Thread(target=self._loop)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def fijar(self, izq, der):
+        """
+        Ciclo de trabajo de cada motor en [0, 1].
+        """
+        with self._cond:
+            self._duty = (izq, der)
+            self._cond.notify_all()
+
+    def _loop(self):
+        while self._running:
+            with self._cond:
+                duty = self._duty
+                if all(d in (0.0, 1.0) for d in duty):
+                    # Enables fijos (un periodo a medias pudo dejarlos apagados) hasta el próximo cambio
+                    self._escribir(duty[0] > 0, duty[1] > 0, duty)
+                    self._cond.wait_for(lambda: not self._running or self._duty != duty)
+                    continue
+            inicio = time.monotonic()
+            encendido = [d > 0 for d in duty]
+            self._escribir(*encendido, duty)
+            # Apagar cada enable al cumplir su fracción del periodo, el más corto primero
+            for d, i in sorted((d, i) for i, d in enumerate(duty) if 0 < d < 1):
+                espera = inicio + d * self.periodo - time.monotonic()
+                if espera > 0:
+                    time.sleep(espera)
+                encendido[i] = False
+                self._escribir(*encendido, duty)
+            espera = inicio + self.periodo - time.monotonic()
+            if espera > 0:
+                time.sleep(espera)
+            self.ciclos += 1
+
+    def close(self):
+        self._running = False
+        with self._cond:
+            self._cond.notify_all()
+        if self._thread and threading.current_thread() != self._thread:
+            self._thread.join(timeout=1)
+        self._thread = None
+
+
+class PWMSysfs:
+    """
+    PWM por hardware a través de /sys/class/pwm (en la Raspberry Pi, dtoverlay=pwm-2chan:
+    canal 0 en GPIO 12 o 18 y canal 1 en GPIO 13 o 19). ENA/ENB no se piden como GPIO, así
+    que tienen que estar cableados a los pines de esos canales (ver validar_pines).
+    Los archivos duty_cycle quedan abiertos y solo se escriben cuando el valor cambia.
+    """
+
+    lineas_enable = False
+    PINES = {12: 0, 18: 0, 13: 1, 19: 1}  # GPIO -> canal PWM del pwmchip0 de la Raspberry Pi
+
+    def __init__(self, pwmchip=0, canales=(0, 1), frecuencia=1000, raiz="/sys/class/pwm", pines=None):
+        """
+        pines: (ENA, ENB) si se conocen, para validarlos antes de exportar los canales.
+        """
+        self.canales = canales
+        if pines is not None:
+            self.validar_pines(pines)
+        self.base = os.path.join(raiz, f"pwmchip{pwmchip}")
+        self.periodo_ns = int(1e9 / frecuencia)
+        self.escrituras = 0
+        self._duty_ns = [None] * len(canales)
+        self._archivos = []
+        for canal in canales:
+            directorio = os.path.join(self.base, f"pwm{canal}")
+            if not os.path.isdir(directorio):
+                self._escribir_archivo(os.path.join(self.base, "export"), canal)
+                # udev tarda un momento en crear el directorio y darle permisos
+                limite = time.monotonic() + 1.0
+                while not os.access(os.path.join(directorio, "period"), os.W_OK):
+                    if time.monotonic() > limite:
+                        raise RuntimeError(f"No se pudo exportar el canal PWM {canal} de {self.base}")
+                    time.sleep(0.01)
+            # El duty debe ser menor que el periodo antes de cambiarlo
+            self._escribir_archivo(os.path.join(directorio, "duty_cycle"), 0)
+            self._escribir_archivo(os.path.join(directorio, "period"), self.periodo_ns)
+            self._escribir_archivo(os.path.join(directorio, "enable"), 1)
+            self._archivos.append(open(os.path.join(directorio, "duty_cycle"), "w"))
+
+    def validar_pines(self, pines):
+        """
+        Verifica que cada pin enable (ENA, ENB) salga por el canal PWM que se le asigna; si
+        no, ese motor nunca se habilitaría y no habría ningún error que lo delate.
+        """
+        for nombre, pin, canal in zip(("ENA", "ENB"), pines, self.canales):
+            if self.PINES.get(pin) != canal:
+                validos = [p for p, c in self.PINES.items() if c == canal]
+                raise ValueError(
+                    f"{nombre} en GPIO {pin} no es un pin del canal PWM {canal} "
+                    f"(usar GPIO {' o '.join(map(str, validos))}, o pwm='software')"
+                )
+
+    @staticmethod
+    def _escribir_archivo(ruta, valor):
+        with open(ruta, "w") as f:
+            f.write(str(valor))
+
+    def conectar(self, escribir):
+        pass  # El kernel genera la señal; no hay líneas enable que escribir
+
+    def fijar(self, izq, der):
+        for i, duty in enumerate((izq, der)):
+            duty_ns = int(duty * self.periodo_ns)
+            if duty_ns == self._duty_ns[i]:
+                continue
+            archivo = self._archivos[i]
+            archivo.seek(0)
+            archivo.write(str(duty_ns))
+            archivo.flush()
+            self._duty_ns[i] = duty_ns
+            self.escrituras += 1
+
+    def close(self):
+        self.fijar(0.0, 0.0)
+        for archivo in self._archivos:
+            archivo.close()
+        self._archivos = []
+        for canal in self.canales:
+            try:
+                self._escribir_archivo(os.path.join(self.base, f"pwm{canal}", "enable"), 0)
+            except OSError as e:
+                log.warning("Error deshabilitando el canal PWM %s: %s", canal, e)
+
+
+class MotoresGpiod:
+    """
+    Sustituto de gpiozero.Robot sobre libgpiod: forward/backward/left/right/stop y
+    value = (izq, der) con velocidades en [-1, 1].
+    """
+
+    def __init__(
+        self,
+        left_motor_pins=(21, 26),
+        right_motor_pins=(0, 25),
+        enable_pins=(18, 27),
+        chip="gpiochip0",
+        pwm=None,
+        consumer="ferb_motores",
+    ):
+        """
+        left_motor_pins / right_motor_pins: (adelante, atrás) de cada motor (IN1-IN4).
+        enable_pins: (ENA, ENB); con PWM por software se piden como GPIO, con PWMSysfs tienen
+        que ser pines de sus canales PWM (ValueError si no).
+        pwm: PWMSoftware (por defecto) o PWMSysfs.
+        """
+        self.pwm = pwm or PWMSoftware()
+        if self.pwm.lineas_enable:
+            offsets = [*left_motor_pins, *right_motor_pins, *enable_pins]
+        else:
+            self.pwm.validar_pines(enable_pins)
+            offsets = [*left_motor_pins, *right_motor_pins]
+        self.chip, tipo = _abrir_chip(chip)
+        self.escrituras = 0
+        self._valores = [0] * len(offsets)
+        self._value = (0.0, 0.0)
+        self._duty = (0.0, 0.0)
+        self._lock = threading.Lock()
+        self.lineas = self.chip.get_lines(offsets)
+        self.lineas.request(consumer=consumer, type=tipo, default_vals=self._valores)
+        self.pwm.conectar(self._escribir_enables)
+
+    def _escribir(self):
+        self.lineas.set_values(self._valores)
+        self.escrituras += 1
+
+    def _escribir_enables(self, ena, enb, duty):
+        with self._lock:
+            valores = [int(ena), int(enb)]
+            # Un periodo de PWM calculado con un value anterior no debe pisar al actual
+            if duty == self._duty and self._valores[4:] != valores:
+                self._valores[4:] = valores
+                self._escribir()
+
+    @property
+    def value(self):
+        return self._value
+
+    @value.setter
+    def value(self, value):
+        izq, der = (max(-1.0, min(1.0, float(v))) for v in value)
+        valores = []
+        for v in (izq, der):
+            valores += [int(v > 0), int(v < 0)]
+        duty = (abs(izq), abs(der))
+        if self.pwm.lineas_enable:
+            # Empieza el periodo con el enable encendido; PWMSoftware lo conmuta si hace falta
+            valores += [int(duty[0] > 0), int(duty[1] > 0)]
+        with self._lock:
+            self._value = (izq, der)
+            self._duty = duty
+            if valores != self._valores:
+                self._valores = valores
+                self._escribir()  # Dirección y enable de ambos motores en una sola llamada
+        self.pwm.fijar(*duty)
+
+    def forward(self, speed=1):
+        self.value = (speed, speed)
+
+    def backward(self, speed=1):
+        self.value = (-speed, -speed)
+
+    def left(self, speed=1):
+        self.value = (-speed, speed)
+
+    def right(self, speed=1):
+        self.value = (speed, -speed)
+
+    def stop(self):
+        self.value = (0, 0)
+
+    def close(self):
+        self.stop()
+        self.pwm.close()
+        self.lineas.release()
+        self.chip.close()
+
+
+class BulkFalso:
+    """
+    Sustituto de gpiod.LineBulk: registra cada escritura.
+    """
+
+    def __init__(self, chip, offsets):
+        self.chip = chip
+        self.offsets = list(offsets)
+
+    def request(self, consumer=None, type=None, default_vals=None):
+        if default_vals is not None:
+            self.set_values(default_vals)
+
+    def set_values(self, values):
+        self.chip.registrar(self.offsets, values)
+
+    def get_values(self):
+        return [self.chip.valores.get(o, 0) for o in self.offsets]
+
+    def release(self):
+        pass
+
+
+class LineaFalsa(BulkFalso):
+    """
+    Sustituto de gpiod.Line.
+    """
+
+    def __init__(self, chip, offset):
+        super().__init__(chip, [offset])
+
+    def request(self, consumer=None, type=None, default_val=None):
+        if default_val is not None:
+            self.set_value(default_val)
+
+    def set_value(self, value):
+        self.set_values([value])
+
+
+class ChipFalso:
+    """
+    Sustituto de gpiod.Chip para pruebas sin Raspberry Pi. Cada set_value/set_values cuenta
+    como una llamada al kernel; con registrar_historial=True, historial guarda
+    (time.monotonic(), {offset: valor}) después de cada una.
+    """
+
+    LINE_REQ_DIR_OUT = 3
+
+    def __init__(self, registrar_historial=False):
+        self.llamadas = 0
+        self.valores = {}
+        self.historial = [] if registrar_historial else None
+        self._lock = threading.Lock()
+
+    def registrar(self, offsets, values):
+        with self._lock:
+            self.llamadas += 1
+            self.valores.update(zip(offsets, values))
+            if self.historial is not None:
+                self.historial.append((time.monotonic(), dict(self.valores)))
+
+    def get_line(self, offset):
+        return LineaFalsa(self, offset)
+
+    def get_lines(self, offsets):
+        return BulkFalso(self, offsets)
+
+    def close(self):
+        pass
@@ -0,0 +1,233 @@
+import logging
+import threading
+import time
+from collections import deque
+from traza import percentil
+
+log = logging.getLogger("ferb.movimiento")
+
+# Ruedas (izquierda, derecha) de cada dirección, multiplicadas por la velocidad
+DIRECCIONES = {
+    "forward": (1, 1),
+    "backward": (-1, -1),
+    "left": (-1, 1),
+    "right": (1, -1),
+    "stop": (0, 0),
+}
+
+
+class PlanificadorMovimiento:
+    """
+    Ejecuta comandos de movimiento con duración en un hilo propio. ejecutar() y secuencia()
+    vuelven de inmediato con el id del plan; un plan nuevo reemplaza al que esté en curso
+    (preempción). Cada paso tiene un vencimiento: al llegar, el hilo pasa al siguiente paso
+    o detiene las ruedas, así que el robot nunca sigue andando si nadie le manda nada.
+    mantener() es el movimiento continuo: no tiene duración, pero se detiene si no se repite
+    dentro de hombre_muerto segundos. El hilo solo despierta con un comando nuevo o un
+    vencimiento; cada cambio se escribe en las ruedas una sola vez.
+    """
+
+    def __init__(self, aplicar_ruedas, max_duracion=5.0, hombre_muerto=2.0, historial=200, trazador=None):
+        """
+        aplicar_ruedas: función (izq, der) que escribe en los motores.
+        max_duracion: tope en segundos de cada paso (watchdog).
+        hombre_muerto: segundos que dura un movimiento continuo sin que se repita el comando.
+        trazador: traza.Trazador donde registrar el despacho (comando -> ruedas escritas).
+        """
+        self.aplicar_ruedas = aplicar_ruedas
+        self.trazador = trazador
+        self.max_duracion = max_duracion
+        self.hombre_muerto = hombre_muerto
+        self.comandos = 0
+        self.preempciones = 0
+        self.renovaciones = 0  # mantener() con la misma dirección: solo se extiende el vencimiento
+        self.paradas_hombre_muerto = 0
+        self.errores = 0  # Escrituras en las ruedas que lanzaron una excepción
+        self.tardanza_ms = deque(maxlen=historial)  # Retraso del hilo respecto a cada vencimiento
+        self._cond = threading.Condition()
+        self._plan = deque()  # Pasos pendientes: (izq, der, duración, dirección)
+        self._id = 0  # Id del plan en curso
+        self._completado = 0  # Id del último plan que terminó todos sus pasos
+        self._vence = None  # Vencimiento del paso en curso (time.monotonic), o None
+        self._direccion = None
+        self._continuo = None  # Ruedas del movimiento continuo en curso, o None
+        self._t_comando = None  # time.monotonic del plan nuevo que todavía no llegó a las ruedas
+        self._running = True
+        self._thread = threading.Thread(target=self._loop)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def ejecutar(self, direccion, speed=1.0, duration=1.0):
+        """
+        Mueve en una dirección durante duration segundos y luego se detiene. No bloquea.
+        """
+        return self.secuencia([(direccion, speed, duration)])
+
+    def secuencia(self, pasos):
+        """
+        Ejecuta los pasos [(dirección, velocidad, duración), ...] uno tras otro y luego se
+        detiene. Reemplaza cualquier plan en curso. Devuelve el id del plan.
+        """
+        plan = deque()
+        for direccion, speed, duration in pasos:
+            izq, der = DIRECCIONES.get(direccion, (0, 0))
+            plan.append((izq * speed, der * speed, min(max(duration, 0.0), self.max_duracion), direccion))
+        if not plan:
+            plan.append((0, 0, 0.0, "stop"))
+        return self._programar(plan)
+
+    def mantener(self, direccion, speed=1.0, hombre_muerto=None):
+        """
+        Movimiento continuo en una dirección hasta el próximo comando. Hay que repetirlo
+        antes de hombre_muerto segundos o el robot se detiene. No bloquea.
+        """
+        izq, der = DIRECCIONES.get(direccion, (0, 0))
+        return self.mantener_ruedas(izq * speed, der * speed, direccion, hombre_muerto)
+
+    def mantener_ruedas(self, izq, der, direccion="ruedas", hombre_muerto=None):
+        """
+        Como mantener(), con la velocidad de cada rueda en [-1, 1]; para los controladores
+        que recalculan las ruedas en cada frame. hombre_muerto reemplaza al del planificador
+        para este comando (un lazo a 30 Hz puede usar un vencimiento mucho más corto).
+        """
+        ruedas = (izq, der)
+        if ruedas == (0, 0):
+            return self.detener()
+        vence = self.hombre_muerto if hombre_muerto is None else hombre_muerto
+        with self._cond:
+            if self._continuo == ruedas and self._vence is not None:
+                # Mismo comando: las ruedas ya están así, solo se aleja la parada
+                self._vence = time.monotonic() + vence
+                self.renovaciones += 1
+                return self._id
+        return self._programar(deque([(izq, der, vence, direccion)]), ruedas)
+
+    def _programar(self, plan, continuo=None):
+        with self._cond:
+            if self._vence is not None or self._plan:
+                self.preempciones += 1
+            self._id += 1
+            self._plan = plan
+            self._vence = None
+            self._continuo = continuo
+            self._t_comando = time.monotonic()
+            self.comandos += 1
+            self._cond.notify_all()
+            return self._id
+
+    def detener(self):
+        """
+        Cancela el plan en curso y detiene las ruedas. Si el robot ya está detenido y no hay
+        nada pendiente no programa nada (un lazo puede llamarlo en cada frame) y devuelve el
+        id del plan en curso.
+        """
+        with self._cond:
+            if not self._plan and (self._vence is None or self._direccion == "stop"):
+                return self._id
+        return self.secuencia([("stop", 0, 0)])
+
+    def terminado(self, plan_id):
+        """
+        True si el plan terminó o fue reemplazado por otro.
+        """
+        with self._cond:
+            return plan_id < self._id or plan_id <= self._completado
+
+    def esperar(self, plan_id, timeout=None):
+        """
+        Bloquea hasta que el plan termine o sea reemplazado. Devuelve False si vence el timeout.
+        """
+        with self._cond:
+            return self._cond.wait_for(
+                lambda: not self._running or plan_id < self._id or plan_id <= self._completado, timeout
+            )
+
+    @property
+    def direccion(self):
+        """
+        Dirección del paso en curso, o None si el robot está quieto por el planificador.
+        """
+        return self._direccion
+
+    def _loop(self):
+        while True:
+            with self._cond:
+                paso = self._siguiente()
+                if paso is None:
+                    return
+            self._escribir(*paso)
+
+    def _siguiente(self):
+        """
+        Espera (con el lock tomado) hasta que haya que escribir en las ruedas y devuelve
+        (plan_id, izq, der, t_comando, completa); None si el planificador se cerró.
+        completa indica que el plan termina con esta parada.
+        """
+        while self._running:
+            ahora = time.monotonic()
+            if self._vence is not None and ahora >= self._vence:
+                self.tardanza_ms.append((ahora - self._vence) * 1000)
+                self._vence = None
+                if not self._plan:
+                    if self._continuo is not None:
+                        self.paradas_hombre_muerto += 1
+                        self._continuo = None
+                    self._direccion = None
+                    return self._id, 0, 0, None, True
+            if self._vence is None and self._plan:
+                izq, der, duracion, direccion = self._plan.popleft()
+                t_comando, self._t_comando = self._t_comando, None
+                self._direccion = direccion
+                self._vence = ahora + duracion  # Un paso de duración 0 vence en la vuelta siguiente
+                return self._id, izq, der, t_comando, False
+            self._cond.wait(None if self._vence is None else self._vence - ahora)
+        return None
+
+    def _escribir(self, plan_id, izq, der, t_comando, completa):
+        """
+        Escribe en las ruedas fuera del lock, para que un comando nuevo no espere al hardware.
+        Un error del hardware o de la telemetría no puede matar el hilo: sin él nadie haría
+        cumplir los vencimientos. Se intenta detener el robot y se olvida el movimiento
+        continuo, así la próxima renovación vuelve a escribir en vez de solo alargar el plazo.
+        """
+        try:
+            self.aplicar_ruedas(izq, der)
+            if t_comando is not None and self.trazador is not None:
+                self.trazador.registrar("movimiento", "despacho", (time.monotonic() - t_comando) * 1000)
+        except Exception:
+            self.errores += 1
+            log.exception("Error escribiendo las ruedas (%s, %s)", izq, der)
+            try:
+                self.aplicar_ruedas(0, 0)
+            except Exception:
+                log.exception("No se pudieron detener las ruedas")
+            with self._cond:
+                if self._id == plan_id:
+                    self._continuo = None
+        if completa:
+            with self._cond:
+                self._completado = max(self._completado, plan_id)
+                self._cond.notify_all()
+
+    def stats(self):
+        with self._cond:
+            tardanza = list(self.tardanza_ms)
+        return {
+            "direccion": self._direccion,
+            "comandos": self.comandos,
+            "preempciones": self.preempciones,
+            "renovaciones": self.renovaciones,
+            "paradas_hombre_muerto": self.paradas_hombre_muerto,
+            "errores": self.errores,
+            "tardanza_ms_p50": percentil(tardanza, 0.5),
+            "tardanza_ms_p95": percentil(tardanza, 0.95),
+        }
+
+    def close(self):
+        with self._cond:
+            self._running = False
+            self._plan.clear()
+            self._cond.notify_all()
+        if threading.current_thread() != self._thread:
+            self._thread.join(timeout=1)
+        self.aplicar_ruedas(0, 0)
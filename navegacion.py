@@ -0,0 +1,379 @@
+import logging
+import math
+import queue
+import threading
+import time
+import uuid
+from collections import deque
+from traza import percentil
+
+log = logging.getLogger("ferb.navegacion")
+
+
+def _wrap180(angle):
+    """
+    Normaliza un ángulo en grados al rango [-180, 180).
+    """
+    return (angle + 180.0) % 360.0 - 180.0
+
+
+class ControladorNavegacion:
+    """
+    Controlador continuo de navegación: en cada tick estima la posición (último fix GPS
+    fusionado con estima por rumbo de brújula), elige un punto objetivo por pure pursuit
+    sobre el tramo actual y aplica un PID al error de rumbo para fijar la velocidad de
+    cada rueda, sin detenerse entre correcciones.
+
+    Trabaja con tres funciones, así se puede correr igual sobre el robot o un simulador:
+        leer_fix() -> objeto con .seq, .lat, .lon (p. ej. gps.GPSFix) o None
+        leer_rumbo() -> grados (0 = norte) o None
+        aplicar_ruedas(izquierda, derecha) -> velocidades en [-1, 1]
+    """
+
+    def __init__(
+        self,
+        leer_fix,
+        leer_rumbo,
+        aplicar_ruedas,
+        rate_hz=10,
+        threshold=1.5,
+        velocidad=0.8,
+        velocidad_ms=0.5,
+        lookahead=3.0,
+        kp=0.015,
+        ki=0.0,
+        kd=0.002,
+        alpha_gps=0.5,
+        giro_en_sitio=60.0,
+        reloj=time.monotonic,
+        dormir=time.sleep,
+    ):
+        """
+        rate_hz: frecuencia del lazo de control.
+        threshold: distancia en metros para considerar alcanzado un waypoint.
+        velocidad: comando de avance en [0, 1]; velocidad_ms es la velocidad real que produce
+        (m/s), usada para la estima entre fixes.
+        lookahead: distancia en metros del punto objetivo sobre el tramo (pure pursuit).
+        kp, ki, kd: ganancias del PID sobre el error de rumbo (grados -> diferencia de ruedas).
+        alpha_gps: peso de cada fix nuevo al corregir la posición estimada.
+        giro_en_sitio: con un error de rumbo mayor (grados) el robot gira sin avanzar.
+        reloj/dormir: permiten correr el lazo en tiempo simulado.
+        """
+        self.leer_fix = leer_fix
+        self.leer_rumbo = leer_rumbo
+        self.aplicar_ruedas = aplicar_ruedas
+        self.periodo = 1.0 / rate_hz
+        self.threshold = threshold
+        self.velocidad = velocidad
+        self.velocidad_ms = velocidad_ms
+        self.lookahead = lookahead
+        self.kp = kp
+        self.ki = ki
+        self.kd = kd
+        self.alpha_gps = alpha_gps
+        self.giro_en_sitio = giro_en_sitio
+        self.reloj = reloj
+        self.dormir = dormir
+        self.telemetria = {}
+
+    def _punto_objetivo(self, ruta, idx, x, y):
+        """
+        Punto a lookahead metros por delante de la proyección de (x, y) sobre el tramo idx.
+        """
+        if idx == 0:
+            return ruta.xy[0]
+        along, _ = ruta.progreso_tramo(idx, x, y)
+        largo = ruta.longitudes[idx - 1]
+        s = min(max(along, 0.0) + self.lookahead, largo)
+        if largo == 0:
+            return ruta.xy[idx]
+        ax, ay = ruta.xy[idx - 1]
+        tx, ty = ruta.tramos[idx - 1]
+        return ax + tx * s / largo, ay + ty * s / largo
+
+    def run(self, ruta, detener=None, progreso=None, pausado=None):
+        """
+        Recorre la ruta (geodesia.Ruta). detener() -> True aborta la navegación.
+        pausado() -> True mantiene el robot detenido sin perder el avance de la ruta.
+        progreso(idx, distancia_restante, velocidad_ms) se llama en cada tick.
+        Devuelve True si se completó la ruta.
+        """
+        idx = 0
+        x = y = None
+        ultimo_fix = -1
+        integral = 0.0
+        error_previo = None
+        rumbo = None
+        izq = der = 0.0
+        periodos = deque(maxlen=10000)
+        ticks = 0
+        inicio = self.reloj()
+        anterior = inicio
+        siguiente = inicio
+        completada = False
+        try:
+            while True:
+                if detener is not None and detener():
+                    break
+                ahora = self.reloj()
+                dt = ahora - anterior
+                anterior = ahora
+                if ticks:
+                    periodos.append(dt)
+                ticks += 1
+
+                lectura = self.leer_rumbo()
+                if lectura is not None:
+                    rumbo = lectura
+
+                # Estima por rumbo entre fixes con la velocidad comandada en el tick anterior
+                if x is not None and rumbo is not None:
+                    recorrido = (izq + der) / 2 * self.velocidad_ms * dt
+                    x += recorrido * math.sin(math.radians(rumbo))
+                    y += recorrido * math.cos(math.radians(rumbo))
+
+                fix = self.leer_fix()
+                if fix is not None and fix.seq != ultimo_fix:
+                    ultimo_fix = fix.seq
+                    fx, fy = ruta.to_xy(fix.lat, fix.lon)
+                    if x is None:
+                        x, y = float(fx), float(fy)
+                    else:
+                        x += self.alpha_gps * (float(fx) - x)
+                        y += self.alpha_gps * (float(fy) - y)
+
+                if pausado is not None and pausado():
+                    izq = der = 0.0
+                    integral = 0.0
+                    error_previo = None
+                    self.aplicar_ruedas(0.0, 0.0)
+                elif x is None or rumbo is None:
+                    # Sin posición o rumbo todavía: quieto hasta el primer fix
+                    izq = der = 0.0
+                    self.aplicar_ruedas(0.0, 0.0)
+                else:
+                    while idx < len(ruta) and ruta.distancia_a(idx, x, y) < self.threshold:
+                        log.info("Punto %d/%d alcanzado.", idx + 1, len(ruta))
+                        idx += 1
+                        integral = 0.0
+                        error_previo = None
+                    if idx >= len(ruta):
+                        completada = True
+                        break
+
+                    tx, ty = self._punto_objetivo(ruta, idx, x, y)
+                    objetivo = math.degrees(math.atan2(tx - x, ty - y)) % 360
+                    error = _wrap180(objetivo - rumbo)
+                    if dt > 0:
+                        integral += error * dt
+                        derivada = (error - error_previo) / dt if error_previo is not None else 0.0
+                    else:
+                        derivada = 0.0
+                    error_previo = error
+                    giro = self.kp * error + self.ki * integral + self.kd * derivada
+                    giro = max(-1.0, min(1.0, giro))
+                    if abs(error) > self.giro_en_sitio:
+                        avance = 0.0
+                    else:
+                        avance = self.velocidad * math.cos(math.radians(error))
+                    # error > 0: el objetivo está a la derecha -> rueda izquierda más rápida
+                    izq, der = avance + giro, avance - giro
+                    escala = max(1.0, abs(izq), abs(der))
+                    izq, der = izq / escala, der / escala
+                    self.aplicar_ruedas(izq, der)
+                    if progreso is not None:
+                        progreso(idx, ruta.distancia_restante(idx, x, y), (izq + der) / 2 * self.velocidad_ms)
+
+                siguiente += self.periodo
+                espera = siguiente - self.reloj()
+                if espera > 0:
+                    self.dormir(espera)
+                else:
+                    # Tick atrasado: no intentar recuperar los ticks perdidos
+                    siguiente = self.reloj()
+        finally:
+            self.aplicar_ruedas(0.0, 0.0)
+            duracion = self.reloj() - inicio
+            jitter = [abs(p - self.periodo) for p in periodos]
+            self.telemetria = {
+                "completada": completada,
+                "duracion_s": duracion,
+                "ticks": ticks,
+                "waypoints_alcanzados": idx,
+                "periodo_medio_ms": sum(periodos) / len(periodos) * 1000 if periodos else 0.0,
+                "jitter_p50_ms": percentil(jitter, 0.5) * 1000,
+                "jitter_p95_ms": percentil(jitter, 0.95) * 1000,
+                "jitter_max_ms": max(jitter) * 1000 if jitter else 0.0,
+            }
+        return completada
+
+
+class TrabajoNavegacion:
+    """
+    Una ruta enviada a navegar: estado, progreso y controles de pausa/cancelación.
+    """
+
+    def __init__(self, ruta):
+        self.id = uuid.uuid4().hex[:8]
+        self.ruta = ruta
+        self.estado = "en_cola"  # en_cola, en_curso, pausado, completado, cancelado, error
+        self.error = None
+        self.tramo = 0
+        self.distancia_restante = None
+        self.eta_s = None
+        self.creado = time.time()
+        self.iniciado = None
+        self.terminado = None
+        self.version = 0  # Aumenta con cada cambio, para los streams de progreso
+        self._cancelar = threading.Event()
+        self._pausa = threading.Event()
+        self._velocidad_media = None
+
+    @property
+    def terminado_ok(self):
+        return self.estado in ("completado", "cancelado", "error")
+
+    def cancelar(self):
+        self._cancelar.set()
+        if self.estado == "en_cola":
+            self._terminar("cancelado")
+
+    def pausar(self):
+        if not self.terminado_ok:
+            self._pausa.set()
+            if self.estado == "en_curso":
+                self.estado = "pausado"
+            self.version += 1
+
+    def reanudar(self):
+        self._pausa.clear()
+        if self.estado == "pausado":
+            self.estado = "en_curso"
+        self.version += 1
+
+    def cancelado(self):
+        return self._cancelar.is_set()
+
+    def pausado(self):
+        return self._pausa.is_set()
+
+    def actualizar(self, tramo, distancia_restante, velocidad_ms):
+        """
+        Callback de progreso del controlador. La ETA usa una media móvil de la velocidad.
+        """
+        if velocidad_ms > 0:
+            if self._velocidad_media is None:
+                self._velocidad_media = velocidad_ms
+            else:
+                self._velocidad_media += 0.05 * (velocidad_ms - self._velocidad_media)
+        self.tramo = tramo
+        self.distancia_restante = distancia_restante
+        if self._velocidad_media:
+            self.eta_s = distancia_restante / self._velocidad_media
+        self.version += 1
+
+    def _iniciar(self):
+        self.iniciado = time.time()
+        self.estado = "pausado" if self.pausado() else "en_curso"
+        self.version += 1
+
+    def _terminar(self, estado, error=None):
+        self.estado = estado
+        self.error = error
+        self.terminado = time.time()
+        if estado == "completado":
+            self.distancia_restante = 0.0
+            self.eta_s = 0.0
+        self.version += 1
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "estado": self.estado,
+            "error": self.error,
+            "puntos": len(self.ruta),
+            "tramo_actual": self.tramo,
+            "distancia_restante_m": None if self.distancia_restante is None else round(self.distancia_restante, 2),
+            "eta_s": None if self.eta_s is None else round(self.eta_s, 1),
+            "creado": self.creado,
+            "iniciado": self.iniciado,
+            "terminado": self.terminado,
+        }
+
+
+class ColaNavegacion:
+    """
+    Ejecuta las rutas de una en una en un hilo propio. Las rutas nuevas se encolan en lugar
+    de bloquear a quien las envía.
+    """
+
+    def __init__(self, navegar, max_historial=50):
+        """
+        navegar(ruta, detener, pausado, progreso) recorre la ruta (ver Ferb.navigate).
+        """
+        self.navegar = navegar
+        self.trabajos = {}
+        self.max_historial = max_historial
+        self.actual = None
+        self._cola = queue.Queue()
+        self._hilo = None
+        self._lock = threading.Lock()
+
+    def enviar(self, ruta):
+        """
+        Encola una ruta y devuelve su TrabajoNavegacion.
+        """
+        trabajo = TrabajoNavegacion(ruta)
+        with self._lock:
+            self.trabajos[trabajo.id] = trabajo
+            self._podar()
+            if self._hilo is None or not self._hilo.is_alive():
+                self._hilo = threading.Thread(target=self._worker)
+                self._hilo.daemon = True
+                self._hilo.start()
+            # Dentro del lock: el worker solo termina si ve la cola vacía bajo el mismo lock
+            self._cola.put(trabajo)
+        return trabajo
+
+    def _podar(self):
+        terminados = [t for t in self.trabajos.values() if t.terminado_ok]
+        for t in terminados[: max(0, len(self.trabajos) - self.max_historial)]:
+            del self.trabajos[t.id]
+
+    def get(self, trabajo_id):
+        return self.trabajos.get(trabajo_id)
+
+    def listar(self):
+        return [t.to_dict() for t in self.trabajos.values()]
+
+    def cancelar_todo(self):
+        for trabajo in list(self.trabajos.values()):
+            trabajo.cancelar()
+
+    def _worker(self):
+        while True:
+            try:
+                trabajo = self._cola.get(timeout=5)
+            except queue.Empty:
+                with self._lock:
+                    if self._cola.empty():
+                        self._hilo = None
+                        return
+                continue
+            if trabajo.cancelado():
+                continue
+            self.actual = trabajo
+            trabajo._iniciar()
+            try:
+                completada = self.navegar(
+                    trabajo.ruta,
+                    detener=trabajo.cancelado,
+                    pausado=trabajo.pausado,
+                    progreso=trabajo.actualizar,
+                )
+                trabajo._terminar("completado" if completada else "cancelado")
+            except Exception as e:
+                log.exception("Error en la navegación %s: %s", trabajo.id, e)
+                trabajo._terminar("error", str(e))
+            finally:
+                self.actual = None
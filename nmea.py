@@ -0,0 +1,144 @@
+"""
+Parser NMEA sobre bytes para las sentencias que usa el robot (RMC, GGA, VTG).
+Trabaja directamente con los bytes del UART: no decodifica a str ni construye objetos
+por sentencia, y las sentencias mal formadas devuelven None en lugar de lanzar excepciones.
+
+Cada sentencia válida se devuelve como una tupla cuyo primer elemento es el tipo:
+    (b"RMC", valid, lat, lon, speed_knots, course)
+    (b"GGA", quality, satellites, hdop, lat, lon)
+    (b"VTG", course, speed_kmh)
+Los campos vacíos se devuelven como None.
+"""
+
+from functools import reduce
+from operator import xor
+import numpy as np
+
+RMC = b"RMC"
+GGA = b"GGA"
+VTG = b"VTG"
+
+_HEX = {f"{i:02X}".encode(): i for i in range(256)}
+_HEX.update({f"{i:02x}".encode(): i for i in range(256)})
+
+
+def _float(field):
+    return float(field) if field else None
+
+
+def _int(field):
+    return int(field) if field else None
+
+
+def _coord(field, hemi, deg_digits):
+    # ddmm.mmmm / dddmm.mmmm -> grados decimales
+    if not field:
+        return None
+    value = int(field[:deg_digits]) + float(field[deg_digits:]) / 60.0
+    return -value if hemi in (b"S", b"W") else value
+
+
+def _parse_fields(kind, fields):
+    if kind == RMC:
+        if len(fields) < 9:
+            return None
+        return (
+            RMC,
+            fields[2] == b"A",
+            _coord(fields[3], fields[4], 2),
+            _coord(fields[5], fields[6], 3),
+            _float(fields[7]),
+            _float(fields[8]),
+        )
+    if kind == GGA:
+        if len(fields) < 9:
+            return None
+        return (
+            GGA,
+            _int(fields[6]),
+            _int(fields[7]),
+            _float(fields[8]),
+            _coord(fields[2], fields[3], 2),
+            _coord(fields[4], fields[5], 3),
+        )
+    if kind == VTG:
+        if len(fields) < 8:
+            return None
+        return (VTG, _float(fields[1]), _float(fields[7]))
+    return None
+
+
+def checksum(body):
+    """
+    Checksum NMEA: XOR de los bytes entre "$" y "*" (body, sin esos delimitadores).
+    """
+    return reduce(xor, body, 0)
+
+
+def checksum_ok(sentence):
+    """
+    Verifica el checksum "*hh" de una sentencia que empieza con "$".
+    """
+    star = sentence.rfind(b"*")
+    if star < 1 or len(sentence) < star + 3:
+        return False
+    expected = _HEX.get(sentence[star + 1 : star + 3])
+    return expected is not None and checksum(sentence[1:star]) == expected
+
+
+def parse_sentence(sentence, types=(RMC, GGA, VTG)):
+    """
+    Parsea una sentencia (bytes, con o sin fin de línea).
+    Devuelve la tupla de la sentencia, o None si no es de un tipo soportado o es inválida.
+    """
+    start = sentence.find(b"$")
+    if start < 0:
+        return None
+    kind = sentence[start + 3 : start + 6]
+    if kind not in types:
+        return None
+    star = sentence.rfind(b"*")
+    if star < start or len(sentence) < star + 3:
+        return None
+    expected = _HEX.get(sentence[star + 1 : star + 3])
+    if expected is None or checksum(sentence[start + 1 : star]) != expected:
+        return None
+    try:
+        return _parse_fields(kind, sentence[start + 1 : star].split(b","))
+    except ValueError:
+        return None
+
+
+def parse_buffer(buffer, types=(RMC, GGA, VTG)):
+    """
+    Parsea de una vez un buffer con muchas sentencias (por ejemplo todo lo que hay en el UART).
+    Los checksums se validan vectorizados con NumPy sobre el buffer completo.
+    Devuelve (sentencias, resto): la lista de tuplas parseadas y los bytes de la última
+    sentencia incompleta, que deben anteponerse al siguiente buffer.
+    """
+    end = buffer.rfind(b"\n")
+    if end < 0:
+        return [], buffer
+    rest = buffer[end + 1 :]
+    data = np.frombuffer(buffer, dtype=np.uint8, count=end + 1)
+    acc = np.bitwise_xor.accumulate(data)
+    parsed = []
+    pos = 0
+    while pos <= end:
+        nl = buffer.find(b"\n", pos, end + 1)
+        start = buffer.find(b"$", pos, nl)
+        if start >= 0:
+            kind = buffer[start + 3 : start + 6]
+            star = buffer.rfind(b"*", start, nl)
+            if kind in types and star > start and nl - star >= 3:
+                expected = _HEX.get(buffer[star + 1 : star + 3])
+                # XOR de los bytes entre "$" y "*" = acc[star-1] ^ acc[start]
+                if expected is not None and int(acc[star - 1] ^ acc[start]) == expected:
+                    try:
+                        sentence = _parse_fields(kind, buffer[start + 1 : star].split(b","))
+                    except ValueError:
+                        sentence = None
+                    if sentence is not None:
+                        parsed.append(sentence)
+        pos = nl + 1
+    return parsed, rest
@@ -15,60 +15,147 @@ def estimar_distancia_caja(caja, focal=FOCAL_LENGTH_PIXELS, real_h=REAL_OBJECT_H
     distancia = (focal * real_h) / h
     return distancia
 
-def detectar_obstaculos(frame, min_area=2000, aspect_ratio_range=(0.3, 3.0)):
+class DetectorObstaculos:
+    """
+    Detector de obstáculos oscuros reutilizable. Reserva una vez todos los buffers
+    intermedios y el kernel morfológico, y puede procesar solo la franja inferior del frame
+    (donde está el piso) y a resolución reducida. detectar() no dibuja; las cajas se dibujan
+    aparte con dibujar(), solo cuando alguien está mirando.
+    """
+
+    def __init__(
+        self,
+        shape=(240, 320),
+        roi_inferior=1.0,
+        escala=1.0,
+        min_area=2000,
+        aspect_ratio_range=(0.3, 3.0),
+        umbral=60,
+    ):
+        """
+        shape: (alto, ancho) de los frames. roi_inferior: fracción inferior del frame que se
+        procesa (0.5 = mitad de abajo). escala: factor de reducción antes de procesar.
+        min_area se expresa en píxeles del frame original. Con roi_inferior < 1 las cajas que
+        cruzan el borde superior de la ROI quedan recortadas y su distancia es una cota superior.
+        """
+        self.shape = tuple(shape[:2])
+        self.roi_inferior = roi_inferior
+        self.escala = escala
+        self.min_area = min_area
+        self.aspect_ratio_range = aspect_ratio_range
+        self.umbral = umbral
+        alto, ancho = self.shape
+        self.y0 = int(round(alto * (1.0 - roi_inferior)))
+        self.size = (max(1, int(round(ancho * escala))), max(1, int(round((alto - self.y0) * escala))))
+        # Los kernels se escalan con la imagen para conservar el mismo efecto
+        self.blur_ksize = max(3, int(round(7 * escala)) | 1)
+        k = max(3, int(round(5 * escala)) | 1)
+        # Apertura seguida de cierre = erode(k), dilate(k), dilate(k), erode(k); las dos
+        # dilataciones seguidas equivalen a una sola con kernel de 2k-1, así son 3 pasadas
+        self.kernel = np.ones((k, k), np.uint8)
+        self.kernel_doble = np.ones((2 * k - 1, 2 * k - 1), np.uint8)
+        self._min_area_escalada = min_area * escala * escala
+        roi_shape = (alto - self.y0, ancho)
+        self._gray = np.empty(roi_shape, np.uint8)
+        self._small = np.empty((self.size[1], self.size[0]), np.uint8) if escala != 1.0 else self._gray
+        self._blurred = np.empty_like(self._small)
+        self._mask = np.empty_like(self._small)
+        self._tmp = np.empty_like(self._small)
+
+    def mascara(self, frame):
+        """
+        Máscara binaria de objetos oscuros de la ROI (en el buffer interno, a la escala de trabajo).
+        """
+        cv2.cvtColor(frame[self.y0 :], cv2.COLOR_RGB2GRAY, dst=self._gray)
+        if self._small is not self._gray:
+            cv2.resize(self._gray, self.size, dst=self._small, interpolation=cv2.INTER_AREA)
+        cv2.GaussianBlur(self._small, (self.blur_ksize, self.blur_ksize), 0, dst=self._blurred)
+        cv2.threshold(self._blurred, self.umbral, 255, cv2.THRESH_BINARY_INV, dst=self._mask)
+        cv2.erode(self._mask, self.kernel, dst=self._tmp)
+        cv2.dilate(self._tmp, self.kernel_doble, dst=self._mask)
+        cv2.erode(self._mask, self.kernel, dst=self._tmp)
+        return self._tmp
+
+    def detectar(self, frame):
+        """
+        Retorna la lista de ((x, y, w, h), distancia) en coordenadas del frame original.
+        """
+        if frame.shape[:2] != self.shape:
+            raise ValueError(f"Frame de {frame.shape[:2]}, el detector espera {self.shape}")
+        contours, _ = cv2.findContours(self.mascara(frame), cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+        resultados = []
+        inv = 1.0 / self.escala
+        for cnt in contours:
+            if cv2.contourArea(cnt) <= self._min_area_escalada:
+                continue
+            x, y, w, h = cv2.boundingRect(cnt)
+            aspect_ratio = w / float(h) if h != 0 else 0
+            if self.aspect_ratio_range[0] <= aspect_ratio <= self.aspect_ratio_range[1]:
+                caja = (
+                    int(round(x * inv)),
+                    int(round(y * inv)) + self.y0,
+                    int(round(w * inv)),
+                    int(round(h * inv)),
+                )
+                resultados.append((caja, estimar_distancia_caja(caja)))
+        return resultados
+
+    def __call__(self, frame, dibujar=False):
+        resultados = self.detectar(frame)
+        if dibujar:
+            dibujar_obstaculos(frame, resultados)
+        return resultados
+
+def dibujar_obstaculos(frame, resultados):
+    """
+    Dibuja las cajas y distancias de resultados sobre frame.
+    """
+    for (x, y, w, h), distancia in resultados:
+        cv2.rectangle(frame, (x, y), (x + w, y + h), (0, 255, 0), 2)
+        if distancia is not None:
+            cv2.putText(
+                frame,
+                f"{distancia:.1f}cm",
+                (x, y - 10),
+                cv2.FONT_HERSHEY_SIMPLEX,
+                0.7,
+                (0, 255, 0),
+                2,
+            )
+    return frame
+
+_detectores = {}
+
+def detectar_obstaculos(frame, min_area=2000, aspect_ratio_range=(0.3, 3.0), dibujar=True):
     """
     Detecta obstáculos en la imagen y dibuja cajas alrededor de ellos.
     Retorna la imagen con las cajas y una lista de las cajas encontradas.
     Aplica filtrado morfológico y filtrado por aspecto para mayor precisión.
+    Reutiliza un DetectorObstaculos de frame completo por forma de frame y parámetros.
     """
-    # Convertir a escala de grises
-    gray = cv2.cvtColor(frame, cv2.COLOR_RGB2GRAY)
-    # Desenfoque para reducir ruido
-    blurred = cv2.GaussianBlur(gray, (7, 7), 0)
-    # Umbral simple para detectar objetos oscuros
-    _, thresh = cv2.threshold(blurred, 60, 255, cv2.THRESH_BINARY_INV)
-    # Filtrado morfológico para limpiar ruido
-    kernel = np.ones((5, 5), np.uint8)
-    opened = cv2.morphologyEx(thresh, cv2.MORPH_OPEN, kernel)
-    closed = cv2.morphologyEx(opened, cv2.MORPH_CLOSE, kernel)
-    # Encontrar contornos
-    contours, _ = cv2.findContours(closed, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-    resultados = []
-    for cnt in contours:
-        area = cv2.contourArea(cnt)
-        if area > min_area:
-            x, y, w, h = cv2.boundingRect(cnt)
-            aspect_ratio = w / float(h) if h != 0 else 0
-            if aspect_ratio_range[0] <= aspect_ratio <= aspect_ratio_range[1]:
-                distancia = estimar_distancia_caja((x, y, w, h))
-                resultados.append(((x, y, w, h), distancia))
-                cv2.rectangle(frame, (x, y), (x + w, y + h), (0, 255, 0), 2)
-                if distancia is not None:
-                    cv2.putText(
-                        frame,
-                        f"{distancia:.1f}cm",
-                        (x, y - 10),
-                        cv2.FONT_HERSHEY_SIMPLEX,
-                        0.7,
-                        (0, 255, 0),
-                        2,
-                    )
-    return frame, resultados
+    clave = (frame.shape[:2], min_area, tuple(aspect_ratio_range))
+    detector = _detectores.get(clave)
+    if detector is None:
+        detector = DetectorObstaculos(frame.shape, min_area=min_area, aspect_ratio_range=aspect_ratio_range)
+        _detectores[clave] = detector
+    return frame, detector(frame, dibujar=dibujar)
 
 def modo_obstaculos(ferb):
     """
     Modo de detección de obstáculos: procesa frames y muestra las cajas.
     """
     print("Modo obstáculos activado")
+    try:
+        frames = ferb.subscribe_frames("obstaculos_debug")
+    except Exception as e:
+        print(f"No se pudo iniciar la cámara: {e}")
+        return
     while ferb.current_mode == "obstaculos":
-        if ferb.camera is None:
-            try:
-                ferb.start_camera()
-            except Exception as e:
-                print(f"No se pudo iniciar la cámara: {e}")
-                break
         try:
-            frame = ferb.camera.capture_array()
+            item = frames.read()
+            if item is None:
+                continue
+            _, _, frame = item
             frame, cajas = detectar_obstaculos(frame)
             # Mostrar la imagen con las cajas (solo para debug, quitar en producción)
             cv2.imshow("Obstaculos", cv2.cvtColor(frame, cv2.COLOR_RGB2BGR))
@@ -77,6 +164,7 @@ def modo_obstaculos(ferb):
         except Exception as e:
             print(f"Error en modo obstaculos: {e}")
             break
+    frames.close()
     cv2.destroyAllWindows()
 
 
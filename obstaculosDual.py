@@ -1,6 +1,6 @@
+import time
 import cv2
 import numpy as np
-from picamera2 import Picamera2
 
 # Ajusta estos valores según tu cámara y objeto de referencia
 FOCAL_LENGTH_PIXELS = 700  # Estimado, debes calibrar con tu cámara
@@ -16,34 +16,281 @@ def estimar_distancia_disparidad(disparidad, baseline_cm, focal_px):
     return (baseline_cm * focal_px) / disparidad
 
 
+class CamaraPicamera:
+    """
+    Picamera2 abierta una sola vez: la espera de arranque se paga al crearla, no por frame.
+    """
+
+    def __init__(self, size=(640, 480), raw_size=(1640, 1232), warmup=2):
+        from picamera2 import Picamera2
+
+        self.picam = Picamera2()
+        self.picam.configure(
+            self.picam.create_preview_configuration(
+                raw={"size": raw_size},
+                main={"format": "RGB888", "size": size},
+            )
+        )
+        self.picam.start()
+        time.sleep(warmup)
+
+    def capturar(self):
+        return self.picam.capture_array()
+
+    def close(self):
+        self.picam.close()
+
+
+class CamaraWebcam:
+    """
+    Webcam por cv2.VideoCapture abierta una sola vez; entrega frames RGB como la Picamera2.
+    """
+
+    def __init__(self, index=0, size=(640, 480)):
+        self.cap = cv2.VideoCapture(index)
+        if not self.cap.isOpened():
+            raise RuntimeError(f"No se pudo abrir la webcam {index}")
+        self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, size[0])
+        self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, size[1])
+        self.cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)  # Siempre el frame más reciente
+        self._bgr = None
+        self._rgb = None
+
+    def capturar(self):
+        ret, self._bgr = self.cap.read(self._bgr)
+        if not ret:
+            raise RuntimeError("No se pudo capturar frame de la webcam")
+        if self._rgb is None or self._rgb.shape != self._bgr.shape:
+            self._rgb = np.empty_like(self._bgr)
+        return cv2.cvtColor(self._bgr, cv2.COLOR_BGR2RGB, dst=self._rgb)
+
+    def close(self):
+        self.cap.release()
+
+
+class CalibracionEstereo:
+    """
+    Calibración de un par estéreo (intrínsecos K, distorsión D, rotación R y traslación T
+    de la cámara derecha respecto a la izquierda, en cm) y los mapas de rectificación.
+    Los mapas se calculan una vez por resolución de trabajo y se guardan en cache; remap
+    con mapas CV_16SC2 rectifica y reescala en una sola pasada.
+    """
+
+    def __init__(self, K1, D1, K2, D2, R, T, size):
+        self.K1 = np.asarray(K1, dtype=np.float64)
+        self.D1 = np.asarray(D1, dtype=np.float64)
+        self.K2 = np.asarray(K2, dtype=np.float64)
+        self.D2 = np.asarray(D2, dtype=np.float64)
+        self.R = np.asarray(R, dtype=np.float64)
+        self.T = np.asarray(T, dtype=np.float64).reshape(3, 1)
+        self.size = tuple(int(v) for v in size)  # (ancho, alto) de los frames de entrada
+        self.R1, self.R2, self.P1, self.P2, self.Q, _, _ = cv2.stereoRectify(
+            self.K1, self.D1, self.K2, self.D2, self.size, self.R, self.T, alpha=0
+        )
+        self._mapas = {}
+
+    @classmethod
+    def ideal(cls, size, focal_px=FOCAL_LENGTH_PIXELS, baseline_cm=6.0):
+        """
+        Par ideal ya rectificado (sin distorsión, cámaras paralelas), para pruebas.
+        """
+        K = [[focal_px, 0, size[0] / 2], [0, focal_px, size[1] / 2], [0, 0, 1]]
+        return cls(K, np.zeros(5), K, np.zeros(5), np.eye(3), [-baseline_cm, 0, 0], size)
+
+    @classmethod
+    def desde_archivo(cls, path):
+        """
+        Carga un .npz con K1, D1, K2, D2, R, T y size (como lo deja cv2.stereoCalibrate).
+        Si el archivo incluye mapas precalculados (ver guardar) se cargan sin recalcular.
+        """
+        datos = np.load(path)
+        calib = cls(datos["K1"], datos["D1"], datos["K2"], datos["D2"], datos["R"], datos["T"], datos["size"])
+        for nombre in datos.files:
+            if nombre.startswith("mapa_"):
+                # mapa_<ancho>x<alto>_<lado>_<xy|aux>
+                _, res, lado, parte = nombre.split("_")
+                ancho, alto = (int(v) for v in res.split("x"))
+                calib._mapas.setdefault((ancho, alto), [[None, None], [None, None]])
+                calib._mapas[(ancho, alto)][0 if lado == "izq" else 1][0 if parte == "xy" else 1] = datos[nombre]
+        calib._mapas = {k: (tuple(v[0]), tuple(v[1])) for k, v in calib._mapas.items()}
+        return calib
+
+    def guardar(self, path):
+        """
+        Guarda la calibración y los mapas ya calculados, para no recalcularlos al arrancar.
+        """
+        datos = dict(K1=self.K1, D1=self.D1, K2=self.K2, D2=self.D2, R=self.R, T=self.T, size=self.size)
+        for (ancho, alto), (izq, der) in self._mapas.items():
+            for lado, (xy, aux) in (("izq", izq), ("der", der)):
+                datos[f"mapa_{ancho}x{alto}_{lado}_xy"] = xy
+                datos[f"mapa_{ancho}x{alto}_{lado}_aux"] = aux
+        np.savez(path, **datos)
+
+    @property
+    def focal_px(self):
+        return float(self.P1[0, 0])
+
+    @property
+    def baseline_cm(self):
+        return float(abs(self.P2[0, 3] / self.P2[0, 0]))
+
+    def mapas(self, size):
+        """
+        ((map1, map2) izquierda, (map1, map2) derecha) que rectifican y llevan los frames a size.
+        """
+        size = tuple(int(v) for v in size)
+        if size not in self._mapas:
+            escala = np.diag([size[0] / self.size[0], size[1] / self.size[1], 1.0])
+            self._mapas[size] = tuple(
+                cv2.initUndistortRectifyMap(K, D, R, escala @ P[:, :3], size, cv2.CV_16SC2)
+                for K, D, R, P in ((self.K1, self.D1, self.R1, self.P1), (self.K2, self.D2, self.R2, self.P2))
+            )
+        return self._mapas[size]
+
+
+class SistemaEstereo:
+    """
+    Profundidad estéreo con cámaras, mapas de rectificación y matcher persistentes.
+    Trabaja a resolución reducida (escala) y solo sobre una banda horizontal del frame
+    (banda = fracciones de alto), que es donde aparecen los obstáculos a la altura del robot.
+    procesar() devuelve un perfil con la profundidad del obstáculo más cercano por columna.
+    """
+
+    def __init__(
+        self,
+        calibracion,
+        camara_izq=None,
+        camara_der=None,
+        escala=0.5,
+        banda=(0.35, 0.85),
+        num_disparidades=32,
+        block_size=9,
+        columnas=32,
+        percentil=90,
+    ):
+        """
+        num_disparidades y block_size se expresan a la resolución de trabajo.
+        columnas: cantidad de sectores del perfil. percentil: percentil de la disparidad de
+        cada columna que se toma como la del obstáculo más cercano (descarta manchas sueltas).
+        """
+        self.calibracion = calibracion
+        self.camara_izq = camara_izq
+        self.camara_der = camara_der
+        ancho, alto = calibracion.size
+        self.size = (int(round(ancho * escala)), int(round(alto * escala)))
+        self.y0 = int(round(self.size[1] * banda[0]))
+        self.y1 = int(round(self.size[1] * banda[1]))
+        self.columnas = columnas
+        self.percentil = percentil
+        # Los mapas de la banda son filas de los mapas completos: el remap solo toca la banda
+        (izq1, izq2), (der1, der2) = calibracion.mapas(self.size)
+        self._mapa_izq = (izq1[self.y0 : self.y1], izq2[self.y0 : self.y1])
+        self._mapa_der = (der1[self.y0 : self.y1], der2[self.y0 : self.y1])
+        self.stereo = cv2.StereoBM_create(numDisparities=num_disparidades, blockSize=block_size)
+        self.stereo.setUniquenessRatio(10)
+        self.stereo.setSpeckleWindowSize(50)
+        self.stereo.setSpeckleRange(2)
+        self.focal_px = calibracion.focal_px * self.size[0] / ancho
+        self.baseline_cm = calibracion.baseline_cm
+        banda_shape = (self.y1 - self.y0, self.size[0])
+        self._gray_izq = np.empty((alto, ancho), np.uint8)
+        self._gray_der = np.empty((alto, ancho), np.uint8)
+        self._rect_izq = np.empty(banda_shape, np.uint8)
+        self._rect_der = np.empty(banda_shape, np.uint8)
+        self.disparidad = np.empty(banda_shape, np.int16)  # Disparidad x16, como la entrega StereoBM
+        self._k = min(banda_shape[0] - 1, int(banda_shape[0] * percentil / 100))
+        self._bordes = np.linspace(0, self.size[0], columnas + 1).astype(int)
+        self.frames = 0
+        self.ultimo_ms = 0.0
+
+    def rectificar(self, frame_izq, frame_der):
+        """
+        Banda rectificada y reescalada de cada frame, en escala de grises. Los frames tienen
+        que tener el tamaño de la calibración (ValueError si no): con otro tamaño cvtColor
+        devolvería un array nuevo y remap seguiría leyendo el buffer viejo sin avisar.
+        """
+        alto, ancho = self._gray_izq.shape
+        for nombre, frame in (("izquierdo", frame_izq), ("derecho", frame_der)):
+            if frame.shape[:2] != (alto, ancho):
+                raise ValueError(
+                    f"Frame {nombre} de {frame.shape[1]}x{frame.shape[0]}; la calibración es de "
+                    f"{ancho}x{alto} (¿la cámara ignoró la resolución pedida?)"
+                )
+        cv2.cvtColor(frame_izq, cv2.COLOR_RGB2GRAY, dst=self._gray_izq)
+        cv2.cvtColor(frame_der, cv2.COLOR_RGB2GRAY, dst=self._gray_der)
+        cv2.remap(self._gray_izq, *self._mapa_izq, cv2.INTER_LINEAR, dst=self._rect_izq)
+        cv2.remap(self._gray_der, *self._mapa_der, cv2.INTER_LINEAR, dst=self._rect_der)
+        return self._rect_izq, self._rect_der
+
+    def perfil(self, disparidad):
+        """
+        Profundidad en cm del obstáculo más cercano en cada sector de columnas (inf si no hay
+        disparidad válida).
+        """
+        # Percentil alto por columna con partition (O(n)) en lugar de ordenar
+        cercana = np.partition(disparidad, self._k, axis=0)[self._k].astype(np.float32) / 16.0
+        por_sector = np.maximum.reduceat(cercana, self._bordes[:-1])
+        with np.errstate(divide="ignore"):
+            return np.where(por_sector > 0, self.focal_px * self.baseline_cm / por_sector, np.inf)
+
+    def procesar(self, frame_izq, frame_der):
+        """
+        Devuelve el perfil de profundidades (cm por sector, de izquierda a derecha).
+        La disparidad de la banda queda en self.disparidad.
+        """
+        t0 = time.perf_counter()
+        rect_izq, rect_der = self.rectificar(frame_izq, frame_der)
+        self.stereo.compute(rect_izq, rect_der, self.disparidad)
+        perfil = self.perfil(self.disparidad)
+        self.frames += 1
+        self.ultimo_ms = (time.perf_counter() - t0) * 1000
+        return perfil
+
+    def leer(self):
+        """
+        Captura de las dos cámaras y procesa el par.
+        """
+        return self.procesar(self.camara_izq.capturar(), self.camara_der.capturar())
+
+    def disparidad_visual(self):
+        """
+        Disparidad de la banda normalizada a uint8, para mostrarla.
+        """
+        return cv2.normalize(self.disparidad, None, 0, 255, cv2.NORM_MINMAX, cv2.CV_8U)
+
+    def close(self):
+        for camara in (self.camara_izq, self.camara_der):
+            if camara is not None:
+                camara.close()
+
+
+_picamera = None
+_matchers = {}
+
+
 def capturar_frame_picamera():
     """
     Captura un frame de la cámara Raspberry Pi (Picamera2).
+    La cámara se abre en la primera llamada y queda abierta para las siguientes.
     """
-    picam = Picamera2()
-    picam.configure(
-        picam.create_preview_configuration(
-            raw={"size": (1640, 1232)},
-            main={"format": "RGB888", "size": (640, 480)},
-        )
-    )
-    picam.start()
-    import time
-    time.sleep(2)
-    frame = picam.capture_array()
-    picam.close()
-    return frame
+    global _picamera
+    if _picamera is None:
+        _picamera = CamaraPicamera()
+    return _picamera.capturar()
 
 
 def detectar_obstaculos_dual(frame1, frame2, baseline_cm=6.0, focal_px=FOCAL_LENGTH_PIXELS):
     """
     Detecta obstáculos usando dos cámaras (frame1: picamera, frame2: webcam).
     Retorna el mapa de disparidad y la distancia estimada al obstáculo más cercano.
+    Sin rectificación; para uso continuo ver SistemaEstereo.
     """
     gray1 = cv2.cvtColor(frame1, cv2.COLOR_RGB2GRAY)
     gray2 = cv2.cvtColor(frame2, cv2.COLOR_RGB2GRAY)
-    # Usar StereoBM para calcular disparidad
-    stereo = cv2.StereoBM_create(numDisparities=64, blockSize=15)
+    # Usar StereoBM para calcular disparidad (un matcher por configuración, reutilizado)
+    stereo = _matchers.get((64, 15))
+    if stereo is None:
+        stereo = _matchers[(64, 15)] = cv2.StereoBM_create(numDisparities=64, blockSize=15)
     disparity = stereo.compute(gray1, gray2).astype(np.float32) / 16.0
     # Normalizar para visualización
     disp_vis = cv2.normalize(disparity, None, 0, 255, cv2.NORM_MINMAX)
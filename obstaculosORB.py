@@ -1,3 +1,4 @@
+import time
 import cv2
 import numpy as np
 
@@ -21,20 +22,29 @@ def estimar_distancia_keypoints(kp, focal=FOCAL_LENGTH_PIXELS, real_h=REAL_OBJEC
     return distancia
 
 
-def detectar_obstaculos_orb(frame, min_keypoints=10):
+_orb = None
+
+
+def _orb_compartido():
+    global _orb
+    if _orb is None:
+        _orb = cv2.ORB_create(nfeatures=500)
+    return _orb
+
+
+def detectar_obstaculos_orb(frame, min_keypoints=10, dibujar=True):
     """
     Detecta obstáculos usando puntos clave ORB, dibuja los keypoints y estima la distancia.
     Retorna la imagen con los keypoints y la distancia estimada.
+    Reutiliza un único detector ORB entre llamadas; con dibujar=False devuelve el frame sin tocar.
     """
     gray = cv2.cvtColor(frame, cv2.COLOR_RGB2GRAY)
-    orb = cv2.ORB_create(nfeatures=500)
-    kp = orb.detect(gray, None)
-    kp, des = orb.compute(gray, kp)
-    frame_kp = cv2.drawKeypoints(frame, kp, None, color=(0, 255, 0), flags=0)
+    kp, des = _orb_compartido().detectAndCompute(gray, None)
+    frame_kp = cv2.drawKeypoints(frame, kp, None, color=(0, 255, 0), flags=0) if dibujar else frame
     distancia = None
     if kp and len(kp) >= min_keypoints:
         distancia = estimar_distancia_keypoints(kp)
-        if distancia is not None:
+        if distancia is not None and dibujar:
             cv2.putText(
                 frame_kp,
                 f"Distancia aprox: {distancia:.1f}cm",
@@ -47,25 +57,193 @@ def detectar_obstaculos_orb(frame, min_keypoints=10):
     return frame_kp, distancia, kp
 
 
+class TrackerORB:
+    """
+    Seguimiento de features entre frames para detectar obstáculos que se acercan.
+    Un único detector ORB siembra los puntos (solo keypoints: los tracks no usan
+    descriptores), el flujo óptico de Lucas-Kanade los sigue frame a frame y solo se vuelve
+    a detectar cuando quedan menos de min_tracks. El tiempo hasta la colisión (TTC) sale de
+    la expansión de los puntos seguidos: si entre dos instantes separados dt la escala es s,
+    TTC = dt / (s - 1).
+    La escala se mide contra la posición de cada punto al inicio de una ventana de tiempo,
+    porque entre dos frames consecutivos la expansión es menor que el ruido de un píxel.
+    """
+
+    def __init__(
+        self,
+        nfeatures=200,
+        min_tracks=60,
+        min_keypoints=10,
+        ventana=0.3,
+        vigencia=0.6,
+        radio_mascara=8,
+        alpha=1.0,
+        lk_win=(11, 11),
+        lk_niveles=2,
+    ):
+        """
+        nfeatures: máximo de tracks vivos. min_keypoints: puntos necesarios para estimar la expansión.
+        ventana: segundos entre mediciones de escala. vigencia: segundos tras los que se descarta
+        un TTC que no se pudo volver a medir. radio_mascara: al re-detectar se ignoran
+        los alrededores de los tracks vivos. alpha: suavizado exponencial de la tasa de expansión (1 = solo la última ventana).
+        """
+        self.orb = cv2.ORB_create(nfeatures=nfeatures)
+        self.nfeatures = nfeatures
+        self.min_tracks = min_tracks
+        self.min_keypoints = min_keypoints
+        self.ventana = ventana
+        self.vigencia = vigencia
+        self.radio_mascara = radio_mascara
+        self.alpha = alpha
+        self.lk_params = dict(
+            winSize=lk_win,
+            maxLevel=lk_niveles,
+            criteria=(cv2.TERM_CRITERIA_EPS | cv2.TERM_CRITERIA_COUNT, 20, 0.03),
+        )
+        self.frames = 0
+        self.redetecciones = 0
+        self._gray = None
+        self._prev = None
+        self._mask = None
+        self.reset()
+
+    def reset(self):
+        self.puntos = np.empty((0, 1, 2), np.float32)  # Tracks vivos, formato de calcOpticalFlowPyrLK
+        self.anclas = np.empty((0, 1, 2), np.float32)  # Posición de cada track al inicio de la ventana (NaN si es nuevo)
+        self.expansion = None  # Tasa de expansión suavizada (1/s)
+        self.ttc = None  # Segundos hasta la colisión; None si nada se acerca
+        self._prev_ts = None
+        self._ancla_ts = None
+        self._medicion_ts = None
+
+    def _detectar(self):
+        """
+        Agrega features nuevas lejos de los tracks vivos.
+        """
+        self._mask.fill(255)
+        for x, y in self.puntos.reshape(-1, 2):
+            cv2.circle(self._mask, (int(x), int(y)), self.radio_mascara, 0, -1)
+        kp = self.orb.detect(self._gray, self._mask)
+        self.redetecciones += 1
+        if not kp:
+            return
+        kp = kp[: self.nfeatures - len(self.puntos)]
+        nuevos = np.array([p.pt for p in kp], np.float32).reshape(-1, 1, 2)
+        self.puntos = np.concatenate((self.puntos, nuevos))
+        self.anclas = np.concatenate((self.anclas, np.full_like(nuevos, np.nan)))
+
+    def _escala(self, p0, p1, max_grupos=3):
+        """
+        Escala del grupo de puntos que más se expande entre p0 y p1, o None.
+        Cada grupo es el consenso RANSAC de una transformación de similitud; se busca otro
+        grupo entre los puntos que quedaron fuera, porque cada obstáculo se expande a su
+        propio ritmo y un único ajuste promediaría el cercano con el fondo.
+        """
+        mejor = None
+        for _ in range(max_grupos):
+            if len(p0) < self.min_keypoints:
+                break
+            m, inliers = cv2.estimateAffinePartial2D(p0, p1, method=cv2.RANSAC, ransacReprojThreshold=1.0)
+            if m is None or inliers is None or int(inliers.sum()) < self.min_keypoints:
+                break
+            s = float(np.hypot(m[0, 0], m[1, 0]))
+            mejor = s if mejor is None else max(mejor, s)
+            fuera = inliers.reshape(-1) == 0
+            p0, p1 = p0[fuera], p1[fuera]
+        return mejor
+
+    def _medir_expansion(self, timestamp):
+        """
+        Actualiza expansion y ttc con la escala de la ventana que termina en timestamp.
+        Si no hay puntos suficientes para medirla, ambos vuelven a None: un TTC viejo
+        haría esquivar un obstáculo que ya no se ve.
+        """
+        dt = timestamp - self._ancla_ts
+        con_ancla = ~np.isnan(self.anclas[:, 0, 0])
+        s = self._escala(self.anclas[con_ancla], self.puntos[con_ancla])
+        if s is not None and dt > 0:
+            tasa = (s - 1.0) / dt
+            self.expansion = tasa if self.expansion is None else self.alpha * tasa + (1 - self.alpha) * self.expansion
+            self.ttc = 1.0 / self.expansion if self.expansion > 0 else None
+            self._medicion_ts = timestamp
+        else:
+            self._olvidar()
+        self.anclas = self.puntos.copy()
+        self._ancla_ts = timestamp
+
+    def _olvidar(self):
+        self.expansion = None
+        self.ttc = None
+        self._medicion_ts = None
+
+    def procesar(self, frame, timestamp=None):
+        """
+        Procesa un frame (RGB) y devuelve (puntos, ttc). timestamp en segundos (por defecto
+        time.monotonic()); con los frames del bus conviene pasar el ts de la captura.
+        """
+        if timestamp is None:
+            timestamp = time.monotonic()
+        if self._gray is None or self._gray.shape != frame.shape[:2]:
+            self._gray = np.empty(frame.shape[:2], np.uint8)
+            self._prev = np.empty_like(self._gray)
+            self._mask = np.empty_like(self._gray)
+            self.reset()
+        self._gray, self._prev = self._prev, self._gray
+        cv2.cvtColor(frame, cv2.COLOR_RGB2GRAY, dst=self._gray)
+        self.frames += 1
+
+        if len(self.puntos) and self._prev_ts is not None:
+            p1, status, _ = cv2.calcOpticalFlowPyrLK(self._prev, self._gray, self.puntos, None, **self.lk_params)
+            vivos = status.reshape(-1).astype(bool)
+            self.puntos = p1[vivos]
+            self.anclas = self.anclas[vivos]
+        if self._ancla_ts is None:
+            self.anclas = self.puntos.copy()
+            self._ancla_ts = timestamp
+        elif timestamp - self._ancla_ts >= self.ventana:
+            self._medir_expansion(timestamp)
+        if self._medicion_ts is not None and timestamp - self._medicion_ts > self.vigencia:
+            self._olvidar()
+
+        if len(self.puntos) < self.min_tracks:
+            self._detectar()
+        self._prev_ts = timestamp
+        return self.puntos, self.ttc
+
+    def dibujar(self, frame):
+        """
+        Dibuja los tracks vivos y el TTC sobre frame.
+        """
+        for x, y in self.puntos.reshape(-1, 2):
+            cv2.circle(frame, (int(x), int(y)), 2, (0, 255, 0), -1)
+        texto = f"TTC: {self.ttc:.1f}s" if self.ttc is not None else "TTC: -"
+        cv2.putText(frame, texto, (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 255, 0), 2)
+        return frame
+
+
 def modo_obstaculos_orb(ferb):
     """
-    Modo de detección de obstáculos usando ORB: procesa frames y muestra los keypoints.
+    Modo de detección de obstáculos usando ORB: sigue features entre frames y muestra los tracks y el TTC.
     """
     print("Modo obstáculos ORB activado")
+    try:
+        frames = ferb.subscribe_frames("obstaculos_orb")
+    except Exception as e:
+        print(f"No se pudo iniciar la cámara: {e}")
+        return
+    tracker = TrackerORB()
     while ferb.current_mode == "obstaculos_orb":
-        if ferb.camera is None:
-            try:
-                ferb.start_camera()
-            except Exception as e:
-                print(f"No se pudo iniciar la cámara: {e}")
-                break
         try:
-            frame = ferb.camera.capture_array()
-            frame_kp, distancia, kp = detectar_obstaculos_orb(frame)
-            cv2.imshow("Obstaculos ORB", cv2.cvtColor(frame_kp, cv2.COLOR_RGB2BGR))
+            item = frames.read()
+            if item is None:
+                continue
+            _, ts, frame = item
+            tracker.procesar(frame, ts)
+            cv2.imshow("Obstaculos ORB", cv2.cvtColor(tracker.dibujar(frame), cv2.COLOR_RGB2BGR))
             if cv2.waitKey(1) & 0xFF == ord('q'):
                 break
         except Exception as e:
             print(f"Error en modo obstaculos ORB: {e}")
             break
+    frames.close()
     cv2.destroyAllWindows()
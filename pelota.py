@@ -0,0 +1,310 @@
+"""
+Seguimiento de la pelota azul del modo perrito. El color se clasifica con una tabla 3D
+precalculada indexada por (B, G, R) cuantizados, sin convertir el frame a HSV. Mientras la
+pelota está a la vista solo se busca en una ventana alrededor de la posición que predice un
+filtro de Kalman; si se pierde, se busca en el frame completo a resolución reducida.
+ControladorSeguimiento convierte cada detección en la velocidad de las ruedas.
+"""
+
+import time
+from collections import deque
+import cv2
+import numpy as np
+from traza import percentil
+
+# Rango HSV de la pelota (OpenCV: H en [0, 180))
+AZUL_HSV = ((90, 50, 70), (128, 255, 255))
+
+
+def tabla_color(hsv_min, hsv_max, bits=5):
+    """
+    Tabla de 2^(3*bits) entradas: 255 si el color (B, G, R) cuantizado a bits por canal cae
+    en [hsv_min, hsv_max], 0 si no. Cada celda se evalúa en su color central.
+    """
+    niveles = 1 << bits
+    paso = 256 // niveles
+    centros = (np.arange(niveles, dtype=np.uint8) * paso + paso // 2).astype(np.uint8)
+    b, g, r = np.meshgrid(centros, centros, centros, indexing="ij")
+    colores = np.stack([b, g, r], axis=-1).reshape(-1, 1, 3)
+    hsv = cv2.cvtColor(colores, cv2.COLOR_BGR2HSV)
+    return cv2.inRange(hsv, hsv_min, hsv_max).reshape(-1)
+
+
+def _limitar(valor, tope):
+    return max(-tope, min(tope, valor))
+
+
+class KalmanPosicion:
+    """
+    Filtro de Kalman de velocidad constante sobre (x, y) en píxeles, con dt variable.
+    """
+
+    def __init__(self, ruido_proceso=500.0, ruido_medicion=4.0):
+        self.kf = cv2.KalmanFilter(4, 2)
+        self.kf.measurementMatrix = np.array([[1, 0, 0, 0], [0, 1, 0, 0]], np.float32)
+        self.kf.measurementNoiseCov = np.eye(2, dtype=np.float32) * ruido_medicion
+        self.ruido_proceso = ruido_proceso
+        self.t = None
+
+    def reset(self, x, y, t):
+        self.kf.statePost = np.array([[x], [y], [0], [0]], np.float32)
+        self.kf.errorCovPost = np.diag([10, 10, 1e4, 1e4]).astype(np.float32)
+        self.t = t
+
+    def predecir(self, t):
+        """
+        Posición (x, y) predicha para el instante t.
+        """
+        dt = max(t - self.t, 1e-3)
+        self.kf.transitionMatrix = np.array(
+            [[1, 0, dt, 0], [0, 1, 0, dt], [0, 0, 1, 0], [0, 0, 0, 1]], np.float32
+        )
+        # Aceleración aleatoria: la incertidumbre de la velocidad crece con dt
+        q = self.ruido_proceso
+        self.kf.processNoiseCov = np.diag([q * dt**3 / 3, q * dt**3 / 3, q * dt, q * dt]).astype(np.float32)
+        self.t = t
+        estado = self.kf.predict()
+        return float(estado[0, 0]), float(estado[1, 0])
+
+    def corregir(self, x, y):
+        self.kf.correct(np.array([[x], [y]], np.float32))
+
+    @property
+    def velocidad(self):
+        return float(self.kf.statePost[2, 0]), float(self.kf.statePost[3, 0])
+
+
+class TrackerPelota:
+    """
+    Detecta y sigue la pelota en frames BGR. procesar() devuelve (x, y, radio) en píxeles
+    del frame original, o None.
+    """
+
+    def __init__(
+        self,
+        shape=(240, 320),
+        escala=0.5,
+        hsv_min=AZUL_HSV[0],
+        hsv_max=AZUL_HSV[1],
+        bits=5,
+        radio_min=2.0,
+        margen=3.0,
+        lado_min=40,
+        max_perdidos=3,
+    ):
+        """
+        shape: (alto, ancho) de los frames.
+        escala: factor de la búsqueda en el frame completo (la ventana se procesa a escala 1).
+        bits: bits por canal de la tabla de color (5 -> 32768 entradas).
+        radio_min: radio mínimo en píxeles del frame original para aceptar una detección.
+        margen: lado de la ventana en radios de la pelota, más lo que se movió desde el frame anterior.
+        max_perdidos: frames seguidos sin pelota en la ventana antes de volver al frame completo.
+        """
+        self.shape = tuple(shape[:2])
+        self.escala = escala
+        self.bits = bits
+        self.radio_min = radio_min
+        self.margen = margen
+        self.lado_min = lado_min
+        self.max_perdidos = max_perdidos
+        self.tabla = tabla_color(hsv_min, hsv_max, bits)
+        alto, ancho = self.shape
+        self._chico = (max(1, int(round(ancho * escala))), max(1, int(round(alto * escala))))
+        self._reducido = np.empty((self._chico[1], self._chico[0], 3), np.uint8)
+        self.kalman = KalmanPosicion()
+        self.pelota = None  # Última detección (x, y, radio)
+        self.ventana = None  # (x0, y0, x1, y1) de la última búsqueda local, para dibujar
+        self.perdidos = 0
+        self.frames = 0
+        self.busquedas_completas = 0
+        self.ultimo_ms = 0.0
+
+    def reset(self):
+        self.pelota = None
+        self.ventana = None
+        self.perdidos = 0
+
+    def mascara(self, region):
+        """
+        Máscara 0/255 de los píxeles del color de la pelota, vía la tabla (sin pasar a HSV).
+        """
+        shift = 8 - self.bits
+        indice = (region[..., 0] >> shift).astype(np.uint16) << (2 * self.bits)
+        indice |= (region[..., 1] >> shift).astype(np.uint16) << self.bits
+        indice |= region[..., 2] >> shift
+        mascara = self.tabla[indice]
+        # Apertura 3x3: quita píxeles sueltos sin achicar la pelota
+        return cv2.morphologyEx(mascara, cv2.MORPH_OPEN, None)
+
+    def _buscar(self, region, x0, y0, escala):
+        contornos, _ = cv2.findContours(self.mascara(region), cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+        if not contornos:
+            return None
+        c = max(contornos, key=cv2.contourArea)
+        (x, y), r = cv2.minEnclosingCircle(c)
+        r /= escala
+        if r < self.radio_min:
+            return None
+        return x0 + x / escala, y0 + y / escala, r
+
+    def procesar(self, frame, t=None):
+        t0 = time.perf_counter()
+        t = time.monotonic() if t is None else t
+        alto, ancho = self.shape
+        pelota = None
+        if self.pelota is not None:
+            px, py = self.kalman.predecir(t)
+            _, _, r = self.pelota
+            # La ventana cubre la pelota y lo que se desvió la predicción del frame anterior
+            lado = max(self.lado_min, self.margen * 2 * r)
+            x0 = int(max(0, min(px - lado / 2, ancho - 1)))
+            y0 = int(max(0, min(py - lado / 2, alto - 1)))
+            x1 = int(min(ancho, max(px + lado / 2, x0 + 1)))
+            y1 = int(min(alto, max(py + lado / 2, y0 + 1)))
+            self.ventana = (x0, y0, x1, y1)
+            pelota = self._buscar(frame[y0:y1, x0:x1], x0, y0, 1.0)
+            if pelota is None:
+                self.perdidos += 1
+                if self.perdidos <= self.max_perdidos:
+                    self.ultimo_ms = (time.perf_counter() - t0) * 1000
+                    self.frames += 1
+                    return None  # Puede ser una oclusión breve: se sigue buscando cerca
+        if pelota is None:
+            self.ventana = None
+            self.busquedas_completas += 1
+            cv2.resize(frame, self._chico, dst=self._reducido, interpolation=cv2.INTER_AREA)
+            pelota = self._buscar(self._reducido, 0, 0, self.escala)
+            if pelota is not None:
+                self.kalman.reset(pelota[0], pelota[1], t)
+        else:
+            self.kalman.corregir(pelota[0], pelota[1])
+        self.pelota = pelota
+        if pelota is not None:
+            self.perdidos = 0
+        self.frames += 1
+        self.ultimo_ms = (time.perf_counter() - t0) * 1000
+        return pelota
+
+    def dibujar(self, frame):
+        if self.ventana is not None:
+            x0, y0, x1, y1 = self.ventana
+            cv2.rectangle(frame, (x0, y0), (x1, y1), (255, 255, 0), 1)
+        if self.pelota is not None:
+            x, y, r = self.pelota
+            cv2.circle(frame, (int(x), int(y)), int(r), (0, 255, 255), 2)
+
+    def stats(self):
+        return {
+            "frames": self.frames,
+            "busquedas_completas": self.busquedas_completas,
+            "ultimo_ms": self.ultimo_ms,
+            "pelota": self.pelota,
+        }
+
+
+class ControladorSeguimiento:
+    """
+    Controlador proporcional del modo perrito: en cada frame mapea el error horizontal de la
+    pelota a un giro y el error de radio a un avance, y los mezcla en la velocidad de cada
+    rueda (convención de movimiento.DIRECCIONES: izquierda > derecha gira a la derecha).
+    Las posiciones y radios están en píxeles de un frame de "ancho" píxeles de ancho.
+
+    No mueve motores: actualizar() devuelve (izq, der) y el llamador los aplica, así el
+    mismo controlador corre sobre el robot o en tiempo simulado.
+    """
+
+    def __init__(
+        self,
+        ancho=600,
+        radio_min=70,
+        radio_max=100,
+        kp_giro=0.8,
+        kd_giro=0.05,
+        kp_avance=3.0,
+        zona_muerta=15,
+        max_giro=0.7,
+        max_avance=0.8,
+        tiempo_perdida=0.3,
+        signo_giro=1,
+        historial=200,
+    ):
+        """
+        radio_min/radio_max: banda de radios de la pelota a la distancia deseada; dentro de la
+        banda no se avanza ni se retrocede.
+        kp_giro, kd_giro: giro por unidad de error horizontal (error / medio ancho) y por
+        unidad de su derivada en 1/s.
+        kp_avance: avance por unidad de error de radio relativo a la banda.
+        zona_muerta: error horizontal en píxeles que se ignora, para no temblar centrado.
+        max_giro/max_avance: topes de cada componente en [0, 1].
+        tiempo_perdida: segundos sin pelota tras los que se detienen las ruedas.
+        signo_giro: 1 si los motores siguen movimiento.DIRECCIONES (pelota a la derecha ->
+        izquierda > derecha), -1 si el cableado tiene los lados invertidos.
+        """
+        self.centro = ancho / 2
+        self.radio_min = radio_min
+        self.radio_max = radio_max
+        self.kp_giro = kp_giro
+        self.kd_giro = kd_giro
+        self.kp_avance = kp_avance
+        self.zona_muerta = zona_muerta
+        self.max_giro = max_giro
+        self.max_avance = max_avance
+        self.tiempo_perdida = tiempo_perdida
+        self.signo_giro = signo_giro
+        self.ruedas = (0.0, 0.0)
+        self.reaccion_ms = deque(maxlen=historial)  # Captura del frame -> comando en las ruedas
+        self.actualizaciones = 0
+        self._error_previo = None  # (error, t)
+        self._visto = None  # t de la última detección
+
+    def reset(self):
+        self.ruedas = (0.0, 0.0)
+        self._error_previo = None
+        self._visto = None
+
+    def actualizar(self, pelota, t):
+        """
+        pelota: (x, y, radio) o None. t: instante del frame en segundos. Devuelve (izq, der).
+        """
+        self.actualizaciones += 1
+        if pelota is None:
+            # Una pérdida breve mantiene el último comando; si sigue, se detiene
+            if self._visto is None or t - self._visto > self.tiempo_perdida:
+                self.reset()
+            return self.ruedas
+        x, _, radio = pelota
+        self._visto = t
+
+        error = x - self.centro
+        if abs(error) <= self.zona_muerta:
+            error = 0.0
+        error /= self.centro
+        derivada = 0.0
+        if self._error_previo is not None and t > self._error_previo[1]:
+            derivada = (error - self._error_previo[0]) / (t - self._error_previo[1])
+        self._error_previo = (error, t)
+        giro = self.signo_giro * _limitar(self.kp_giro * error + self.kd_giro * derivada, self.max_giro)
+
+        # Error de radio fuera de la banda, relativo al borde más cercano
+        if radio < self.radio_min:
+            error_radio = (self.radio_min - radio) / self.radio_min
+        elif radio > self.radio_max:
+            error_radio = (self.radio_max - radio) / self.radio_max
+        else:
+            error_radio = 0.0
+        # Con la pelota muy de costado primero se gira: avanzar la sacaría del cuadro
+        avance = _limitar(self.kp_avance * error_radio, self.max_avance) * max(0.0, 1.0 - abs(error))
+
+        izq, der = avance + giro, avance - giro
+        escala = max(1.0, abs(izq), abs(der))
+        self.ruedas = (izq / escala, der / escala)
+        return self.ruedas
+
+    def stats(self):
+        reaccion = list(self.reaccion_ms)
+        return {
+            "actualizaciones": self.actualizaciones,
+            "ruedas": self.ruedas,
+            "reaccion_ms_p50": percentil(reaccion, 0.5),
+            "reaccion_ms_p95": percentil(reaccion, 0.95),
+        }
@@ -1,111 +1,111 @@
-import cv2
-import time
-import imutils
-import numpy as np
-from collections import deque
-from picamera2 import Picamera2
+import logging
 from typing import TYPE_CHECKING
-from time import sleep
+from modos import TokenCancelacion
+from pelota import ControladorSeguimiento, TrackerPelota
 
 if TYPE_CHECKING:
     from ferb import Ferb
 
-BUFF_SIZE = 64
+log = logging.getLogger("ferb.perrito")
 
 # Config colors
 blue_lower = (90, 50, 70)
 blue_upper = (128, 255, 255)
 
 # --- Configuración de Control del Robot ---
-# Estas dimensiones deben coincidir con las usadas en vision_module después del reescalado
-# Obtenemos estas dimensiones del vision_module para asegurar consistencia.
+# La pelota se detecta a la resolución de la cámara (ver pelota.TrackerPelota), pero las
+# tolerancias y radios objetivo están en píxeles de un frame de FRAME_WIDTH de ancho.
 # FRAME_WIDTH se usa para calcular FRAME_CENTER_X.
-# FRAME_HEIGHT se usa para dibujar en el display.
-FRAME_WIDTH = 600 # Usar la constante de vision_module
+FRAME_WIDTH = 600
 # FRAME_HEIGHT se obtendrá dinámicamente
 
 FRAME_CENTER_X = FRAME_WIDTH // 2
 
-# Tolerancias y radios objetivo para el control
-CENTER_X_TOLERANCE = 80
+# Banda de radios de la pelota a la distancia deseada
 TARGET_RADIUS_MIN = 70
 TARGET_RADIUS_MAX = 100
-RADIUS_ADJUST_TOLERANCE = 7
+# Error horizontal que se ignora (el controlador es proporcional, ya no hay ráfagas)
+CENTER_X_TOLERANCE = 15
+# Vencimiento de cada comando de ruedas: si el lazo se traba, el robot se detiene solo
+HOMBRE_MUERTO = 0.3
+# Sentido del giro hacia la pelota. El perrito original giraba "left" con la pelota a la
+# derecha, a propósito: en el robot los motores están cableados con los lados invertidos
+# respecto de movimiento.DIRECCIONES. Un backend puede declarar el suyo (ver
+# HardwareSimulado.signo_giro).
+SIGNO_GIRO = -1
 
-def perrito_mode(robot: "Ferb"):
+
+def perrito_mode(robot: "Ferb", token=None):
     """
-    Modo perrito
+    Modo perrito. Corre hasta que se cancele token (por defecto, hasta salir del modo "dog").
     """
+    token = token or TokenCancelacion(robot, "dog")
+    try:
+        frames = robot.subscribe_frames("perrito")
+    except Exception as e:
+        log.error("No se pudo iniciar la cámara: %s", e)
+        return
+    controlador = ControladorSeguimiento(
+        FRAME_WIDTH,
+        TARGET_RADIUS_MIN,
+        TARGET_RADIUS_MAX,
+        zona_muerta=CENTER_X_TOLERANCE,
+        tiempo_perdida=HOMBRE_MUERTO,
+        signo_giro=getattr(robot.hardware, "signo_giro", SIGNO_GIRO),
+    )
+    robot.dog_controller = controlador
+    try:
+        _perrito_loop(robot, frames, token, controlador)
+    finally:
+        robot.movimiento.detener()  # No dejar las ruedas en marcha al cambiar de modo
+        robot.set_stream_overlay(None)
+        robot.last_dog_stats = controlador.stats()
+        robot.last_dog_stats["running"] = False
+        robot.dog_controller = None
+        frames.close()
+
+
+def _perrito_loop(robot: "Ferb", frames, token, controlador):
+    tracker = None  # Se crea con la forma del primer frame
+    anterior = None  # Último (izq, der) mandado, para imprimir solo los cambios de estado
     while True:
-        if robot.current_mode != "dog":
-            print("Modo perrito detenido.")
+        if token.cancelado:
+            log.info("Modo perrito detenido.")
             break
 
-        if robot.camera is None:
-            print("Error: Cámara no inicializada.")
-            continue
-
-        img = robot.camera.capture_array()
-        frame = img
-        if frame is None:
-            print("Error: No se pudo capturar frame de la cámara.")
+        item = frames.read()
+        if item is None:
+            if frames.detenido:
+                # Sin cámara el modo no puede seguir: el supervisor lo da por terminado
+                raise RuntimeError(f"La cámara dejó de capturar: {frames.bus.error}")
+            log.warning("No se pudo capturar frame de la cámara.")
             continue
+        _, ts, frame = item
+        traza = robot.traza.frame("perrito", ts)
+        traza.marca("entrega")
+        if tracker is None or tracker.shape != frame.shape[:2]:
+            tracker = TrackerPelota(frame.shape, hsv_min=blue_lower, hsv_max=blue_upper)
+            # La pelota y la ventana de búsqueda solo se dibujan en el stream
+            robot.set_stream_overlay(tracker.dibujar)
+        pelota = tracker.procesar(frame, ts)
+        traza.marca("inferencia")
+        if pelota is not None:
+            # Las constantes de control están en píxeles de un frame de FRAME_WIDTH de ancho
+            factor = FRAME_WIDTH / frame.shape[1]
+            pelota = tuple(v * factor for v in pelota)
 
-        # resize the frame, blur it, and convert it to the HSV
-        # color space
-        frame = imutils.resize(frame, width=600)
-        blurred = cv2.GaussianBlur(frame, (11, 11), 0)
-        hsv = cv2.cvtColor(blurred, cv2.COLOR_BGR2HSV)
-        # construct a mask for the color blue, then perform
-        # a series of dilations and erosions to remove any small
-        # blobs left in the mask
-        # 
-        mask = cv2.inRange(hsv, blue_lower, blue_upper)
-        mask = cv2.erode(mask, None, iterations=2)
-
-        # find contours in the mask and initialize the current
-        # (x, y) center of the ball
-        contours = cv2.findContours(mask.copy(), cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-        contours = imutils.grab_contours(contours)
-        center = None
-        mask = cv2.dilate(mask, None, iterations=2)
-        # only proceed if at least one contour was found
-        if len(contours) > 0:
-            print(f"CONTROL: Se detectó {len(contours)} contornos.")
-            # find the largest contour in the mask, then use
-            # it to compute the minimum enclosing circle and
-            # centroid
-            c = max(contours, key=cv2.contourArea)
-            ((x, y), radius) = cv2.minEnclosingCircle(c)
-
-            if x and radius:
-                error_x = x - FRAME_CENTER_X
-
-                if abs(error_x) > CENTER_X_TOLERANCE:
-                    print(f"CONTROL: Pelota a la DERECHA (error {error_x}px). Robot girando IZQUIERDA.")
-                    if error_x > 0: # Pelota a la derecha del centro
-                        print(f"CONTROL: Pelota a la DERECHA (error {error_x}px). Robot girando IZQUIERDA.")
-                        robot.move("left", duration=0.25)
-                    else: # Pelota a la izquierda del centro
-                        print(f"CONTROL: Pelota a la IZQUIERDA (error {error_x}px). Robot girando DERECHA.")
-                        robot.move("right", duration=0.25)
-                else:
-                    print(f"CONTROL: Centrado en X OK (error {error_x}px).")
-                    robot.move("stop")
-
-                # 2. Ajustar la distancia basada en el radio de la pelota
-                # Solo ajustar distancia si no se realizó una acción de rotación en este ciclo
-                # para evitar movimientos combinados que pueden ser erráticos con "ráfagas".
-                if radius < TARGET_RADIUS_MIN - RADIUS_ADJUST_TOLERANCE:
-                    print(f"CONTROL: Pelota PEQUEÑA (radio {radius}px). Acercándose.")
-                    robot.move("forward", duration=0.75)
-                elif radius > TARGET_RADIUS_MAX + RADIUS_ADJUST_TOLERANCE:
-                    print(f"CONTROL: Pelota GRANDE (radio {radius}px). Alejándose.")
-                    robot.move("backward", duration=0.75)
-                else:
-                    print(f"CONTROL: Distancia OK (radio {radius}px).")
-                    robot.move("stop")
-                
-                robot.move("stop")
+        # Un comando por frame, sin esperar: el planificador lo aplica y lo vence solo
+        izq, der = controlador.actualizar(pelota, ts)
+        traza.marca("decision")
+        robot.movimiento.mantener_ruedas(izq, der, "perrito", hombre_muerto=HOMBRE_MUERTO)
+        traza.fin()
+        controlador.reaccion_ms.append((traza.ultima - ts) * 1000)
 
-        sleep(0.75)
+        if (pelota is None) != (anterior is None):
+            if pelota is None:
+                log.info("CONTROL: Pelota perdida.")
+            else:
+                log.info("CONTROL: Pelota en (%.0f, %.0f), radio %.0fpx. Siguiendo.", *pelota)
+        elif pelota is not None:
+            log.debug("CONTROL: Pelota en (%.0f, %.0f), radio %.0fpx, ruedas (%.2f, %.2f).", *pelota, izq, der)
+        anterior = pelota
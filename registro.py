@@ -0,0 +1,226 @@
+"""
+Logging de Ferb sobre el módulo logging estándar. Los módulos usan
+logging.getLogger("ferb.<módulo>") con formato diferido ("... %s", valor); configurar()
+instala en el logger "ferb" un handler que solo encola el registro, y un hilo aparte lo
+formatea y lo escribe en la consola y en un archivo JSON lines rotativo (un anillo de
+copias archivos de max_bytes). Cada mensaje DEBUG o INFO se limita a una emisión por
+intervalo: los repetidos se descartan antes de encolarse y se cuentan en la siguiente
+emisión. WARNING y superiores no se limitan nunca.
+El nivel se puede cambiar en caliente (ver set_level y /log/level en main.py).
+"""
+
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import threading
+import time
+
+RAIZ = "ferb"
+NIVELES = ("DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL")
+
+
+class FiltroFrecuencia(logging.Filter):
+    """
+    Deja pasar cada mensaje (logger, nivel, plantilla y argumentos, sin formatear) a lo sumo
+    una vez por intervalo segundos: "Punto %d/%d alcanzado." con otros números es otro
+    mensaje. Los descartados se cuentan en record.suprimidos de la siguiente emisión del
+    mismo mensaje. WARNING y superiores, y los registros con extra={"sin_limite": True},
+    pasan siempre.
+    """
+
+    def __init__(self, intervalo=1.0, max_claves=1000):
+        super().__init__()
+        self.intervalo = intervalo
+        self.max_claves = max_claves
+        self.suprimidos = 0
+        self._ultimo = {}  # {clave: [t de la última emisión, descartados desde entonces]}
+        self._lock = threading.Lock()
+
+    def filter(self, record):
+        if self.intervalo <= 0 or record.levelno >= logging.WARNING:
+            return True
+        if getattr(record, "sin_limite", False):
+            return True
+        clave = (record.name, record.levelno, record.msg, record.args)
+        try:
+            hash(clave)
+        except TypeError:
+            clave = (record.name, record.levelno, record.msg, repr(record.args))  # args con listas o dicts
+        ahora = time.monotonic()
+        with self._lock:
+            estado = self._ultimo.get(clave)
+            if estado is not None and ahora - estado[0] < self.intervalo:
+                estado[1] += 1
+                self.suprimidos += 1
+                return False
+            if estado is None and len(self._ultimo) >= self.max_claves:
+                self._ultimo.clear()  # Plantillas dinámicas (f-strings): no crecer sin límite
+            record.suprimidos = estado[1] if estado is not None else 0
+            self._ultimo[clave] = [ahora, 0]
+        return True
+
+
+class HandlerCola(logging.handlers.QueueHandler):
+    """
+    QueueHandler que no formatea en el hilo que loguea: el mensaje se arma en el hilo del
+    QueueListener. Cuenta los registros que se pierden si la cola está llena.
+    """
+
+    def __init__(self, cola):
+        super().__init__(cola)
+        self.descartados = 0
+
+    def prepare(self, record):
+        return record  # Mismo proceso: los args viajan tal cual y se formatean al escribir
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.descartados += 1
+
+
+class FormatoJSON(logging.Formatter):
+    """
+    Una línea JSON por registro: t (epoch), nivel, logger, hilo, mensaje, suprimidos y la
+    excepción si la hay.
+    """
+
+    def format(self, record):
+        linea = {
+            "t": round(record.created, 6),
+            "nivel": record.levelname,
+            "logger": record.name,
+            "hilo": record.threadName,
+            "mensaje": record.getMessage(),
+        }
+        suprimidos = getattr(record, "suprimidos", 0)
+        if suprimidos:
+            linea["suprimidos"] = suprimidos
+        if record.exc_info:
+            linea["excepcion"] = self.formatException(record.exc_info)
+        return json.dumps(linea, ensure_ascii=False)
+
+
+class FormatoConsola(logging.Formatter):
+    def format(self, record):
+        texto = super().format(record)
+        suprimidos = getattr(record, "suprimidos", 0)
+        if suprimidos:
+            texto += f" (+{suprimidos} iguales suprimidos)"
+        return texto
+
+
+class Registro:
+    """
+    Lo que instala configurar(): handler de cola, filtro de frecuencia y el hilo que escribe.
+    """
+
+    def __init__(self, logger, handler, filtro, listener, archivo):
+        self.logger = logger
+        self.handler = handler
+        self.filtro = filtro
+        self.listener = listener
+        self.archivo = archivo
+
+    def stats(self):
+        return {
+            "nivel": logging.getLevelName(self.logger.level),
+            "archivo": self.archivo,
+            "suprimidos": self.filtro.suprimidos,
+            "descartados_cola_llena": self.handler.descartados,
+            "en_cola": self.handler.queue.qsize(),
+        }
+
+    def close(self):
+        self.logger.removeHandler(self.handler)
+        self.listener.stop()
+        for handler in self.listener.handlers:
+            handler.close()
+
+
+_registro = None
+
+
+def configurar(
+    nivel=None,
+    archivo=None,
+    max_bytes=1_000_000,
+    copias=3,
+    consola=True,
+    intervalo=1.0,
+    max_cola=10000,
+):
+    """
+    Configura el logger "ferb". nivel y archivo por defecto salen de FERB_LOG_LEVEL (INFO) y
+    FERB_LOG_FILE (ferb.log.jsonl; "" para no escribir archivo). intervalo: segundos mínimos
+    entre dos emisiones del mismo mensaje (0 = sin límite). Reemplaza una configuración
+    anterior. Devuelve el Registro instalado.
+    """
+    global _registro
+    if _registro is not None:
+        _registro.close()
+    nivel = (nivel or os.environ.get("FERB_LOG_LEVEL", "INFO")).upper()
+    archivo = os.environ.get("FERB_LOG_FILE", "ferb.log.jsonl") if archivo is None else archivo
+
+    salidas = []
+    if archivo:
+        rotativo = logging.handlers.RotatingFileHandler(
+            archivo, maxBytes=max_bytes, backupCount=copias, encoding="utf-8"
+        )
+        rotativo.setFormatter(FormatoJSON())
+        salidas.append(rotativo)
+    if consola:
+        pantalla = logging.StreamHandler()
+        pantalla.setFormatter(FormatoConsola("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+        salidas.append(pantalla)
+
+    cola = queue.Queue(max_cola)
+    handler = HandlerCola(cola)
+    filtro = FiltroFrecuencia(intervalo)
+    handler.addFilter(filtro)
+    listener = logging.handlers.QueueListener(cola, *salidas, respect_handler_level=True)
+    listener.start()
+
+    logger = logging.getLogger(RAIZ)
+    logger.setLevel(nivel)
+    logger.addHandler(handler)
+    logger.propagate = False
+    _registro = Registro(logger, handler, filtro, listener, archivo or None)
+    return _registro
+
+
+def set_level(nivel, logger=RAIZ):
+    """
+    Cambia el nivel de logger ("ferb" o uno de sus hijos, p. ej. "ferb.perrito").
+    """
+    nivel = nivel.upper()
+    if nivel not in NIVELES:
+        raise ValueError(f"Nivel desconocido: {nivel}")
+    if logger != RAIZ and not logger.startswith(RAIZ + "."):
+        raise ValueError(f"Logger fuera de {RAIZ}: {logger}")
+    logging.getLogger(logger).setLevel(nivel)
+
+
+def niveles():
+    """
+    Nivel efectivo del logger "ferb" y de los hijos que tienen uno propio.
+    """
+    resultado = {RAIZ: logging.getLevelName(logging.getLogger(RAIZ).getEffectiveLevel())}
+    for nombre, logger in sorted(logging.Logger.manager.loggerDict.items()):
+        if nombre.startswith(RAIZ + ".") and isinstance(logger, logging.Logger) and logger.level:
+            resultado[nombre] = logging.getLevelName(logger.level)
+    return resultado
+
+
+def stats():
+    return _registro.stats() if _registro is not None else {"nivel": niveles()[RAIZ], "archivo": None}
+
+
+def close():
+    global _registro
+    if _registro is not None:
+        _registro.close()
+        _registro = None
@@ -0,0 +1,325 @@
+"""
+Backend simulado del robot: cinemática diferencial, brújula con ruido, GPS que genera NMEA
+a partir de la pose simulada y una cámara sintética con una pelota azul y obstáculos.
+Cada pieza tiene la misma interfaz que el hardware que reemplaza (gpiozero.Robot,
+raspy_qmc5883l.QMC5883L, fuente serial del GPS, Picamera2).
+"""
+
+import math
+import random
+import threading
+import time
+import cv2
+import numpy as np
+from gps_sources import GPSSource, synthesize_epoch
+from brujula import Brujula
+import geodesia
+
+# Origen de la proyección local del mundo simulado (laboratorio de la UCAB)
+ORIGEN = (8.2959, -62.7119)
+
+
+class MundoSimulado:
+    """
+    Estado físico del mundo: pose del robot (x este, y norte en metros; rumbo en grados),
+    comandos de las ruedas, pelota y obstáculos. avanzar(dt) integra la cinemática;
+    start() lo hace en tiempo real desde un hilo propio.
+    """
+
+    def __init__(self, x=0.0, y=0.0, rumbo=0.0, vmax=0.5, ancho=0.2, origen=ORIGEN, seed=None):
+        """
+        vmax: velocidad en m/s con una rueda al 100%. ancho: distancia entre ruedas en metros.
+        """
+        self.x = x
+        self.y = y
+        self.rumbo = rumbo
+        self.vmax = vmax
+        self.ancho = ancho
+        self.izq = 0.0
+        self.der = 0.0
+        self.t = 0.0
+        self.proyeccion = geodesia.ProyeccionLocal(*origen)
+        self.rng = random.Random(seed)
+        self.pelota = None  # (x, y, radio) en metros
+        self.obstaculos = []  # [(x, y, ancho, alto)] en metros
+        self.lock = threading.Lock()
+        self._thread = None
+        self._running = False
+
+    def set_ruedas(self, izq, der):
+        with self.lock:
+            self.izq = max(-1.0, min(1.0, izq))
+            self.der = max(-1.0, min(1.0, der))
+
+    def avanzar(self, dt, paso=0.005):
+        """
+        Integra la cinemática diferencial durante dt segundos.
+        """
+        with self.lock:
+            pasos = max(1, int(round(dt / paso)))
+            h = dt / pasos
+            v = (self.izq + self.der) / 2 * self.vmax
+            w = (self.izq - self.der) * self.vmax / self.ancho  # rad/s, positivo = horario
+            for _ in range(pasos):
+                self.rumbo = (self.rumbo + math.degrees(w * h)) % 360
+                self.x += v * h * math.sin(math.radians(self.rumbo))
+                self.y += v * h * math.cos(math.radians(self.rumbo))
+            self.t += dt
+
+    def pose(self):
+        with self.lock:
+            return self.x, self.y, self.rumbo
+
+    def velocidad(self):
+        """
+        (velocidad lineal en m/s, velocidad angular en grados/s).
+        """
+        with self.lock:
+            v = (self.izq + self.der) / 2 * self.vmax
+            w = math.degrees((self.izq - self.der) * self.vmax / self.ancho)
+        return v, w
+
+    def latlon(self):
+        x, y, _ = self.pose()
+        lat, lon = self.proyeccion.to_latlon(x, y)
+        return float(lat), float(lon)
+
+    def start(self, periodo=0.005):
+        """
+        Integra la física en tiempo real desde un hilo propio.
+        """
+        if self._running:
+            return
+        self._running = True
+        self._thread = threading.Thread(target=self._loop, args=(periodo,))
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self):
+        self._running = False
+        if self._thread and threading.current_thread() != self._thread:
+            self._thread.join(timeout=1)
+        self._thread = None
+
+    def _loop(self, periodo):
+        anterior = time.monotonic()
+        while self._running:
+            time.sleep(periodo)
+            ahora = time.monotonic()
+            self.avanzar(ahora - anterior)
+            anterior = ahora
+
+
+class RobotSimulado:
+    """
+    Sustituto de gpiozero.Robot: forward/backward/left/right/stop y value = (izq, der).
+    """
+
+    def __init__(self, mundo):
+        self.mundo = mundo
+
+    @property
+    def value(self):
+        return self.mundo.izq, self.mundo.der
+
+    @value.setter
+    def value(self, value):
+        self.mundo.set_ruedas(*value)
+
+    def forward(self, speed=1):
+        self.mundo.set_ruedas(speed, speed)
+
+    def backward(self, speed=1):
+        self.mundo.set_ruedas(-speed, -speed)
+
+    def left(self, speed=1):
+        self.mundo.set_ruedas(-speed, speed)
+
+    def right(self, speed=1):
+        self.mundo.set_ruedas(speed, -speed)
+
+    def stop(self):
+        self.mundo.set_ruedas(0.0, 0.0)
+
+    def close(self):
+        self.stop()
+
+
+class SensorBrujulaSimulado:
+    """
+    Sustituto de raspy_qmc5883l.QMC5883L: get_bearing() devuelve el rumbo simulado con ruido.
+    """
+
+    def __init__(self, mundo, ruido=1.5):
+        self.mundo = mundo
+        self.ruido = ruido
+        self.calibration = None
+        self.declination = 0.0
+
+    def get_bearing(self):
+        _, _, rumbo = self.mundo.pose()
+        return (rumbo + self.mundo.rng.gauss(0, self.ruido)) % 360
+
+
+class BrujulaSimulada(Brujula):
+    """
+    brujula.Brujula sobre el sensor simulado.
+    """
+
+    def __init__(self, mundo, ruido=1.5):
+        super().__init__(sensor=SensorBrujulaSimulado(mundo, ruido))
+
+
+class FuenteGPSSimulada(GPSSource):
+    """
+    Fuente NMEA para gps.GPS que genera GGA/VTG/RMC a partir de la pose simulada, con ruido
+    gaussiano en metros. Así el backend simulado también ejercita el parser real.
+    """
+
+    def __init__(self, mundo, rate_hz=1.0, ruido=0.5):
+        self.mundo = mundo
+        self.periodo = 1.0 / rate_hz
+        self.ruido = ruido
+        self.is_open = True
+        self._pendientes = []
+        self._proximo = time.monotonic()
+
+    def readline(self):
+        if not self.is_open:
+            return b""
+        if not self._pendientes:
+            espera = self._proximo - time.monotonic()
+            if espera > 0:
+                time.sleep(espera)
+            self._proximo = max(self._proximo + self.periodo, time.monotonic())
+            x, y, rumbo = self.mundo.pose()
+            v, _ = self.mundo.velocidad()
+            lat, lon = self.mundo.proyeccion.to_latlon(
+                x + self.mundo.rng.gauss(0, self.ruido), y + self.mundo.rng.gauss(0, self.ruido)
+            )
+            segundos = time.time() % 86400
+            self._pendientes = synthesize_epoch(
+                float(lat), float(lon), segundos, speed_kmh=abs(v) * 3.6, course=rumbo
+            )
+        return self._pendientes.pop(0) + b"\r\n"
+
+
+class CamaraSimulada:
+    """
+    Sustituto de Picamera2. Renderiza con una cámara pinhole el piso, los obstáculos (cajas
+    oscuras) y la pelota azul del mundo. Los frames son BGR, como los que entrega Picamera2
+    con el formato "RGB888".
+    """
+
+    def __init__(self, mundo, size=(320, 240), fov=62.0, altura=0.1, fps=30.0, textura=False):
+        """
+        fov: campo de visión horizontal en grados. altura: altura de la cámara en metros.
+        textura: pinta los obstáculos con un patrón oscuro fijo en lugar de un color plano,
+        para que tengan esquinas que puedan seguir ORB y el flujo óptico.
+        """
+        self.mundo = mundo
+        self.textura = None
+        if textura:
+            rng = np.random.default_rng(0)
+            patron = rng.integers(0, 55, (16, 16), dtype=np.uint8)
+            self.textura = cv2.cvtColor(patron, cv2.COLOR_GRAY2BGR)
+        self.size = size
+        self.fov = fov
+        self.altura = altura
+        self.fps = fps
+        self._proximo = None
+        self._configurar(size)
+
+    def _configurar(self, size):
+        self.size = tuple(size)
+        w, h = self.size
+        self.focal = (w / 2) / math.tan(math.radians(self.fov / 2))
+        self._fondo = np.empty((h, w, 3), dtype=np.uint8)
+        self._fondo[: h // 2] = (200, 190, 180)  # Pared
+        self._fondo[h // 2 :] = (150, 160, 165)  # Piso
+        self._frame = np.empty_like(self._fondo)
+
+    def create_preview_configuration(self, raw=None, main=None):
+        return {"raw": raw, "main": main or {}}
+
+    def configure(self, config):
+        size = config.get("main", {}).get("size")
+        if size:
+            self._configurar(size)
+
+    def start(self):
+        self._proximo = time.monotonic()
+
+    def _proyectar(self, ox, oy, x, y, rumbo):
+        """
+        Devuelve (columna, distancia) de un punto del mundo, o None si está detrás de la cámara.
+        """
+        dx, dy = ox - x, oy - y
+        r = math.radians(rumbo)
+        adelante = dx * math.sin(r) + dy * math.cos(r)
+        lateral = dx * math.cos(r) - dy * math.sin(r)
+        if adelante < 0.05:
+            return None
+        return self.size[0] / 2 + self.focal * lateral / adelante, adelante
+
+    def render(self):
+        """
+        Dibuja la vista actual del mundo en el buffer del frame y lo devuelve.
+        """
+        np.copyto(self._frame, self._fondo)
+        x, y, rumbo = self.mundo.pose()
+        horizonte = self.size[1] / 2
+        objetos = []
+        for ox, oy, ancho, alto in self.mundo.obstaculos:
+            p = self._proyectar(ox, oy, x, y, rumbo)
+            if p:
+                objetos.append((p[1], "caja", p[0], ancho, alto))
+        if self.mundo.pelota:
+            bx, by, radio = self.mundo.pelota
+            p = self._proyectar(bx, by, x, y, rumbo)
+            if p:
+                objetos.append((p[1], "pelota", p[0], radio, radio))
+        # Primero los lejanos, para que los cercanos los tapen
+        for d, tipo, u, ancho, alto in sorted(objetos, reverse=True):
+            base = horizonte + self.focal * self.altura / d
+            if tipo == "caja":
+                mitad = self.focal * ancho / d / 2
+                arriba = base - self.focal * alto / d
+                if self.textura is None:
+                    cv2.rectangle(
+                        self._frame, (int(u - mitad), int(arriba)), (int(u + mitad), int(base)), (30, 30, 30), -1
+                    )
+                else:
+                    self._pegar_textura(int(u - mitad), int(arriba), int(u + mitad), int(base))
+            else:
+                r = self.focal * ancho / d
+                cv2.circle(self._frame, (int(u), int(base - r)), max(1, int(r)), (200, 60, 20), -1)
+        return self._frame
+
+    def _pegar_textura(self, x0, y0, x1, y1):
+        """
+        Pega la textura escalada al rectángulo (x0, y0)-(x1, y1), recortada al frame.
+        """
+        if x1 <= x0 or y1 <= y0:
+            return
+        alto, ancho = self._frame.shape[:2]
+        cx0, cy0, cx1, cy1 = max(x0, 0), max(y0, 0), min(x1, ancho), min(y1, alto)
+        if cx1 <= cx0 or cy1 <= cy0:
+            return
+        # Escalar solo la parte visible: mapear los píxeles del recorte a coordenadas de la textura
+        th, tw = self.textura.shape[:2]
+        xs = ((np.arange(cx0, cx1) - x0) * tw // (x1 - x0)).astype(np.intp)
+        ys = ((np.arange(cy0, cy1) - y0) * th // (y1 - y0)).astype(np.intp)
+        self._frame[cy0:cy1, cx0:cx1] = self.textura[ys[:, None], xs[None, :]]
+
+    def capture_array(self):
+        if self._proximo is None:
+            self.start()
+        espera = self._proximo - time.monotonic()
+        if espera > 0:
+            time.sleep(espera)
+        self._proximo = max(self._proximo + 1.0 / self.fps, time.monotonic())
+        return self.render()
+
+    def close(self):
+        self._proximo = None
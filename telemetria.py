@@ -0,0 +1,339 @@
+"""
+Grabador de telemetría de Ferb: fixes GPS, rumbos de la brújula, comandos a los motores,
+cambios de modo y, opcionalmente, frames reducidos en escala de grises, en archivos
+binarios de registros de tamaño fijo. Cada segmento se preasigna, se mapea en memoria y se
+llena con struct.pack_into; al llenarse se pasa al siguiente y solo se conservan los
+últimos max_archivos (un anillo). Escribir un registro es un pack en memoria bajo un lock:
+no hay syscalls en el camino de los lazos de control.
+
+leer_sesion() carga una sesión en arrays de NumPy, con el tiempo en epoch.
+"""
+
+import glob
+import logging
+import math
+import mmap
+import os
+import struct
+import threading
+import time
+import cv2
+import numpy as np
+
+log = logging.getLogger("ferb.telemetria")
+
+MAGIA = b"FERBTEL1"
+# magia, versión, bytes por registro, alto y ancho de los frames (0 si no son frames),
+# epoch - monotonic al abrir el segmento, registros escritos
+CABECERA = struct.Struct("<8sHIHHdQ")
+TAM_CABECERA = 64
+OFFSET_N = CABECERA.size - 8
+VERSION = 1
+
+# t (monotonic), tipo, seq, a, b, c
+REGISTRO = struct.Struct("<dB3xIddd")
+DTYPE_REGISTRO = np.dtype(
+    [("t", "<f8"), ("tipo", "u1"), ("_", "V3"), ("seq", "<u4"), ("a", "<f8"), ("b", "<f8"), ("c", "<f8")]
+)
+# t (monotonic) y seq del frame; le siguen alto * ancho bytes de grises
+CABECERA_FRAME = struct.Struct("<dI4x")
+
+GPS, BRUJULA, MOTORES, MODO = 1, 2, 3, 4
+MODOS = ("manual", "dog", "navegacion", "gestos", "obstaculos")
+
+NAN = math.nan
+
+
+class ArchivoAnillo:
+    """
+    Secuencia de segmentos <prefijo>_NNNNNN.bin de registros de tam bytes, cada uno
+    preasignado a max_bytes y mapeado en memoria. reservar() toma el siguiente registro
+    y devuelve (mmap, offset) para que el llamador lo llene con pack_into.
+    """
+
+    def __init__(self, carpeta, prefijo, tam, max_bytes, max_archivos, forma=(0, 0)):
+        self.carpeta = carpeta
+        self.prefijo = prefijo
+        self.tam = tam
+        self.capacidad = max(1, (max_bytes - TAM_CABECERA) // tam)
+        self.max_archivos = max_archivos
+        self.forma = forma
+        self.registros = 0
+        self.segmentos = 0
+        self._indice = -1
+        self._n = 0
+        self._archivo = None
+        self._mm = None
+        self._abrir_siguiente()
+
+    def _ruta(self, indice):
+        return os.path.join(self.carpeta, f"{self.prefijo}_{indice:06d}.bin")
+
+    def _abrir_siguiente(self):
+        self._cerrar_segmento()
+        self._indice += 1
+        tam_archivo = TAM_CABECERA + self.capacidad * self.tam
+        self._archivo = open(self._ruta(self._indice), "w+b")
+        self._archivo.truncate(tam_archivo)
+        self._mm = mmap.mmap(self._archivo.fileno(), tam_archivo)
+        alto, ancho = self.forma
+        epoch = time.time() - time.monotonic()
+        CABECERA.pack_into(self._mm, 0, MAGIA, VERSION, self.tam, alto, ancho, epoch, 0)
+        self._n = 0
+        self.segmentos += 1
+        viejo = self._indice - self.max_archivos
+        if viejo >= 0 and os.path.exists(self._ruta(viejo)):
+            os.remove(self._ruta(viejo))
+
+    def _cerrar_segmento(self, sincronizar=False):
+        if self._mm is not None:
+            # Al rotar no se hace msync (~5 ms por segmento de 4 MB en el hilo que escribe):
+            # el kernel escribe las páginas sucias aunque el proceso muera
+            if sincronizar:
+                self._mm.flush()
+            self._mm.close()
+            self._archivo.close()
+            self._mm = None
+
+    def reservar(self):
+        """
+        (mmap, offset) del próximo registro. Se llama con el lock del grabador tomado.
+        """
+        if self._n >= self.capacidad:
+            self._abrir_siguiente()
+        offset = TAM_CABECERA + self._n * self.tam
+        self._n += 1
+        self.registros += 1
+        return self._mm, offset
+
+    def confirmar(self):
+        """
+        Publica en la cabecera la cantidad de registros completos del segmento.
+        """
+        struct.pack_into("<Q", self._mm, OFFSET_N, self._n)
+
+    def close(self):
+        self._cerrar_segmento(sincronizar=True)
+
+
+class GrabadorTelemetria:
+    """
+    Grabador de una sesión en carpeta/<fecha>_<hora>. Los métodos gps, brujula, motores y
+    modo escriben un registro cada uno y se pueden llamar desde cualquier hilo; start()
+    además sigue al GPS y la brújula del robot (y los frames, si frames no es None) desde
+    hilos propios, sin tocar sus lazos.
+    """
+
+    def __init__(self, carpeta="telemetria", max_bytes=4_000_000, max_archivos=8, frames=None, frames_hz=2.0):
+        """
+        max_bytes: tamaño de cada segmento; max_archivos: segmentos que se conservan por flujo.
+        frames: (ancho, alto) de los frames grabados, o None para no grabar frames.
+        frames_hz: frames por segundo grabados como máximo.
+        """
+        self.sesion = os.path.join(carpeta, time.strftime("%Y%m%d_%H%M%S"))
+        os.makedirs(self.sesion, exist_ok=True)
+        self.registros = ArchivoAnillo(self.sesion, "registros", REGISTRO.size, max_bytes, max_archivos)
+        self.frames = None
+        self.tam_frame = frames
+        self.frames_hz = frames_hz
+        if frames is not None:
+            ancho, alto = frames
+            self.frames = ArchivoAnillo(
+                self.sesion, "frames", CABECERA_FRAME.size + ancho * alto, max_bytes, max_archivos, (alto, ancho)
+            )
+        self._lock = threading.Lock()
+        self._lock_frames = threading.Lock()
+        self._hilos = []
+        self._running = False
+        self._cerrado = False
+
+    def _escribir(self, tipo, seq, a, b=NAN, c=NAN):
+        with self._lock:
+            if self._cerrado:
+                return
+            mm, offset = self.registros.reservar()
+            REGISTRO.pack_into(mm, offset, time.monotonic(), tipo, seq, a, b, c)
+            self.registros.confirmar()
+
+    def gps(self, fix):
+        """
+        fix: gps.GPSFix.
+        """
+        velocidad = fix.speed_kmh if fix.speed_kmh is not None else NAN
+        self._escribir(GPS, fix.seq, fix.lat, fix.lon, velocidad)
+
+    def brujula(self, rumbo, velocidad_angular, seq):
+        self._escribir(BRUJULA, seq, rumbo, velocidad_angular)
+
+    def motores(self, izq, der):
+        self._escribir(MOTORES, 0, izq, der)
+
+    def modo(self, modo):
+        codigo = MODOS.index(modo) if modo in MODOS else len(MODOS)
+        self._escribir(MODO, codigo, NAN)
+
+    def frame(self, seq, frame):
+        """
+        Graba el frame BGR reducido a tam_frame y en escala de grises.
+        """
+        if self.frames is None:
+            return
+        gris = cv2.cvtColor(cv2.resize(frame, self.tam_frame, interpolation=cv2.INTER_AREA), cv2.COLOR_BGR2GRAY)
+        with self._lock_frames:
+            if self._cerrado:
+                return
+            mm, offset = self.frames.reservar()
+            CABECERA_FRAME.pack_into(mm, offset, time.monotonic(), seq)
+            inicio = offset + CABECERA_FRAME.size
+            mm[inicio : inicio + gris.size] = gris.tobytes()
+            self.frames.confirmar()
+
+    def start(self, gps=None, brujula=None, frame_bus=None):
+        """
+        Sigue los fixes de gps (gps.GPS), las muestras de brujula (Brujula con el muestreador
+        en marcha) y, si se graban frames, el bus de frames que devuelva frame_bus() cuando
+        la cámara esté encendida (no la enciende).
+        """
+        self._running = True
+        log.info("Grabando telemetría en %s", self.sesion)
+        if gps is not None:
+            self._lanzar(self._seguir_gps, gps)
+        if brujula is not None:
+            self._lanzar(self._seguir_brujula, brujula)
+        if frame_bus is not None and self.frames is not None:
+            self._lanzar(self._seguir_frames, frame_bus)
+
+    def _lanzar(self, objetivo, fuente):
+        hilo = threading.Thread(target=objetivo, args=(fuente,))
+        hilo.daemon = True
+        hilo.start()
+        self._hilos.append(hilo)
+
+    def _seguir_gps(self, gps):
+        seq = -1
+        while self._running:
+            fix = gps.wait_for_fix(seq, timeout=0.5)
+            if fix is not None:
+                seq = fix.seq
+                self.gps(fix)
+
+    def _seguir_brujula(self, brujula):
+        seq = 0
+        while self._running:
+            lectura = brujula.wait_for_heading(seq, timeout=0.5)
+            if lectura is None:
+                time.sleep(0.1)  # Muestreador detenido: wait_for_heading vuelve enseguida
+                continue
+            rumbo, velocidad, _, seq = lectura
+            self.brujula(rumbo, velocidad, seq)
+
+    def _seguir_frames(self, frame_bus):
+        periodo = 1.0 / self.frames_hz
+        suscripcion = None
+        bus = None
+        proximo = 0.0
+        try:
+            while self._running:
+                actual = frame_bus()
+                if actual is not bus or (actual is not None and not actual.running):
+                    if suscripcion is not None:
+                        suscripcion.close()
+                        suscripcion = None
+                    bus = actual
+                    if bus is not None and bus.running:
+                        suscripcion = bus.subscribe("telemetria")
+                if suscripcion is None:
+                    time.sleep(0.5)
+                    continue
+                espera = proximo - time.monotonic()
+                if espera > 0:
+                    time.sleep(espera)
+                item = suscripcion.read(timeout=0.5)
+                if item is None:
+                    continue
+                seq, _, frame = item
+                proximo = time.monotonic() + periodo
+                self.frame(seq, frame)
+        finally:
+            if suscripcion is not None:
+                suscripcion.close()
+
+    def stats(self):
+        stats = {
+            "sesion": self.sesion,
+            "registros": self.registros.registros,
+            "segmentos": self.registros.segmentos,
+        }
+        if self.frames is not None:
+            stats["frames"] = self.frames.registros
+        return stats
+
+    def close(self):
+        self._running = False
+        for hilo in self._hilos:
+            if threading.current_thread() != hilo:
+                hilo.join(timeout=2)
+        self._hilos = []
+        with self._lock, self._lock_frames:
+            self._cerrado = True
+            self.registros.close()
+            if self.frames is not None:
+                self.frames.close()
+
+
+def _segmentos(sesion, prefijo):
+    """
+    Contenido de cada segmento en orden: (cabecera, buffer con los registros completos).
+    """
+    for ruta in sorted(glob.glob(os.path.join(sesion, f"{prefijo}_*.bin"))):
+        with open(ruta, "rb") as f:
+            datos = f.read()
+        magia, version, tam, alto, ancho, epoch, n = CABECERA.unpack_from(datos, 0)
+        if magia != MAGIA or version != VERSION:
+            raise ValueError(f"{ruta} no es un segmento de telemetría v{VERSION}")
+        yield (tam, alto, ancho, epoch), datos[TAM_CABECERA : TAM_CABECERA + n * tam]
+
+
+def leer_sesion(sesion):
+    """
+    Carga una sesión grabada por GrabadorTelemetria. Devuelve un dict de arrays de NumPy
+    con el tiempo t en segundos epoch:
+        gps: t, seq, lat, lon, speed_kmh
+        brujula: t, seq, rumbo, velocidad_angular
+        motores: t, izq, der
+        modos: t, modo (str)
+        frames: t, seq, imagenes (N x alto x ancho, uint8), si se grabaron
+    """
+    partes = []
+    for (tam, _, _, epoch), datos in _segmentos(sesion, "registros"):
+        registros = np.frombuffer(datos, DTYPE_REGISTRO).copy()
+        registros["t"] += epoch  # Cada segmento guarda su propio desfase monotonic -> epoch
+        partes.append(registros)
+    registros = np.concatenate(partes) if partes else np.empty(0, DTYPE_REGISTRO)
+
+    def de_tipo(tipo):
+        return registros[registros["tipo"] == tipo]
+
+    gps, brujula, motores, modos = de_tipo(GPS), de_tipo(BRUJULA), de_tipo(MOTORES), de_tipo(MODO)
+    nombres = np.array(MODOS + ("?",))
+    sesion_np = {
+        "gps": {"t": gps["t"], "seq": gps["seq"], "lat": gps["a"], "lon": gps["b"], "speed_kmh": gps["c"]},
+        "brujula": {"t": brujula["t"], "seq": brujula["seq"], "rumbo": brujula["a"], "velocidad_angular": brujula["b"]},
+        "motores": {"t": motores["t"], "izq": motores["a"], "der": motores["b"]},
+        "modos": {"t": modos["t"], "modo": nombres[np.minimum(modos["seq"], len(MODOS))]},
+    }
+
+    tiempos, seqs, imagenes = [], [], []
+    for (tam, alto, ancho, epoch), datos in _segmentos(sesion, "frames"):
+        dtype = np.dtype([("t", "<f8"), ("seq", "<u4"), ("_", "V4"), ("imagen", "u1", (alto, ancho))])
+        frames = np.frombuffer(datos, dtype)
+        tiempos.append(frames["t"] + epoch)
+        seqs.append(frames["seq"])
+        imagenes.append(frames["imagen"])
+    if tiempos:
+        sesion_np["frames"] = {
+            "t": np.concatenate(tiempos),
+            "seq": np.concatenate(seqs),
+            "imagenes": np.concatenate(imagenes),
+        }
+    return sesion_np
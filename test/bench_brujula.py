@@ -0,0 +1,149 @@
+import math
+import os
+import random
+import struct
+import sys
+import threading
+import time
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from brujula import Brujula
+
+"""
+Compara el acceso original a la brújula (cada consumidor llama a sensor.get_bearing(): dos
+transacciones I2C por lectura) con el muestreador de Brujula (un hilo a la tasa del sensor,
+una transacción por muestra, rumbo cacheado). Un QMC5883L falso con transacciones de
+i2c_ms y ruido gaussiano genera el campo de un rumbo conocido; se cuentan transacciones por
+segundo con turn_to_heading a 10 Hz más varios clientes SSE a 4 Hz, y se mide el error del
+rumbo crudo y filtrado quieto y girando, y el de la velocidad angular.
+Uso: python test/bench_brujula.py [clientes_sse] [ruido_grados] [i2c_ms]
+"""
+
+CAMPO = 3000  # Magnitud horizontal del campo en cuentas del sensor
+
+
+class BusFalso:
+    """
+    Sustituto de smbus2.SMBus con un QMC5883L: X/Y/Z en 0x00-0x05 y temperatura en 0x07.
+    """
+
+    def __init__(self, rumbo, ruido, i2c_ms, seed=0):
+        self.rumbo = rumbo  # función () -> grados verdaderos
+        self.ruido = ruido
+        self.i2c = i2c_ms / 1000
+        self.rng = random.Random(seed)
+        self.transacciones = 0
+        self._lock = threading.Lock()  # Un solo bus: las transacciones no se solapan
+
+    def read_i2c_block_data(self, address, register, length):
+        with self._lock:
+            time.sleep(self.i2c)
+            self.transacciones += 1
+            if register == 0x07:
+                return [0, 0]
+            # El ruido del magnetómetro se ve como ruido angular de ~ruido grados
+            r = math.radians(self.rumbo() + self.rng.gauss(0, self.ruido))
+            x, y = int(CAMPO * math.cos(r)), int(CAMPO * math.sin(r))
+            return list(struct.pack("<3h", x, y, 0))
+
+    def write_byte_data(self, address, register, value):
+        pass
+
+
+class QMCFalso:
+    """
+    La parte de raspy_qmc5883l.QMC5883L que usa Brujula; get_bearing lee X/Y/Z y temperatura.
+    """
+
+    def __init__(self, bus):
+        self.bus = bus
+        self.address = 0x0D
+        self.calibration = [[1.0, 0.0, 0.0], [0.0, 1.0, 0.0], [0.0, 0.0, 1.0]]
+        self.declination = 0.0
+
+    def get_bearing(self):
+        datos = self.bus.read_i2c_block_data(self.address, 0x00, 6)
+        self.bus.read_i2c_block_data(self.address, 0x07, 2)
+        x, y, _ = struct.unpack("<3h", bytes(datos))
+        return math.degrees(math.atan2(y, x)) % 360
+
+
+def consumidores(leer, clientes, segundos):
+    """
+    turn_to_heading a 10 Hz y clientes SSE a 4 Hz, cada uno en su hilo.
+    """
+    fin = time.monotonic() + segundos
+
+    def lazo(periodo):
+        while time.monotonic() < fin:
+            leer()
+            time.sleep(periodo)
+
+    hilos = [threading.Thread(target=lazo, args=(0.1,))]
+    hilos += [threading.Thread(target=lazo, args=(0.25,)) for _ in range(clientes)]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+
+
+def error(a, b):
+    return abs((a - b + 180) % 360 - 180)
+
+
+def rms(valores):
+    return math.sqrt(sum(v * v for v in valores) / len(valores)) if valores else 0.0
+
+
+def precision(nombre, giro, ruido, i2c_ms, segundos=3.0, rate_hz=10, tau=0.2):
+    """
+    Error RMS del rumbo crudo y del filtrado, con el robot girando a giro grados/s.
+    """
+    inicio = time.monotonic()
+    verdad = lambda: (30 + giro * (time.monotonic() - inicio)) % 360
+    brujula = Brujula(sensor=QMCFalso(BusFalso(verdad, ruido, i2c_ms)))
+    brujula.start_sampler(rate_hz=rate_hz, tau=tau)
+    crudo, filtrado, velocidad = [], [], []
+    seq = 0
+    fin = time.monotonic() + segundos
+    while time.monotonic() < fin:
+        lectura = brujula.wait_for_heading(seq, timeout=1)
+        if lectura is None:
+            continue
+        rumbo, rate, _, seq = lectura
+        if seq > 10:  # Después de que el filtro se asiente
+            filtrado.append(error(rumbo, verdad()))
+            velocidad.append(rate - giro)
+            crudo.append(error(brujula.sensor.get_bearing(), verdad()))
+    brujula.stop_sampler()
+    print(f"{nombre:<22} RMS crudo {rms(crudo):5.2f}°  filtrado {rms(filtrado):5.2f}°  "
+          f"velocidad angular {rms(velocidad):6.2f}°/s")
+
+
+def main():
+    clientes = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    ruido = float(sys.argv[2]) if len(sys.argv) > 2 else 3.0
+    i2c_ms = float(sys.argv[3]) if len(sys.argv) > 3 else 1.0
+    segundos = 3.0
+    print(f"turn_to_heading a 10 Hz + {clientes} clientes SSE a 4 Hz, I2C de {i2c_ms:.1f} ms\n")
+
+    bus = BusFalso(lambda: 90.0, ruido, i2c_ms)
+    sensor = QMCFalso(bus)
+    consumidores(sensor.get_bearing, clientes, segundos)
+    print(f"{'original':<22} {bus.transacciones / segundos:6.1f} transacciones I2C/s")
+
+    bus = BusFalso(lambda: 90.0, ruido, i2c_ms)
+    brujula = Brujula(sensor=QMCFalso(bus))
+    brujula.start_sampler()
+    consumidores(lambda: brujula.heading, clientes, segundos)
+    brujula.stop_sampler()
+    print(f"{'muestreador 10 Hz':<22} {bus.transacciones / segundos:6.1f} transacciones I2C/s\n")
+
+    print(f"Ruido del sensor {ruido:.1f}°, filtro tau 0.2 s")
+    precision("quieto", 0.0, ruido, i2c_ms)
+    precision("girando a 45°/s", 45.0, ruido, i2c_ms)
+    precision("girando a 45°/s, 50 Hz", 45.0, ruido, i2c_ms, rate_hz=50, tau=0.1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+import os
+import sys
+import time
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import cv2
+import numpy as np
+from obstaculosDual import CalibracionEstereo, SistemaEstereo, estimar_distancia_disparidad
+
+"""
+Mide frames/segundo del estéreo sobre un par sintético con profundidad conocida: fondo
+texturizado a 300 cm y una caja a 100 cm en el centro. Compara el detectar_obstaculos_dual
+original (matcher nuevo por llamada, resolución completa) con SistemaEstereo a distintas
+resoluciones, e imprime el perfil de profundidad por sector.
+Uso: python test/bench_estereo.py [repeticiones]
+"""
+
+SIZE = (640, 480)
+FOCAL = 700.0
+BASELINE = 6.0
+
+
+def dual_original(frame1, frame2, baseline_cm=6.0, focal_px=FOCAL):
+    gray1 = cv2.cvtColor(frame1, cv2.COLOR_RGB2GRAY)
+    gray2 = cv2.cvtColor(frame2, cv2.COLOR_RGB2GRAY)
+    stereo = cv2.StereoBM_create(numDisparities=64, blockSize=15)
+    disparity = stereo.compute(gray1, gray2).astype(np.float32) / 16.0
+    disp_vis = cv2.normalize(disparity, None, 0, 255, cv2.NORM_MINMAX)
+    disp_vis = np.uint8(disp_vis)
+    min_disp = np.min(disparity[disparity > 0]) if np.any(disparity > 0) else 0
+    distancia = estimar_distancia_disparidad(min_disp, baseline_cm, focal_px) if min_disp > 0 else None
+    return disp_vis, distancia
+
+
+def par_sintetico(seed=0, fondo_cm=300.0, caja_cm=100.0, caja=(240, 160, 400, 400)):
+    """
+    Par izquierda/derecha rectificado. caja = (x0, y0, x1, y1) en la imagen izquierda.
+    """
+    rng = np.random.default_rng(seed)
+    ancho, alto = SIZE
+
+    def textura():
+        t = rng.integers(0, 255, (alto // 4, ancho // 4), dtype=np.uint8)
+        return cv2.resize(t, SIZE, interpolation=cv2.INTER_LINEAR)
+
+    fondo, frente = textura(), textura()
+    d_fondo = int(round(FOCAL * BASELINE / fondo_cm))
+    d_caja = int(round(FOCAL * BASELINE / caja_cm))
+    x0, y0, x1, y1 = caja
+    izq = fondo.copy()
+    izq[y0:y1, x0:x1] = frente[y0:y1, x0:x1]
+    # Un punto en x de la izquierda aparece en x - d en la derecha
+    der = np.roll(fondo, -d_fondo, axis=1)
+    der[y0:y1, x0 - d_caja : x1 - d_caja] = frente[y0:y1, x0:x1]
+    rgb = lambda g: cv2.cvtColor(g, cv2.COLOR_GRAY2RGB)
+    return rgb(izq), rgb(der)
+
+
+def medir(nombre, funcion, izq, der, repeticiones):
+    funcion(izq, der)
+    t0 = time.perf_counter()
+    for _ in range(repeticiones):
+        resultado = funcion(izq, der)
+    dt = (time.perf_counter() - t0) / repeticiones
+    print(f"{nombre:<36} {dt * 1000:7.2f} ms/par  {1 / dt:6.1f} fps")
+    return dt, resultado
+
+
+def main():
+    repeticiones = int(sys.argv[1]) if len(sys.argv) > 1 else 30
+    cv2.setNumThreads(1)
+    izq, der = par_sintetico()
+    calib = CalibracionEstereo.ideal(SIZE, FOCAL, BASELINE)
+    print(f"Par {SIZE[0]}x{SIZE[1]}: fondo a 300 cm, caja a 100 cm (columnas 240-400)\n")
+
+    base, _ = medir("original (matcher nuevo, completo)", dual_original, izq, der, repeticiones)
+    variantes = [
+        ("estéreo 1.0, frame completo", dict(escala=1.0, banda=(0.0, 1.0), num_disparidades=64, block_size=15)),
+        ("estéreo 1.0, banda", dict(escala=1.0, num_disparidades=64, block_size=15)),
+        ("estéreo 0.5, banda", dict(escala=0.5, num_disparidades=32, block_size=9)),
+        ("estéreo 0.25, banda", dict(escala=0.25, num_disparidades=16, block_size=7)),
+    ]
+    for nombre, kwargs in variantes:
+        sistema = SistemaEstereo(calib, columnas=16, **kwargs)
+        dt, perfil = medir(nombre, sistema.procesar, izq, der, repeticiones)
+        print(f"{'':<36} {base / dt:7.2f}x  perfil (cm): {' '.join(f'{v:.0f}' for v in perfil)}")
+
+
+if __name__ == "__main__":
+    main()
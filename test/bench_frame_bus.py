@@ -0,0 +1,49 @@
+import os
+import sys
+import threading
+import time
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from frame_bus import FrameBus, FakeCamera
+
+"""
+Benchmark del bus de frames con una cámara falsa.
+Uso: python test/bench_frame_bus.py [fps_camara] [segundos]
+"""
+
+
+def consumidor(sub, trabajo_s, stop):
+    while not stop.is_set():
+        item = sub.read(timeout=0.5)
+        if item is None:
+            continue
+        time.sleep(trabajo_s)  # Simula el costo de procesar el frame
+
+
+if __name__ == "__main__":
+    fps = float(sys.argv[1]) if len(sys.argv) > 1 else 30
+    duracion = float(sys.argv[2]) if len(sys.argv) > 2 else 5
+    bus = FrameBus(FakeCamera(fps=fps))
+    bus.start()
+    stop = threading.Event()
+    consumidores = [
+        ("mjpeg", "latest", 0.005),
+        ("perrito", "latest", 0.04),
+        ("grabador", "every", 0.001),
+        ("lento", "every", 0.1),
+    ]
+    hilos = []
+    for nombre, modo, trabajo in consumidores:
+        sub = bus.subscribe(nombre, modo)
+        t = threading.Thread(target=consumidor, args=(sub, trabajo, stop), daemon=True)
+        t.start()
+        hilos.append(t)
+    time.sleep(duracion)
+    stop.set()
+    for t in hilos:
+        t.join()
+    stats = bus.stats()
+    bus.stop()
+    print(f"Captura: {stats['frames_captured']} frames, {stats['capture_fps']} fps")
+    for s in stats["subscribers"]:
+        print(f"  {s['name']:<10} {s['mode']:<7} fps={s['fps']:>6} frames={s['frames']:>5} descartados={s['dropped']}")
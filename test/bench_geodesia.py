@@ -0,0 +1,56 @@
+import os
+import sys
+import time
+from math import radians, sin, cos, sqrt, atan2
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import numpy as np
+import geodesia
+
+"""
+Compara el cálculo escalar con math (como el Ferb.haversine original) contra geodesia.
+Uso: python test/bench_geodesia.py [puntos]
+"""
+
+
+def haversine_math(lat1, lon1, lat2, lon2):
+    lat1, lon1, lat2, lon2 = map(radians, [lat1, lon1, lat2, lon2])
+    a = sin((lat2 - lat1) / 2) ** 2 + cos(lat1) * cos(lat2) * sin((lon2 - lon1) / 2) ** 2
+    return 6371000 * 2 * atan2(sqrt(a), sqrt(1 - a))
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    rng = np.random.default_rng(0)
+    lats = 8.2959 + np.cumsum(rng.normal(0, 1e-5, n))
+    lons = -62.7119 + np.cumsum(rng.normal(0, 1e-5, n))
+
+    t0 = time.perf_counter()
+    escalar = [haversine_math(lats[i], lons[i], lats[i + 1], lons[i + 1]) for i in range(n - 1)]
+    t_escalar = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    vectorizado = geodesia.haversine(lats[:-1], lons[:-1], lats[1:], lons[1:])
+    t_vector = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    ruta = geodesia.Ruta(lats, lons)
+    t_ruta = time.perf_counter() - t0
+
+    error = np.max(np.abs(np.array(escalar) - vectorizado))
+    print(f"tramos={n - 1}: math {t_escalar * 1000:.1f} ms, numpy {t_vector * 1000:.2f} ms, Ruta completa {t_ruta * 1000:.2f} ms")
+    print(f"diferencia máxima math vs numpy: {error:.2e} m; longitud total {ruta.restante_desde[0]:.1f} m")
+
+    # Consulta por iteración del lazo: haversine escalar vs proyección local
+    ticks = 10000
+    t0 = time.perf_counter()
+    for _ in range(ticks):
+        haversine_math(lats[0], lons[0], lats[1], lons[1])
+    t_tick_math = time.perf_counter() - t0
+    x, y = ruta.to_xy(lats[0], lons[0])
+    t0 = time.perf_counter()
+    for _ in range(ticks):
+        ruta.distancia_a(1, x, y)
+    t_tick_ruta = time.perf_counter() - t0
+    print(f"por tick: math {t_tick_math / ticks * 1e6:.2f} µs, Ruta.distancia_a {t_tick_ruta / ticks * 1e6:.2f} µs")
+    print(f"error proyección local en el primer tramo: {abs(ruta.longitudes[0] - vectorizado[0]) * 1000:.3f} mm")
@@ -0,0 +1,210 @@
+import os
+import random
+import sys
+import threading
+import time
+from types import SimpleNamespace
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from frame_bus import FakeCamera, FrameBus
+from gestos import ACCIONES_GESTOS, FINGER_PIPS, FINGER_TIPS, MotorGestos, codigo_gesto, estados_dedos, landmarks_array
+from modo_gestos_control import ACCIONES, PipelineGestos
+from movimiento import PlanificadorMovimiento
+
+"""
+Compara la latencia gesto -> motor del lazo de gestos original (inferencia en cada frame,
+robot.move con sleep de 0.5 s y pausa de 0.2 s) contra PipelineGestos (inferencia en su
+propio hilo sobre el último frame, comandos sin bloquear). Un detector de manos falso
+tarda inferencia_ms por frame y "ve" un guion de gestos que cambia cada 2 s.
+Después, con un detector que se equivoca en una fracción de los frames, cuenta los
+comandos falsos a los motores sin filtro temporal y con MotorGestos (votación con histéresis).
+Uso: python test/bench_gestos.py [inferencia_ms] [segundos] [prob_error]
+"""
+
+GUION = ["forward", "left", "backward", "right", "stop", "forward", "backward", "left"]
+DEDOS = {
+    "forward": [False, False, False, False, False],
+    "backward": [True, True, True, True, True],
+    "right": [False, True, False, False, False],
+    "left": [False, True, True, False, False],
+    "stop": [True, False, False, False, True],
+}
+PERIODO_GESTO = 2.0
+
+
+def landmarks_de(dedos):
+    puntos = [SimpleNamespace(x=0.5, y=0.5, z=0.0) for _ in range(21)]
+    for i, (tip, pip) in enumerate(zip(FINGER_TIPS, FINGER_PIPS)):
+        if i == 0:
+            puntos[tip].x = 0.6 if dedos[0] else 0.4
+            puntos[pip].x = 0.5
+        else:
+            puntos[tip].y = 0.3 if dedos[i] else 0.7
+            puntos[pip].y = 0.5
+    return SimpleNamespace(landmark=puntos)
+
+
+class ManosFalsas:
+    """
+    Sustituto de mp_hands.Hands: tarda inferencia_ms y devuelve la mano del guion.
+    """
+
+    def __init__(self, inferencia_ms, inicio, prob_error=0.0, seed=0):
+        self.inferencia = inferencia_ms / 1000
+        self.inicio = inicio
+        self.prob_error = prob_error
+        self.rng = random.Random(seed)
+
+    def process(self, imagen):
+        gesto = gesto_en(time.monotonic() - self.inicio)
+        time.sleep(self.inferencia)
+        if self.rng.random() < self.prob_error:
+            if self.rng.random() < 0.3:
+                return SimpleNamespace(multi_hand_landmarks=None)  # Mano perdida
+            dedos = [self.rng.random() < 0.5 for _ in range(5)]  # Clasificación ruidosa
+            return SimpleNamespace(multi_hand_landmarks=[landmarks_de(dedos)])
+        return SimpleNamespace(multi_hand_landmarks=[landmarks_de(DEDOS[gesto])])
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+
+def gesto_en(t):
+    return GUION[int(t // PERIODO_GESTO) % len(GUION)]
+
+
+class RobotBanco:
+    """
+    Lo mínimo de Ferb que usan los dos lazos; registra cada escritura en las ruedas.
+    """
+
+    def __init__(self, bus):
+        self.bus = bus
+        self.current_mode = "gestos"
+        self.escrituras = []
+        self.movimiento = PlanificadorMovimiento(self.set_wheels)
+
+    def subscribe_frames(self, name, mode="latest"):
+        return self.bus.subscribe(name, mode)
+
+    def set_wheels(self, izq, der):
+        self.escrituras.append((time.monotonic(), (izq, der)))
+
+    def move(self, direction, speed=1.0, duration=1):
+        ruedas = {"forward": (1, 1), "backward": (-1, -1), "left": (-1, 1), "right": (1, -1)}
+        self.set_wheels(*ruedas.get(direction, (0, 0)))
+        if direction in ruedas:
+            time.sleep(duration)
+
+    def set_stream_overlay(self, overlay):
+        pass
+
+
+def lazo_original(robot, manos):
+    """
+    El lazo de modo_gestos_control antes de PipelineGestos.
+    """
+    with robot.subscribe_frames("gestos") as frames:
+        while robot.current_mode == "gestos":
+            item = frames.read()
+            if item is None:
+                continue
+            results = manos.process(item[2])
+            if results.multi_hand_landmarks:
+                for hand_landmarks in results.multi_hand_landmarks:
+                    codigo = codigo_gesto(estados_dedos(landmarks_array(hand_landmarks)))
+                    accion = ACCIONES_GESTOS.get(codigo, "stop")
+                    if accion == "spin":
+                        robot.move("right", duration=0.5)
+                        robot.move("right", duration=0.5)
+                    elif accion == "stop":
+                        robot.move("stop")
+                    else:
+                        robot.move(accion, duration=0.5)
+            time.sleep(0.2)
+
+
+def latencias(robot, inicio, segundos):
+    """
+    Para cada cambio de gesto del guion, tiempo hasta que las ruedas toman el valor nuevo.
+    """
+    resultado = []
+    cambios = int(segundos // PERIODO_GESTO)
+    for k in range(1, cambios):
+        t_cambio = inicio + k * PERIODO_GESTO
+        esperado = ACCIONES[GUION[k % len(GUION)]][0]
+        for t, ruedas in robot.escrituras:
+            if t >= t_cambio and ruedas == esperado:
+                resultado.append((t - t_cambio) * 1000)
+                break
+        else:
+            resultado.append(float("inf"))
+    return resultado
+
+
+def comandos_falsos(robot, inicio):
+    """
+    Escrituras a las ruedas que no corresponden al gesto del guion en ese momento.
+    Las paradas por vencimiento no cuentan: son la reacción segura a no tener gesto.
+    """
+    falsos = 0
+    for t, ruedas in robot.escrituras:
+        esperado = ACCIONES[gesto_en(t - inicio)][0]
+        if ruedas != esperado and ruedas != (0, 0):
+            falsos += 1
+    return falsos
+
+
+def correr(nombre, lazo, inferencia_ms, segundos, prob_error=0.0):
+    bus = FrameBus(FakeCamera(fps=30))
+    bus.start()
+    robot = RobotBanco(bus)
+    inicio = time.monotonic()
+    manos = ManosFalsas(inferencia_ms, inicio, prob_error)
+    hilo = threading.Thread(target=lazo, args=(robot, manos))
+    hilo.start()
+    time.sleep(segundos)
+    robot.current_mode = "manual"
+    hilo.join()
+    robot.movimiento.close()
+    bus.stop()
+    ms = sorted(latencias(robot, inicio, segundos))
+    mediana = ms[len(ms) // 2]
+    print(f"{nombre:<24} gesto->motor: mediana {mediana:5.0f} ms, máx {ms[-1]:5.0f} ms, "
+          f"{len(robot.escrituras):3d} escrituras, {comandos_falsos(robot, inicio):3d} falsas")
+    stats = getattr(robot, "stats", None)
+    if stats:
+        print(f"{'':<24} {stats['inferencias']} inferencias, frame->motor p50 {stats['latencia_ms_p50']:.0f} ms "
+              f"p95 {stats['latencia_ms_p95']:.0f} ms")
+    return robot
+
+
+def lazo_pipeline(robot, manos, motor_gestos=None, periodo_min=0.0):
+    with robot.subscribe_frames("gestos") as frames:
+        pipeline = PipelineGestos(robot, frames, manos, motor_gestos=motor_gestos, periodo_min=periodo_min)
+        pipeline.run(lambda: robot.current_mode == "gestos")
+        robot.stats = pipeline.stats()
+
+
+def main():
+    inferencia_ms = float(sys.argv[1]) if len(sys.argv) > 1 else 60
+    segundos = float(sys.argv[2]) if len(sys.argv) > 2 else 16
+    prob_error = float(sys.argv[3]) if len(sys.argv) > 3 else 0.2
+    print(f"Inferencia simulada de {inferencia_ms:.0f} ms, gesto nuevo cada {PERIODO_GESTO:.0f} s\n")
+    correr("original", lazo_original, inferencia_ms, segundos)
+    correr("pipeline", lazo_pipeline, inferencia_ms, segundos)
+
+    print(f"\nDetector con {prob_error * 100:.0f}% de frames erróneos\n")
+    sin_filtro = lambda: MotorGestos(ventana=1, entrar=1, salir=1)
+    correr("original", lazo_original, inferencia_ms, segundos, prob_error)
+    correr("pipeline sin filtro", lambda r, m: lazo_pipeline(r, m, sin_filtro()), inferencia_ms, segundos, prob_error)
+    correr("pipeline + MotorGestos", lazo_pipeline, inferencia_ms, segundos, prob_error)
+    correr("MotorGestos, 1 de cada 2", lambda r, m: lazo_pipeline(r, m, periodo_min=2 * inferencia_ms / 1000),
+           inferencia_ms, segundos, prob_error)
+
+
+if __name__ == "__main__":
+    main()
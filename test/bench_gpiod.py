@@ -0,0 +1,129 @@
+import os
+import sys
+import tempfile
+import time
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from motores_gpiod import ChipFalso, MotoresGpiod, PWMSoftware, PWMSysfs
+
+"""
+Compara, sobre un chip gpiod falso, el control de motores original de ferb_gpiod (seis
+líneas pedidas por separado y un set_value por línea) con MotoresGpiod (un bulk request y
+un set_values por comando). Cuenta llamadas al kernel por comando, comandos por segundo y
+estados intermedios (glitches) entre un comando y el siguiente. Después mide el ciclo de
+trabajo real del PWM por software y las escrituras del PWM por sysfs sobre un árbol falso.
+Uso: python test/bench_gpiod.py [comandos]
+"""
+
+IZQ = (21, 26, 18)  # adelante, atrás, enable
+DER = (0, 25, 27)
+COMANDOS = [(1, 1), (-1, 1), (-1, -1), (1, -1), (0, 0)]
+
+
+class MotoresOriginal:
+    """
+    Lo que hacía ferb_gpiod.Ferb: una línea por pin y un set_value por línea.
+    """
+
+    def __init__(self, chip):
+        self.lineas = {}
+        for pin in (*IZQ, *DER):
+            linea = chip.get_line(pin)
+            linea.request(consumer=f"motor_{pin}", type=chip.LINE_REQ_DIR_OUT)
+            linea.set_value(0)
+            self.lineas[pin] = linea
+
+    def _motor(self, pines, v):
+        adelante, atras, enable = pines
+        self.lineas[adelante].set_value(int(v > 0))
+        self.lineas[atras].set_value(int(v < 0))
+        self.lineas[enable].set_value(int(v != 0))
+
+    @property
+    def value(self):
+        return None
+
+    @value.setter
+    def value(self, value):
+        self._motor(IZQ, value[0])
+        self._motor(DER, value[1])
+
+
+def estado(izq, der):
+    valores = {}
+    for pines, v in ((IZQ, izq), (DER, der)):
+        adelante, atras, enable = pines
+        valores.update({adelante: int(v > 0), atras: int(v < 0), enable: int(v != 0)})
+    return valores
+
+
+def glitches(historial, comandos):
+    """
+    Estados escritos que no son ni el comando anterior ni el nuevo.
+    """
+    validos = [estado(*c) for c in comandos]
+    return sum(1 for _, valores in historial if valores not in validos)
+
+
+def medir(nombre, crear, comandos):
+    chip = ChipFalso(registrar_historial=True)
+    motores = crear(chip)
+    inicio_llamadas = chip.llamadas
+    inicio = len(chip.historial)
+    t0 = time.perf_counter()
+    for i in range(comandos):
+        motores.value = COMANDOS[i % len(COMANDOS)]
+    dt = time.perf_counter() - t0
+    llamadas = chip.llamadas - inicio_llamadas
+    malos = glitches(chip.historial[inicio:], COMANDOS)
+    print(f"{nombre:<12} {llamadas / comandos:4.1f} llamadas/comando  {comandos / dt:9.0f} comandos/s  "
+          f"{malos} estados intermedios de {chip.llamadas - inicio_llamadas}")
+    return motores
+
+
+def duty_real(chip, pin, desde):
+    historial = [(t, v) for t, v in chip.historial if t >= desde]
+    encendido = total = 0.0
+    for (t, valores), (t2, _) in zip(historial, historial[1:]):
+        total += t2 - t
+        encendido += (t2 - t) * valores.get(pin, 0)
+    return encendido / total if total else 0.0
+
+
+def main():
+    comandos = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    print(f"{comandos} comandos alternando {len(COMANDOS)} direcciones\n")
+    medir("original", MotoresOriginal, comandos)
+    motores = medir("bulk", lambda chip: MotoresGpiod(IZQ[:2], DER[:2], (IZQ[2], DER[2]), chip=chip), comandos)
+    motores.close()
+
+    print("\nPWM por software a 100 Hz (ENA)")
+    chip = ChipFalso(registrar_historial=True)
+    motores = MotoresGpiod(IZQ[:2], DER[:2], (IZQ[2], DER[2]), chip=chip, pwm=PWMSoftware(100))
+    for duty in (0.25, 0.5, 0.75):
+        motores.forward(duty)
+        time.sleep(0.05)
+        desde = time.monotonic()
+        time.sleep(0.5)
+        print(f"  pedido {duty:.2f}  medido {duty_real(chip, IZQ[2], desde):.2f}")
+    motores.close()
+
+    with tempfile.TemporaryDirectory() as raiz:
+        for canal in (0, 1):
+            directorio = os.path.join(raiz, "pwmchip0", f"pwm{canal}")
+            os.makedirs(directorio)
+            for archivo in ("period", "duty_cycle", "enable"):
+                open(os.path.join(directorio, archivo), "w").close()
+        chip = ChipFalso()
+        motores = MotoresGpiod(IZQ[:2], DER[:2], (18, 13), chip=chip, pwm=PWMSysfs(raiz=raiz))
+        t0 = time.perf_counter()
+        for i in range(comandos):
+            motores.forward(0.5 + 0.5 * (i % 2))
+        dt = time.perf_counter() - t0
+        print(f"\nPWM por sysfs: {comandos / dt:.0f} cambios de velocidad/s, "
+              f"{chip.llamadas} escrituras GPIO y {motores.pwm.escrituras} de duty_cycle")
+        motores.close()
+
+
+if __name__ == "__main__":
+    main()
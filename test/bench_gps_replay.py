@@ -0,0 +1,89 @@
+import os
+import sys
+import time
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from gps import GPS
+from gps_sources import ReplaySource, PtyReplay, load_sentences, synthesize_route
+from collections import deque
+
+"""
+Reproduce NMEA grabado a través de la clase GPS y mide el rendimiento del parser.
+Uso: python test/bench_gps_replay.py [log] [--pty] [--posicion]
+Sin log se usa una ruta sintética de 10000 epochs (gps_stream.log no tiene fix).
+"""
+
+
+def ruta_sintetica(n=10000):
+    # Línea recta de ~1 m por epoch desde el laboratorio
+    return synthesize_route([(8.2959 + i * 9e-6, -62.7119) for i in range(n)], rate_hz=10)
+
+
+def medir_parser(sentencias):
+    gps = GPS(source=ReplaySource(sentences=sentencias, speed=None))
+    t0 = time.perf_counter()
+    while True:
+        line = gps.ser.readline()
+        if not line:
+            break
+        gps.process_sentence(line)
+    dt = time.perf_counter() - t0
+    fixes = gps.fix.seq + 1 if gps.fix else 0
+    print(f"parser: {len(sentencias)} sentencias en {dt:.3f}s ({len(sentencias) / dt:.0f}/s), fixes={fixes}")
+
+
+def medir_lector(sentencias, pty):
+    source = ReplaySource(sentences=sentencias, speed=None)
+    if pty:
+        replay = PtyReplay(source)
+        gps = GPS(port=replay.port, baudrate=38400)
+    else:
+        gps = GPS(source=source)
+    t0 = time.perf_counter()
+    gps.start_reader()
+    # Esperar a que el lector drene todo (o se detenga por 1 s)
+    procesadas, t_ultimo = 0, t0
+    while gps.sentences_read < len(sentencias) and time.perf_counter() - t_ultimo < 1:
+        if gps.sentences_read != procesadas:
+            procesadas, t_ultimo = gps.sentences_read, time.perf_counter()
+        time.sleep(0.01)
+    dt = max(time.perf_counter() - t0, 1e-9)
+    gps.close()
+    if pty:
+        replay.close()
+    fixes = gps.fix.seq + 1 if gps.fix else 0
+    print(
+        f"lector{' (pty)' if pty else ''}: {gps.sentences_read} sentencias en {dt:.3f}s "
+        f"({gps.sentences_read / dt:.0f}/s), fixes={fixes}"
+    )
+
+
+def medir_posicion(sentencias, velocidad=10, duracion=5):
+    """
+    Mide cuántas posiciones promediadas entrega Ferb.get_current_position con el GPS reproducido.
+    """
+    from ferb import Ferb
+
+    robot = Ferb.__new__(Ferb)
+    robot.gps = GPS(source=ReplaySource(sentences=sentencias, speed=velocidad))
+    robot.gps.start_reader()
+    robot._last_fix_seq = -1
+    robot.gps_history_size = 3
+    robot.gps_position_history = deque(maxlen=robot.gps_history_size)
+    llamadas = posiciones = 0
+    t0 = time.perf_counter()
+    while time.perf_counter() - t0 < duracion:
+        llamadas += 1
+        if robot.get_current_position(timeout=1):
+            posiciones += 1
+    robot.gps.close()
+    print(f"get_current_position (x{velocidad}): {llamadas} llamadas, {posiciones} posiciones en {duracion}s")
+
+
+if __name__ == "__main__":
+    args = [a for a in sys.argv[1:] if not a.startswith("--")]
+    sentencias = load_sentences(args[0]) if args else ruta_sintetica()
+    medir_parser(sentencias)
+    medir_lector(sentencias, pty="--pty" in sys.argv)
+    if "--posicion" in sys.argv:
+        medir_posicion(sentencias)
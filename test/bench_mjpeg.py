@@ -0,0 +1,72 @@
+import os
+import sys
+import threading
+import time
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import cv2
+from frame_bus import FrameBus, FakeCamera
+from mjpeg import MjpegBroadcaster
+
+"""
+Compara la codificación JPEG por espectador contra el codificador compartido.
+Uso: python test/bench_mjpeg.py [espectadores] [segundos]
+"""
+
+
+def espectador_compartido(broadcaster, stop, lento):
+    client = broadcaster.subscribe()
+    for _ in broadcaster.stream(client):
+        if stop.is_set():
+            break
+        if lento:
+            time.sleep(0.2)  # Navegador con mala conexión
+
+
+def espectador_propio(bus, stop, contador):
+    sub = bus.subscribe("propio")
+    while not stop.is_set():
+        item = sub.read(timeout=0.5)
+        if item is None:
+            continue
+        cv2.imencode(".jpg", item[2])
+        contador.append(1)
+    sub.close()
+
+
+def medir(espectadores, duracion, compartido):
+    bus = FrameBus(FakeCamera(size=(640, 480), fps=30))
+    bus.start()
+    stop = threading.Event()
+    contador = []
+    broadcaster = MjpegBroadcaster(bus)
+    hilos = []
+    for i in range(espectadores):
+        if compartido:
+            args, target = (broadcaster, stop, i == 0), espectador_compartido
+        else:
+            args, target = (bus, stop, contador), espectador_propio
+        t = threading.Thread(target=target, args=args, daemon=True)
+        t.start()
+        hilos.append(t)
+    cpu0 = time.process_time()
+    time.sleep(duracion)
+    cpu = time.process_time() - cpu0
+    stats = broadcaster.stats()
+    stop.set()
+    broadcaster.stop()
+    bus.stop()
+    codificados = stats["frames_encoded"] if compartido else len(contador)
+    return codificados, cpu, stats
+
+
+if __name__ == "__main__":
+    espectadores = int(sys.argv[1]) if len(sys.argv) > 1 else 4
+    duracion = float(sys.argv[2]) if len(sys.argv) > 2 else 5
+    for compartido in (False, True):
+        codificados, cpu, stats = medir(espectadores, duracion, compartido)
+        nombre = "compartido" if compartido else "por espectador"
+        print(f"{nombre:<15} espectadores={espectadores} jpeg={codificados} cpu={cpu:.2f}s ({cpu / duracion * 100:.0f}% de un núcleo)")
+        if compartido:
+            for i, c in enumerate(stats["clients"]):
+                print(f"    cliente {i}: enviados={c['sent']} descartados={c['dropped']}")
@@ -0,0 +1,137 @@
+import os
+import sys
+import threading
+import time
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from modos import SupervisorModos, TokenCancelacion
+
+"""
+Mide la latencia de los cambios de modo: desde el pedido hasta que el comportamiento
+anterior terminó y el nuevo arrancó. Compara los tres hilos de modo originales (cada uno
+revisa current_mode cada 0.5 s y /mode/ los detiene con join) con SupervisorModos. Los
+comportamientos falsos procesan un "frame" cada periodo_ms, como los modos reales.
+Después, si el backend simulado está disponible, cambia de modo un Ferb simulado real.
+Uso: python test/bench_modos.py [cambios] [periodo_ms]
+"""
+
+MODOS = ["dog", "obstaculos", "gestos", "manual"]
+
+
+class RobotBanco:
+    def __init__(self):
+        self.current_mode = "manual"
+        self.arranques = []  # (modo, time.monotonic())
+
+
+def comportamiento(modo, periodo):
+    def correr(robot, token=None):
+        token = token or TokenCancelacion(robot, modo)
+        robot.arranques.append((modo, time.monotonic()))
+        while not token.cancelado:
+            time.sleep(periodo)  # Un frame
+
+    return correr
+
+
+class HilosOriginales:
+    """
+    _dog_handler/_obstaculos_handler/_gestos_handler de Ferb y _apply_mode de main.py.
+    """
+
+    def __init__(self, robot, comportamientos):
+        self.robot = robot
+        self.comportamientos = comportamientos
+        self.hilos = {}
+
+    def _handler(self, modo):
+        while self.hilos[modo][0]:
+            if self.robot.current_mode == modo:
+                self.comportamientos[modo](self.robot)
+            time.sleep(0.5)
+
+    def start(self, modo):
+        if modo not in self.hilos or not self.hilos[modo][0]:
+            estado = [True, None]
+            self.hilos[modo] = estado
+            estado[1] = threading.Thread(target=self._handler, args=(modo,))
+            estado[1].daemon = True
+            estado[1].start()
+
+    def stop(self, modo):
+        if modo in self.hilos and self.hilos[modo][0]:
+            self.hilos[modo][0] = False
+            self.hilos[modo][1].join()
+
+    def cambiar(self, modo):
+        self.robot.current_mode = modo
+        for otro in self.comportamientos:
+            if otro != modo:
+                self.stop(otro)
+        if modo in self.comportamientos:
+            self.start(modo)
+
+
+def latencias(robot, pedidos):
+    ms = []
+    for modo, t in pedidos:
+        if modo not in MODOS[:3]:
+            continue
+        arranque = next((t2 for m, t2 in robot.arranques if m == modo and t2 >= t), None)
+        ms.append((arranque - t) * 1000 if arranque is not None else float("inf"))
+    return sorted(ms)
+
+
+def medir(nombre, crear, cambios, periodo):
+    robot = RobotBanco()
+    comportamientos = {modo: comportamiento(modo, periodo) for modo in MODOS[:3]}
+    sistema = crear(robot, comportamientos)
+    pedidos = []
+    bloqueo = []
+    for i in range(cambios):
+        modo = MODOS[i % len(MODOS)]
+        t0 = time.monotonic()
+        sistema.cambiar(modo)
+        bloqueo.append((time.monotonic() - t0) * 1000)
+        pedidos.append((modo, t0))
+        time.sleep(0.6)
+    sistema.cambiar("manual")
+    ms = latencias(robot, pedidos)
+    bloqueo.sort()
+    print(f"{nombre:<12} pedido -> modo nuevo en marcha: p50 {ms[len(ms) // 2]:6.1f} ms  máx {ms[-1]:6.1f} ms; "
+          f"/mode/ bloqueado p50 {bloqueo[len(bloqueo) // 2]:6.2f} ms  máx {bloqueo[-1]:6.1f} ms")
+    return sistema
+
+
+def ferb_simulado(cambios):
+    try:
+        from ferb import Ferb
+        robot = Ferb(backend="sim")
+    except Exception as e:
+        print(f"\nSin backend simulado ({e})")
+        return
+    try:
+        for i in range(cambios):
+            robot.set_mode(["dog", "obstaculos", "manual"][i % 3])
+            time.sleep(1.0)
+        robot.set_mode("manual")
+        robot.modos.esperar(timeout=2)
+        stats = robot.mode_stats()
+    finally:
+        robot.cleanup()
+    print(f"\nFerb simulado, {stats['cambios']} cambios: p50 {stats['latencia_ms_p50']:.1f} ms  "
+          f"p95 {stats['latencia_ms_p95']:.1f} ms; último {stats['ultimo_cambio']}")
+
+
+def main():
+    cambios = int(sys.argv[1]) if len(sys.argv) > 1 else 12
+    periodo = (float(sys.argv[2]) if len(sys.argv) > 2 else 33) / 1000
+    print(f"{cambios} cambios de modo, comportamientos a {1 / periodo:.0f} frames/s\n")
+    medir("original", HilosOriginales, cambios, periodo)
+    supervisor = medir("supervisor", SupervisorModos, cambios, periodo)
+    supervisor.close()
+    ferb_simulado(cambios)
+
+
+if __name__ == "__main__":
+    main()
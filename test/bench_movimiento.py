@@ -0,0 +1,240 @@
+import os
+import sys
+import threading
+import time
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from movimiento import DIRECCIONES, PlanificadorMovimiento
+
+"""
+Compara el Ferb.move original (escribe las ruedas, duerme duration y se detiene) con
+PlanificadorMovimiento. Mide cuánto queda bloqueado el llamador por comando, cuánto tarda
+un comando nuevo en llegar a las ruedas mientras otro está en curso (preempción) y el
+retraso de la parada respecto a su vencimiento.
+Después compara el movimiento continuo original (un hilo nuevo por cambio de dirección que
+reescribe las ruedas cada 0.2 s) con PlanificadorMovimiento.mantener: latencia de un cambio
+de dirección, escrituras a los motores mientras se mantiene y parada por hombre muerto.
+Uso: python test/bench_movimiento.py [comandos] [duracion]
+"""
+
+
+class Ruedas:
+    """
+    Registra cada escritura en los motores con su instante.
+    """
+
+    def __init__(self):
+        self.escrituras = []
+        self._lock = threading.Lock()
+
+    def __call__(self, izq, der):
+        with self._lock:
+            self.escrituras.append((time.monotonic(), (izq, der)))
+
+    def tramo(self, desde, valor):
+        """
+        (inicio, fin) del primer tramo con las ruedas en valor a partir de desde.
+        """
+        with self._lock:
+            escrituras = list(self.escrituras)
+        for i, (t, ruedas) in enumerate(escrituras):
+            if t >= desde and ruedas == valor:
+                fin = next((t2 for t2, r2 in escrituras[i + 1:] if r2 != valor), None)
+                return t, fin
+        return None, None
+
+
+class RuedasQueFallan(Ruedas):
+    """
+    Como Ruedas, pero las primeras `fallos` escrituras distintas de (0, 0) lanzan una excepción.
+    """
+
+    def __init__(self, fallos):
+        super().__init__()
+        self.fallos = fallos
+
+    def __call__(self, izq, der):
+        if (izq, der) != (0, 0) and self.fallos > 0:
+            self.fallos -= 1
+            raise OSError("fallo simulado del driver de motores")
+        super().__call__(izq, der)
+
+
+def fallo_hardware(hombre_muerto=0.2):
+    """
+    Una escritura que falla no debe matar el hilo: el robot se detiene, la renovación
+    siguiente vuelve a escribir y el hombre muerto sigue cumpliéndose.
+    """
+    ruedas = RuedasQueFallan(1)
+    plan = PlanificadorMovimiento(ruedas, hombre_muerto=hombre_muerto)
+    plan.mantener("forward")
+    time.sleep(0.05)
+    assert plan._thread.is_alive(), "el hilo del planificador murió con la excepción"
+    assert ruedas.escrituras and ruedas.escrituras[-1][1] == (0, 0), "no se detuvo tras el fallo"
+    t0 = time.monotonic()
+    plan.mantener("forward")
+    time.sleep(hombre_muerto * 2)
+    inicio, fin = ruedas.tramo(t0, (1.0, 1.0))
+    assert inicio is not None, "la renovación tras el fallo no volvió a escribir"
+    assert fin is not None, "el hombre muerto no detuvo el robot tras el fallo"
+    print(f"{'planificador':<14} tras un fallo del hardware: {plan.stats()['errores']} error, "
+          f"se detiene a los {(fin - inicio) * 1000:.0f} ms (hombre muerto {hombre_muerto * 1000:.0f} ms)")
+    plan.close()
+
+
+def move_original(ruedas, direction, speed=1.0, duration=1.0):
+    izq, der = DIRECCIONES.get(direction, (0, 0))
+    ruedas(izq * speed, der * speed)
+    if direction != "stop":
+        time.sleep(duration)
+        ruedas(0, 0)
+
+
+class ContinuoOriginal:
+    """
+    start/stop_continuous_move de Ferb antes del planificador.
+    """
+
+    def __init__(self, ruedas):
+        self.ruedas = ruedas
+        self._thread = None
+        self._running = False
+        self._direccion = None
+        self._speed = 1
+
+    def _worker(self):
+        while self._running:
+            izq, der = DIRECCIONES.get(self._direccion, (0, 0))
+            self.ruedas(izq * self._speed, der * self._speed)
+            time.sleep(0.2)
+
+    def start(self, direccion, speed=1):
+        self.stop()
+        self._direccion = direccion
+        self._speed = speed
+        if direccion != "stop":
+            self._running = True
+            self._thread = threading.Thread(target=self._worker)
+            self._thread.daemon = True
+            self._thread.start()
+
+    def stop(self):
+        self._running = False
+        if self._thread:
+            self._thread.join(timeout=1)
+        self._thread = None
+        self._direccion = None
+        self.ruedas(0, 0)
+
+
+def p(valores, q):
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(len(ordenados) * q))]
+
+
+def bloqueo(nombre, mover, comandos, duracion):
+    """
+    Un lazo de percepción manda un comando por vuelta; mide el tiempo dentro de move().
+    """
+    ms = []
+    for i in range(comandos):
+        t0 = time.perf_counter()
+        mover("forward" if i % 2 else "left", 1.0, duracion)
+        ms.append((time.perf_counter() - t0) * 1000)
+    print(f"{nombre:<14} bloqueo por comando: p50 {p(ms, 0.5):8.3f} ms  p95 {p(ms, 0.95):8.3f} ms  "
+          f"({1000 / max(p(ms, 0.5), 1e-3):.0f} vueltas/s posibles)")
+
+
+def preempcion(nombre, mover, ruedas, comandos, duracion):
+    """
+    Manda "left" y, a mitad de su duración, "backward" desde otro hilo (p. ej. el lazo de
+    obstáculos vio algo). Mide desde el segundo comando hasta que las ruedas cambian y
+    cuánto dura realmente el "backward" (la parada del primer comando no debe cortarlo).
+    """
+    ms = []
+    duraciones = []
+    for _ in range(comandos):
+        hilo = threading.Thread(target=mover, args=("left", 1.0, duracion))
+        hilo.start()
+        time.sleep(duracion / 2)
+        t0 = time.monotonic()
+        otro = threading.Thread(target=mover, args=("backward", 1.0, duracion))
+        otro.start()
+        hilo.join()
+        otro.join()
+        time.sleep(duracion * 1.5)  # El planificador vuelve antes de mover; esperar a que termine
+        inicio, fin = ruedas.tramo(t0, (-1.0, -1.0))
+        ms.append((inicio - t0) * 1000 if inicio is not None else float("inf"))
+        duraciones.append((fin - inicio) * 1000 if inicio is not None and fin is not None else 0.0)
+    print(f"{nombre:<14} comando nuevo -> ruedas: p50 {p(ms, 0.5):8.3f} ms  p95 {p(ms, 0.95):8.3f} ms, "
+          f"\"backward\" dura p50 {p(duraciones, 0.5):5.0f} ms de {duracion * 1000:.0f}")
+
+
+def continuo(nombre, ruedas, empezar, detener, repetir, comandos, mantener=1.0):
+    """
+    Cambia de dirección cada mantener segundos. Si repetir, reenvía el comando cada 0.25 s
+    como un cliente que mantiene apretado el botón. Mide cambio -> ruedas y escrituras por segundo.
+    """
+    ms = []
+    direcciones = ["forward", "left", "backward", "right"]
+    t_inicio = time.monotonic()
+    for i in range(comandos):
+        direccion = direcciones[i % len(direcciones)]
+        t0 = time.monotonic()
+        empezar(direccion, 1.0)
+        while time.monotonic() < t0 + mantener:
+            time.sleep(0.25)
+            if repetir:
+                empezar(direccion, 1.0)
+        inicio, _ = ruedas.tramo(t0, tuple(float(v) for v in DIRECCIONES[direccion]))
+        ms.append((inicio - t0) * 1000 if inicio is not None else float("inf"))
+    detener()
+    total = time.monotonic() - t_inicio
+    print(f"{nombre:<14} cambio -> ruedas: p50 {p(ms, 0.5):8.3f} ms  p95 {p(ms, 0.95):8.3f} ms, "
+          f"{len(ruedas.escrituras) / total:5.1f} escrituras/s")
+
+
+def main():
+    comandos = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    duracion = float(sys.argv[2]) if len(sys.argv) > 2 else 0.2
+    print(f"{comandos} comandos de {duracion * 1000:.0f} ms\n")
+
+    ruedas = Ruedas()
+    original = lambda d, s, t: move_original(ruedas, d, s, t)
+    bloqueo("original", original, comandos, duracion)
+    preempcion("original", original, ruedas, comandos, duracion)
+
+    ruedas = Ruedas()
+    plan = PlanificadorMovimiento(ruedas)
+    bloqueo("planificador", plan.ejecutar, comandos, duracion)
+    plan.esperar(plan.ejecutar("forward", 1.0, duracion))
+    preempcion("planificador", plan.ejecutar, ruedas, comandos, duracion)
+
+    # Tardanza de la parada: comandos sueltos, esperando a que cada uno termine
+    for _ in range(comandos):
+        plan.esperar(plan.ejecutar("forward", 1.0, duracion))
+    stats = plan.stats()
+    print(f"{'planificador':<14} parada tras vencimiento: p50 {stats['tardanza_ms_p50']:.3f} ms  "
+          f"p95 {stats['tardanza_ms_p95']:.3f} ms, {stats['preempciones']} preempciones")
+
+    print(f"\nMovimiento continuo: {comandos} cambios de dirección\n")
+    ruedas = Ruedas()
+    original = ContinuoOriginal(ruedas)
+    continuo("original", ruedas, original.start, original.stop, False, comandos)
+    ruedas = Ruedas()
+    plan = PlanificadorMovimiento(ruedas, hombre_muerto=0.5)
+    continuo("planificador", ruedas, plan.mantener, plan.detener, True, comandos)
+    # Hombre muerto: el cliente deja de repetir el comando
+    t0 = time.monotonic()
+    plan.mantener("forward")
+    time.sleep(plan.hombre_muerto * 1.5)
+    inicio, fin = ruedas.tramo(t0, (1.0, 1.0))
+    stats = plan.stats()
+    print(f"{'planificador':<14} sin repetir el comando se detiene a los {(fin - inicio) * 1000:.0f} ms "
+          f"(hombre muerto {plan.hombre_muerto * 1000:.0f} ms), {stats['renovaciones']} renovaciones")
+    plan.close()
+    fallo_hardware()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+import math
+import os
+import random
+import sys
+import time
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import geodesia
+from gps import GPSFix
+from navegacion import ControladorNavegacion
+
+"""
+Compara el tiempo de ruta del controlador continuo contra el ciclo original
+parar-girar-avanzar 5 s, sobre un robot diferencial simulado en tiempo virtual.
+Uso: python test/bench_navegacion.py [gps_hz] [--tiempo-real N]
+Con --tiempo-real el controlador corre con reloj de pared acelerado N veces, para medir el jitter del lazo.
+"""
+
+VMAX = 0.5  # m/s con las ruedas a 1
+ANCHO = 0.2  # m entre ruedas
+
+
+class Simulacion:
+    """
+    Robot diferencial con GPS y brújula ruidosos. El tiempo solo avanza en dormir().
+    """
+
+    def __init__(self, ruta, gps_hz=1.0, ruido_gps=0.5, ruido_brujula=2.0, seed=0):
+        self.rng = random.Random(seed)
+        self.ruta = ruta
+        self.t = 0.0
+        self.x, self.y, self.rumbo = -3.0, -3.0, 90.0
+        self.izq = self.der = 0.0
+        self.gps_periodo = 1.0 / gps_hz
+        self.ruido_gps = ruido_gps
+        self.ruido_brujula = ruido_brujula
+        self.proximo_fix = 0.0
+        self.fix = None
+
+    def reloj(self):
+        return self.t
+
+    def dormir(self, dt):
+        pasos = max(1, int(dt / 0.01))
+        h = dt / pasos
+        for _ in range(pasos):
+            v = (self.izq + self.der) / 2 * VMAX
+            w = (self.izq - self.der) * VMAX / ANCHO  # rad/s, positivo = horario
+            self.rumbo = (self.rumbo + math.degrees(w * h)) % 360
+            self.x += v * h * math.sin(math.radians(self.rumbo))
+            self.y += v * h * math.cos(math.radians(self.rumbo))
+            self.t += h
+
+    def aplicar_ruedas(self, izq, der):
+        self.izq, self.der = izq, der
+
+    def leer_rumbo(self):
+        return (self.rumbo + self.rng.gauss(0, self.ruido_brujula)) % 360
+
+    def leer_fix(self):
+        if self.t >= self.proximo_fix:
+            self.proximo_fix = self.t + self.gps_periodo
+            lat, lon = self.ruta.proyeccion.to_latlon(
+                self.x + self.rng.gauss(0, self.ruido_gps), self.y + self.rng.gauss(0, self.ruido_gps)
+            )
+            seq = self.fix.seq + 1 if self.fix else 0
+            self.fix = GPSFix(seq=seq, lat=float(lat), lon=float(lon), timestamp=self.t)
+        return self.fix
+
+
+class TiempoReal:
+    """
+    Reloj de pared acelerado: cada dormir() duerme de verdad y avanza la física lo que pasó.
+    """
+
+    def __init__(self, sim, aceleracion):
+        self.sim = sim
+        self.aceleracion = aceleracion
+        self.t0 = time.monotonic()
+
+    def reloj(self):
+        return (time.monotonic() - self.t0) * self.aceleracion
+
+    def dormir(self, dt):
+        antes = self.reloj()
+        time.sleep(dt / self.aceleracion)
+        self.sim.dormir(self.reloj() - antes)
+
+
+def ciclo_original(sim, ruta, threshold=1.5, avance_time=5):
+    """
+    Reproduce el Ferb.navigate original: parar, girar hasta ±5°, avanzar 5 s a ciegas.
+    """
+    for idx in range(len(ruta)):
+        while True:
+            # get_current_position promediaba 3 fixes seguidos
+            muestras = []
+            while len(muestras) < 3:
+                sim.dormir(sim.gps_periodo)
+                fix = sim.leer_fix()
+                muestras.append(ruta.to_xy(fix.lat, fix.lon))
+            x = sum(float(m[0]) for m in muestras) / 3
+            y = sum(float(m[1]) for m in muestras) / 3
+            if ruta.distancia_a(idx, x, y) < threshold:
+                break
+            objetivo = ruta.rumbo_a(idx, x, y)
+            while True:
+                diff = (objetivo - sim.leer_rumbo() + 360) % 360
+                if diff < 5 or diff > 355:
+                    break
+                sim.aplicar_ruedas(0.5, -0.5) if diff < 180 else sim.aplicar_ruedas(-0.5, 0.5)
+                sim.dormir(0.1)
+            sim.aplicar_ruedas(1, 1)
+            sim.dormir(avance_time)
+            sim.aplicar_ruedas(0, 0)
+            if sim.t > 3600:
+                return False
+    return True
+
+
+if __name__ == "__main__":
+    gps_hz = float(sys.argv[1]) if len(sys.argv) > 1 and not sys.argv[1].startswith("--") else 1.0
+    proyeccion = geodesia.ProyeccionLocal(8.2959, -62.7119)
+    puntos = [(0, 0), (20, 0), (20, 20), (0, 20), (0, 0)]
+    lats, lons = proyeccion.to_latlon([p[0] for p in puntos], [p[1] for p in puntos])
+    ruta = geodesia.Ruta(lats, lons, origen=(8.2959, -62.7119))
+    largo = ruta.restante_desde[0]
+
+    sim = Simulacion(ruta, gps_hz)
+    ok = ciclo_original(sim, ruta)
+    print(f"original:  completada={ok} tiempo={sim.t:7.1f}s  (ruta {largo:.0f} m, ideal {largo / VMAX:.0f}s)")
+
+    sim = Simulacion(ruta, gps_hz)
+    reloj, dormir = sim.reloj, sim.dormir
+    if "--tiempo-real" in sys.argv:
+        tiempo = TiempoReal(sim, float(sys.argv[sys.argv.index("--tiempo-real") + 1]))
+        reloj, dormir = tiempo.reloj, tiempo.dormir
+    controlador = ControladorNavegacion(
+        sim.leer_fix, sim.leer_rumbo, sim.aplicar_ruedas, velocidad=1.0, velocidad_ms=VMAX,
+        reloj=reloj, dormir=dormir,
+    )
+    ok = controlador.run(ruta, detener=lambda: sim.t > 3600)
+    tel = controlador.telemetria
+    print(f"continuo:  completada={ok} tiempo={tel['duracion_s']:7.1f}s  ticks={tel['ticks']}")
+    print(
+        f"jitter del lazo: p50={tel['jitter_p50_ms']:.2f}ms p95={tel['jitter_p95_ms']:.2f}ms "
+        f"max={tel['jitter_max_ms']:.2f}ms (periodo medio {tel['periodo_medio_ms']:.1f}ms)"
+    )
@@ -0,0 +1,124 @@
+"""
+Compara el parser de bytes (nmea.py) contra pynmea2: primero campo por campo (lat, lon,
+velocidad, rumbo, satélites, HDOP...) en cada sentencia, después la velocidad.
+Uso: python test/bench_nmea.py [log]
+Sin log se usa una ruta sintética con fix (gps_stream.log solo tiene sentencias vacías).
+"""
+
+import os
+import sys
+import time
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import pynmea2
+import nmea
+from gps_sources import load_sentences, synthesize_epoch, synthesize_route
+
+TIPOS = ("RMC", "GGA", "VTG")
+
+
+def con_pynmea2(lineas):
+    n = 0
+    for line in lineas:
+        texto = line.decode("utf-8").strip()
+        if texto[3:6] not in TIPOS:
+            continue
+        try:
+            pynmea2.parse(texto)
+            n += 1
+        except pynmea2.ParseError:
+            pass
+    return n
+
+
+def con_nmea(lineas):
+    return sum(1 for line in lineas if nmea.parse_sentence(line) is not None)
+
+
+def con_nmea_buffer(buffer):
+    return len(nmea.parse_buffer(buffer)[0])
+
+
+def _num(valor):
+    if valor is None or valor == "":
+        return None
+    return float(valor)
+
+
+def campos_pynmea2(msg):
+    """
+    Los campos de msg (pynmea2) en el orden de las tuplas de nmea.py.
+    """
+    tipo = msg.sentence_type.encode()
+    if tipo == nmea.RMC:
+        return (tipo, msg.status == "A", _num(msg.lat and msg.latitude), _num(msg.lon and msg.longitude),
+                _num(msg.spd_over_grnd), _num(msg.true_course))
+    if tipo == nmea.GGA:
+        return (tipo, _num(msg.gps_qual), _num(msg.num_sats), _num(msg.horizontal_dil),
+                _num(msg.lat and msg.latitude), _num(msg.lon and msg.longitude))
+    return (tipo, _num(msg.true_track), _num(msg.spd_over_grnd_kmph))
+
+
+def comparar_campos(lineas, tolerancia=1e-9):
+    """
+    Parsea cada línea con los dos parsers y compara campo por campo. Devuelve
+    (sentencias comparadas, lista de diferencias (línea, nmea.py, pynmea2)).
+    """
+    comparadas = 0
+    diferencias = []
+    for line in lineas:
+        texto = line.decode("utf-8").strip()
+        if texto[3:6] not in TIPOS:
+            continue
+        try:
+            esperado = campos_pynmea2(pynmea2.parse(texto))
+        except pynmea2.ParseError:
+            esperado = None
+        obtenido = nmea.parse_sentence(line)
+        comparadas += 1
+        if esperado is None or obtenido is None:
+            if esperado != obtenido:
+                diferencias.append((texto, obtenido, esperado))
+            continue
+        iguales = len(esperado) == len(obtenido) and all(
+            a == b if a is None or b is None or isinstance(a, (bool, bytes)) else abs(a - b) <= tolerancia
+            for a, b in zip(obtenido, esperado)
+        )
+        if not iguales:
+            diferencias.append((texto, obtenido, esperado))
+    return comparadas, diferencias
+
+
+def medir(nombre, fn, arg, total, repeticiones=5):
+    mejor = float("inf")
+    for _ in range(repeticiones):
+        t0 = time.perf_counter()
+        n = fn(arg)
+        mejor = min(mejor, time.perf_counter() - t0)
+    print(f"{nombre:<20} {n:>6} parseadas  {mejor * 1e6 / total:6.2f} µs/sentencia  {total / mejor:9.0f} sentencias/s")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        sentencias = load_sentences(sys.argv[1])
+    else:
+        sentencias = synthesize_route([(8.2959 + i * 9e-6, -62.7119) for i in range(5000)])
+        # Agregar las sentencias sin fix del log grabado para tener la mezcla real
+        sentencias += load_sentences(os.path.join(os.path.dirname(__file__), "..", "gps_stream.log"))
+    lineas = [s + b"\r\n" for s in sentencias]
+    buffer = b"".join(lineas)
+
+    # Hemisferios S/E, velocidad y rumbo distintos de cero para la comparación de campos
+    extra = [
+        s + b"\r\n"
+        for i in range(500)
+        for s in synthesize_epoch(-33.45 - i * 1e-4, 70.66 + i * 1e-4, 43200 + i, speed_kmh=i * 0.37, course=i * 0.7)
+    ]
+    comparadas, diferencias = comparar_campos(lineas + extra)
+    print(f"Campo por campo contra pynmea2: {comparadas} sentencias, {len(diferencias)} diferencias")
+    for texto, obtenido, esperado in diferencias[:5]:
+        print(f"  {texto}\n    nmea.py {obtenido}\n    pynmea2 {esperado}")
+    print()
+    medir("pynmea2", con_pynmea2, lineas, len(lineas))
+    medir("nmea.parse_sentence", con_nmea, lineas, len(lineas))
+    medir("nmea.parse_buffer", con_nmea_buffer, buffer, len(lineas))
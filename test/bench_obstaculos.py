@@ -0,0 +1,120 @@
+import glob
+import os
+import random
+import sys
+import time
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import cv2
+import numpy as np
+from obstaculos import DetectorObstaculos, estimar_distancia_caja
+from simulador import CamaraSimulada, MundoSimulado
+
+"""
+Mide frames/segundo de la detección de obstáculos sobre frames grabados.
+Uso: python test/bench_obstaculos.py [video.mp4 | carpeta_con_imagenes] [repeticiones]
+Sin argumentos usa 300 frames de la cámara simulada con obstáculos al azar.
+"""
+
+
+def detectar_original(frame, min_area=2000, aspect_ratio_range=(0.3, 3.0)):
+    """
+    Pipeline anterior: un array nuevo en cada paso, kernel reconstruido y dibujo siempre.
+    """
+    gray = cv2.cvtColor(frame, cv2.COLOR_RGB2GRAY)
+    blurred = cv2.GaussianBlur(gray, (7, 7), 0)
+    _, thresh = cv2.threshold(blurred, 60, 255, cv2.THRESH_BINARY_INV)
+    kernel = np.ones((5, 5), np.uint8)
+    opened = cv2.morphologyEx(thresh, cv2.MORPH_OPEN, kernel)
+    closed = cv2.morphologyEx(opened, cv2.MORPH_CLOSE, kernel)
+    contours, _ = cv2.findContours(closed, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    resultados = []
+    for cnt in contours:
+        if cv2.contourArea(cnt) > min_area:
+            x, y, w, h = cv2.boundingRect(cnt)
+            aspect_ratio = w / float(h) if h != 0 else 0
+            if aspect_ratio_range[0] <= aspect_ratio <= aspect_ratio_range[1]:
+                distancia = estimar_distancia_caja((x, y, w, h))
+                resultados.append(((x, y, w, h), distancia))
+                cv2.rectangle(frame, (x, y), (x + w, y + h), (0, 255, 0), 2)
+                if distancia is not None:
+                    cv2.putText(frame, f"{distancia:.1f}cm", (x, y - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
+    return frame, resultados
+
+
+def cargar_frames(ruta):
+    if os.path.isdir(ruta):
+        archivos = sorted(glob.glob(os.path.join(ruta, "*.png")) + glob.glob(os.path.join(ruta, "*.jpg")))
+        return [cv2.imread(a) for a in archivos]
+    cap = cv2.VideoCapture(ruta)
+    frames = []
+    while True:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        frames.append(frame)
+    cap.release()
+    return frames
+
+
+def frames_simulados(n=300, seed=0):
+    rng = random.Random(seed)
+    mundo = MundoSimulado(seed=seed)
+    camara = CamaraSimulada(mundo)
+    frames = []
+    for _ in range(n):
+        mundo.obstaculos = [
+            (rng.uniform(-1, 1), rng.uniform(0.3, 2.5), rng.uniform(0.1, 0.5), rng.uniform(0.1, 0.4))
+            for _ in range(rng.randint(0, 3))
+        ]
+        frame = camara.render().astype(np.int16)
+        frame += np.int16(rng.randint(-15, 15))
+        frames.append(np.clip(frame, 0, 255).astype(np.uint8))
+    return frames
+
+
+def medir(nombre, funcion, frames, repeticiones):
+    copias = [f.copy() for f in frames]
+    t0 = time.perf_counter()
+    for _ in range(repeticiones):
+        for frame in copias:
+            funcion(frame)
+    dt = time.perf_counter() - t0
+    n = len(frames) * repeticiones
+    print(f"{nombre:<34} {n / dt:8.0f} fps  {dt / n * 1000:6.3f} ms/frame")
+    return n / dt
+
+
+def main():
+    frames = cargar_frames(sys.argv[1]) if len(sys.argv) > 1 else frames_simulados()
+    repeticiones = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    frames = [f for f in frames if f is not None]
+    if not frames:
+        print("No hay frames.")
+        return
+    cv2.setNumThreads(1)  # Comparable con la Pi, donde los otros núcleos están ocupados
+    shape = frames[0].shape
+    print(f"{len(frames)} frames de {shape[1]}x{shape[0]}, {repeticiones} repeticiones\n")
+
+    base = medir("original (dibuja siempre)", detectar_original, frames, repeticiones)
+    variantes = [
+        ("detector, dibuja", DetectorObstaculos(shape), True),
+        ("detector, sin dibujo", DetectorObstaculos(shape), False),
+        ("detector, escala 0.5", DetectorObstaculos(shape, escala=0.5), False),
+        ("detector, mitad inferior", DetectorObstaculos(shape, roi_inferior=0.5), False),
+        ("detector, mitad inferior, esc 0.5", DetectorObstaculos(shape, roi_inferior=0.5, escala=0.5), False),
+    ]
+    for nombre, detector, dibujar in variantes:
+        fps = medir(nombre, lambda f, d=detector, dib=dibujar: d(f, dibujar=dib), frames, repeticiones)
+        print(f"{'':<34} {fps / base:8.2f}x")
+
+    # Las cajas a frame completo deben coincidir con el pipeline original
+    detector = DetectorObstaculos(shape)
+    distintos = sum(
+        sorted(detectar_original(f.copy())[1]) != sorted(detector.detectar(f)) for f in frames
+    )
+    print(f"\nFrames con cajas distintas al original: {distintos}/{len(frames)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+import os
+import sys
+import time
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import cv2
+import numpy as np
+from obstaculosORB import TrackerORB, detectar_obstaculos_orb, estimar_distancia_keypoints
+from simulador import CamaraSimulada, MundoSimulado
+
+"""
+Compara el costo por frame del ORB original (detector nuevo, detect + compute y dibujo en
+cada frame) contra el TrackerORB, y el TTC estimado contra el real, con el robot simulado
+avanzando hacia una caja texturizada.
+Uso: python test/bench_orb.py [velocidad_m_s] [distancia_inicial_m]
+"""
+
+FPS = 30.0
+
+
+def orb_original(frame, min_keypoints=10):
+    gray = cv2.cvtColor(frame, cv2.COLOR_RGB2GRAY)
+    orb = cv2.ORB_create(nfeatures=500)
+    kp = orb.detect(gray, None)
+    kp, des = orb.compute(gray, kp)
+    frame_kp = cv2.drawKeypoints(frame, kp, None, color=(0, 255, 0), flags=0)
+    distancia = estimar_distancia_keypoints(kp) if kp and len(kp) >= min_keypoints else None
+    return frame_kp, distancia, kp
+
+
+def grabar(velocidad, distancia):
+    """
+    Frames y timestamps virtuales del robot avanzando en línea recta hacia la caja.
+    Devuelve (frames, timestamps, distancias a la cara de la caja).
+    """
+    mundo = MundoSimulado(seed=0)
+    mundo.obstaculos = [(0.05, distancia, 0.6, 0.4), (-1.2, distancia + 1.5, 0.5, 0.5)]
+    camara = CamaraSimulada(mundo, textura=True)
+    frames, tiempos, distancias = [], [], []
+    t = 0.0
+    while distancia - mundo.y > 0.4:
+        frames.append(camara.render().copy())
+        tiempos.append(t)
+        distancias.append(distancia - mundo.y)
+        mundo.y += velocidad / FPS
+        t += 1.0 / FPS
+    return frames, tiempos, distancias
+
+
+def medir(nombre, funcion, frames):
+    t0 = time.perf_counter()
+    for i, frame in enumerate(frames):
+        funcion(i, frame)
+    dt = (time.perf_counter() - t0) / len(frames)
+    print(f"{nombre:<32} {dt * 1000:7.3f} ms/frame  {1 / dt:7.0f} fps")
+    return dt
+
+
+def comprobar_ttc_vencido(frames, tiempos, n_blancos=90):
+    """
+    Tras medir un TTC, una sucesión de frames en blanco (obstáculo perdido) debe dejar
+    el TTC en None y no repetir la última medición.
+    """
+    tracker = TrackerORB()
+    ttc = None
+    for frame, t in zip(frames, tiempos):
+        _, ttc = tracker.procesar(frame, t)
+    assert ttc is not None, "la secuencia no produjo ningún TTC"
+    blanco = np.zeros_like(frames[0])
+    t = tiempos[-1]
+    for _ in range(n_blancos):
+        t += 1.0 / FPS
+        _, ttc = tracker.procesar(blanco, t)
+    assert len(tracker.puntos) == 0, f"quedaron {len(tracker.puntos)} tracks en frames en blanco"
+    assert ttc is None and tracker.expansion is None, f"TTC viejo tras {n_blancos} frames en blanco: {ttc}"
+    print(f"TTC descartado tras {n_blancos} frames en blanco: ok")
+
+
+def main():
+    velocidad = float(sys.argv[1]) if len(sys.argv) > 1 else 0.3
+    distancia = float(sys.argv[2]) if len(sys.argv) > 2 else 2.5
+    cv2.setNumThreads(1)
+    frames, tiempos, distancias = grabar(velocidad, distancia)
+    print(f"{len(frames)} frames, avanzando a {velocidad} m/s desde {distancia} m\n")
+
+    base = medir("original", lambda i, f: orb_original(f.copy()), frames)
+    compartido = medir("ORB compartido, sin dibujo", lambda i, f: detectar_obstaculos_orb(f, dibujar=False), frames)
+    tracker = TrackerORB()
+    ttcs = []
+
+    def seguir(i, frame):
+        ttcs.append(tracker.procesar(frame, tiempos[i])[1])
+
+    seguido = medir("TrackerORB", seguir, frames)
+    print(f"\nspeedup compartido {base / compartido:.2f}x, tracker {base / seguido:.2f}x")
+    print(f"re-detecciones: {tracker.redetecciones} de {tracker.frames} frames")
+
+    print("\n  t(s)  dist(m)  TTC real  TTC estimado")
+    errores = []
+    for i in range(0, len(frames), max(1, len(frames) // 12)):
+        real = distancias[i] / velocidad
+        est = ttcs[i]
+        if est is not None and i > 5:
+            errores.append(abs(est - real) / real)
+        print(f"{tiempos[i]:6.2f} {distancias[i]:8.2f} {real:9.2f} {est if est is not None else float('nan'):13.2f}")
+    if errores:
+        print(f"\nerror relativo mediano del TTC: {np.median(errores) * 100:.1f}%")
+    print()
+    comprobar_ttc_vencido(frames, tiempos)
+
+
+if __name__ == "__main__":
+    main()
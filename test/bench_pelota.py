@@ -0,0 +1,115 @@
+import math
+import os
+import sys
+import time
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import cv2
+import numpy as np
+from pelota import TrackerPelota
+
+"""
+Compara la detección de la pelota del perrito_mode original (reescalar a 600 px, blur 11x11,
+HSV, inRange, erosión y todos los contornos) con TrackerPelota (tabla de color, ventana
+alrededor de la predicción de Kalman, frame completo a media resolución solo al perderla)
+sobre un video sintético de 320x240: la pelota azul recorre una curva, cambia de tamaño,
+desaparece detrás de un obstáculo y reaparece en otro lado. Reporta ms por frame, error de
+posición y radio, y frames hasta reencontrarla.
+Uso: python test/bench_pelota.py [frames]
+"""
+
+SIZE = (320, 240)
+FPS = 30.0
+AZUL = (200, 60, 20)  # BGR, como la pelota del simulador
+OCULTA = range(120, 135)  # Frames en los que la pelota no se ve
+
+
+def posicion(i):
+    """
+    (x, y, radio) verdaderos en el frame i, o None si está oculta.
+    """
+    if i in OCULTA:
+        return None
+    t = i / FPS
+    x = SIZE[0] / 2 + 110 * math.sin(0.9 * t)
+    if i >= OCULTA.stop:
+        x = SIZE[0] - x  # Reaparece del otro lado del frame
+    y = SIZE[1] / 2 + 50 * math.sin(1.7 * t)
+    r = 18 + 10 * math.sin(0.5 * t)
+    return x, y, r
+
+
+def video(frames, seed=0):
+    rng = np.random.default_rng(seed)
+    # Fondo texturizado poco saturado: gris con un tinte leve por canal
+    gris = rng.integers(50, 200, (SIZE[1] // 8, SIZE[0] // 8, 1))
+    tinte = rng.integers(-12, 12, (SIZE[1] // 8, SIZE[0] // 8, 3))
+    fondo = np.clip(gris + tinte, 0, 255).astype(np.uint8)
+    fondo = cv2.resize(fondo, SIZE, interpolation=cv2.INTER_LINEAR)
+    for i in range(frames):
+        frame = fondo.copy()
+        p = posicion(i)
+        if p is not None:
+            x, y, r = p
+            cv2.circle(frame, (int(round(x * 16)), int(round(y * 16))), int(round(r * 16)), AZUL, -1,
+                       cv2.LINE_AA, shift=4)
+        ruido = rng.normal(0, 6, frame.shape)
+        yield i, np.clip(frame + ruido, 0, 255).astype(np.uint8)
+
+
+def perrito_original(frame):
+    """
+    El pipeline de perrito_mode antes de TrackerPelota, en coordenadas del frame original.
+    """
+    factor = 600 / frame.shape[1]
+    grande = cv2.resize(frame, (600, int(frame.shape[0] * factor)), interpolation=cv2.INTER_AREA)
+    blurred = cv2.GaussianBlur(grande, (11, 11), 0)
+    hsv = cv2.cvtColor(blurred, cv2.COLOR_BGR2HSV)
+    mask = cv2.inRange(hsv, (90, 50, 70), (128, 255, 255))
+    mask = cv2.erode(mask, None, iterations=2)
+    contours, _ = cv2.findContours(mask.copy(), cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    if not contours:
+        return None
+    c = max(contours, key=cv2.contourArea)
+    (x, y), r = cv2.minEnclosingCircle(c)
+    return x / factor, y / factor, r / factor
+
+
+def correr(nombre, detectar, frames):
+    ms, err_pos, err_radio = [], [], []
+    perdidos_visibles = 0
+    reencontrada = None
+    for i, frame in frames:
+        t0 = time.perf_counter()
+        p = detectar(frame, i / FPS)
+        ms.append((time.perf_counter() - t0) * 1000)
+        verdad = posicion(i)
+        if verdad is None:
+            continue
+        if p is None:
+            perdidos_visibles += 1
+            continue
+        if reencontrada is None and i >= OCULTA.stop:
+            reencontrada = i - OCULTA.stop
+        err_pos.append(math.hypot(p[0] - verdad[0], p[1] - verdad[1]))
+        err_radio.append(abs(p[2] - verdad[2]))
+    ms.sort()
+    print(f"{nombre:<22} {np.mean(ms):6.2f} ms/frame (p95 {ms[int(len(ms) * 0.95)]:5.2f})  "
+          f"error posición {np.mean(err_pos):4.2f} px  radio {np.mean(err_radio):4.2f} px  "
+          f"{perdidos_visibles} frames sin pelota visible, reencontrada en {reencontrada} frames")
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    cv2.setNumThreads(1)
+    frames = list(video(n))
+    print(f"{n} frames {SIZE[0]}x{SIZE[1]}, pelota oculta en los frames {OCULTA.start}-{OCULTA.stop - 1}\n")
+    correr("original (600 px, HSV)", lambda f, t: perrito_original(f), frames)
+    for escala in (1.0, 0.5):
+        tracker = TrackerPelota((SIZE[1], SIZE[0]), escala=escala)
+        correr(f"tracker, completo x{escala}", tracker.procesar, frames)
+        print(f"{'':<22} {tracker.busquedas_completas} búsquedas en el frame completo de {tracker.frames}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,251 @@
+import math
+import os
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import cv2
+from movimiento import DIRECCIONES
+from pelota import ControladorSeguimiento, TrackerPelota
+from simulador import CamaraSimulada, MundoSimulado
+import perrito
+
+"""
+Compara el seguimiento por ráfagas del perrito_mode original (girar 0.25 s y/o avanzar
+0.75 s, parar 0.75 s y recién entonces decidir de nuevo) con ControladorSeguimiento (un
+comando de ruedas por frame) sobre el mundo simulado, en tiempo simulado: cámara sintética
+a 30 fps, TrackerPelota y la cinemática diferencial de MundoSimulado.
+Escenarios:
+  salto: la pelota, centrada y a la distancia deseada, salta 25° a la derecha; se mide la
+  reacción (salto -> primer comando que gira hacia ella), el tiempo hasta que queda
+  centrada para siempre (asentamiento) y cuánto se pasó el robot del otro lado.
+  paseo: la pelota recorre un círculo a velocidad constante; se mide el error de rumbo y de
+  distancia, los frames sin pelota y los cambios de comando en los motores.
+Las ráfagas giran hacia la pelota: el perrito_mode original giraba al lado contrario
+(pelota a la derecha -> "left"), con lo que en el simulador la pierde en el primer giro.
+Uso: python test/bench_perrito.py [segundos_paseo] [velocidad_pelota_m_s]
+"""
+
+FPS = 30.0
+LATENCIA = 0.010  # Captura -> comando en las ruedas (procesamiento del frame)
+RADIO_PELOTA = 0.05
+CENTRADO = 4.0  # Grados de error de rumbo para considerar la pelota centrada
+
+
+class Motores:
+    """
+    Las ruedas del planificador en tiempo simulado: un plan de tramos (izq, der, hasta) que
+    se reemplaza con cada comando, y se detiene al vencer el último tramo.
+    """
+
+    def __init__(self, mundo):
+        self.mundo = mundo
+        self.plan = []
+        self.escrituras = 0
+        self.ruedas = (0.0, 0.0)
+
+    def programar(self, pasos, t):
+        """
+        pasos: [(izq, der, duración)] desde el instante t.
+        """
+        self.plan = []
+        for izq, der, duracion in pasos:
+            t += duracion
+            self.plan.append((izq, der, t))
+
+    def terminado(self, t):
+        return not self.plan or t >= self.plan[-1][2]
+
+    def _aplicar(self, ruedas):
+        if ruedas != self.ruedas:
+            self.ruedas = ruedas
+            self.escrituras += 1
+            self.mundo.set_ruedas(*ruedas)
+
+    def avanzar(self, t0, t1):
+        t = t0
+        while t < t1:
+            tramo = next(((i, d, h) for i, d, h in self.plan if h > t), None)
+            if tramo is None:
+                self._aplicar((0.0, 0.0))
+                self.mundo.avanzar(t1 - t)
+                return
+            izq, der, hasta = tramo
+            self._aplicar((izq, der))
+            fin = min(hasta, t1)
+            self.mundo.avanzar(fin - t)
+            t = fin
+
+
+def a_600(pelota, ancho):
+    if pelota is None:
+        return None
+    factor = perrito.FRAME_WIDTH / ancho
+    return tuple(v * factor for v in pelota)
+
+
+class Rafagas:
+    """
+    La lógica de control de perrito_mode antes de ControladorSeguimiento.
+    """
+
+    def __init__(self):
+        self.nombre = "ráfagas"
+
+    def __call__(self, pelota, t, motores):
+        if not motores.terminado(t) or pelota is None:
+            return
+        x, _, radius = pelota
+        error_x = x - perrito.FRAME_WIDTH // 2
+        pasos = []
+        if abs(error_x) > 80:
+            pasos.append(("right" if error_x > 0 else "left", 1.0, 0.25))
+        if radius < perrito.TARGET_RADIUS_MIN - 7:
+            pasos.append(("forward", 1.0, 0.75))
+        elif radius > perrito.TARGET_RADIUS_MAX + 7:
+            pasos.append(("backward", 1.0, 0.75))
+        pasos.append(("stop", 0, 0.75))
+        plan = []
+        for direccion, speed, duracion in pasos:
+            izq, der = DIRECCIONES[direccion]
+            plan.append((izq * speed, der * speed, duracion))
+        motores.programar(plan, t)
+
+
+class Proporcional:
+    def __init__(self):
+        self.nombre = "proporcional"
+        self.controlador = ControladorSeguimiento(
+            perrito.FRAME_WIDTH,
+            perrito.TARGET_RADIUS_MIN,
+            perrito.TARGET_RADIUS_MAX,
+            zona_muerta=perrito.CENTER_X_TOLERANCE,
+            tiempo_perdida=perrito.HOMBRE_MUERTO,
+        )
+
+    def __call__(self, pelota, t, motores):
+        izq, der = self.controlador.actualizar(pelota, t)
+        motores.programar([(izq, der, perrito.HOMBRE_MUERTO)], t)
+
+
+def distancia_deseada(camara):
+    """
+    Distancias (mín, máx) a las que el radio de la pelota cae en la banda objetivo.
+    """
+    focal = camara.focal * perrito.FRAME_WIDTH / camara.size[0]
+    return focal * RADIO_PELOTA / perrito.TARGET_RADIUS_MAX, focal * RADIO_PELOTA / perrito.TARGET_RADIUS_MIN
+
+
+def error_pelota(mundo):
+    """
+    (error de rumbo en grados, distancia en metros) del robot a la pelota.
+    """
+    x, y, rumbo = mundo.pose()
+    bx, by, _ = mundo.pelota
+    rumbo_pelota = math.degrees(math.atan2(bx - x, by - y))
+    return (rumbo_pelota - rumbo + 180) % 360 - 180, math.hypot(bx - x, by - y)
+
+
+def simular(politica, segundos, mover_pelota, al_frame=None):
+    """
+    Corre la política en tiempo simulado. mover_pelota(t) -> (x, y) de la pelota.
+    al_frame(t, mundo, motores) se llama después de aplicar cada comando.
+    """
+    mundo = MundoSimulado()
+    camara = CamaraSimulada(mundo)
+    tracker = TrackerPelota((camara.size[1], camara.size[0]))
+    motores = Motores(mundo)
+    perdidos = 0
+    dt = 1.0 / FPS
+    t = 0.0
+    while t < segundos:
+        mundo.pelota = (*mover_pelota(t), RADIO_PELOTA)
+        frame = camara.render()
+        pelota = a_600(tracker.procesar(frame, t), camara.size[0])
+        perdidos += pelota is None
+        motores.avanzar(t, t + LATENCIA)
+        politica(pelota, t + LATENCIA, motores)
+        if al_frame is not None:
+            al_frame(t + LATENCIA, mundo, motores)
+        motores.avanzar(t + LATENCIA, t + dt)
+        t += dt
+    return mundo, camara, motores, perdidos
+
+
+def salto(crear, angulo=25.0):
+    mundo = MundoSimulado()
+    cerca, lejos = distancia_deseada(CamaraSimulada(mundo))
+    d = (cerca + lejos) / 2
+    t_salto = 2.0
+    delante = (0.0, d)
+    costado = (d * math.sin(math.radians(angulo)), d * math.cos(math.radians(angulo)))
+    resultado = {"reaccion": None, "asentada": None, "sobrepaso": 0.0}
+
+    def al_frame(t, mundo, motores):
+        if t < t_salto:
+            return
+        izq, der = motores.ruedas
+        if resultado["reaccion"] is None and izq > der:
+            resultado["reaccion"] = t - t_salto
+        error, _ = error_pelota(mundo)
+        if abs(error) >= CENTRADO:
+            resultado["asentada"] = None
+        elif resultado["asentada"] is None:
+            resultado["asentada"] = t - t_salto
+        resultado["sobrepaso"] = max(resultado["sobrepaso"], -error)
+
+    simular(crear(), t_salto + 4.0, lambda t: delante if t < t_salto else costado, al_frame)
+    return resultado
+
+
+def paseo(crear, segundos, velocidad):
+    radio = 0.6
+    w = velocidad / radio
+    # Círculo que arranca delante del robot, a la distancia deseada
+    cerca, lejos = distancia_deseada(CamaraSimulada(MundoSimulado()))
+    d = (cerca + lejos) / 2
+    centro = (-radio, d)
+    errores, fuera_de_banda = [], []
+
+    def mover(t):
+        return centro[0] + radio * math.cos(w * t), centro[1] + radio * math.sin(w * t)
+
+    def al_frame(t, mundo, motores):
+        if t < 1.0:
+            return
+        error, distancia = error_pelota(mundo)
+        errores.append(error)
+        fuera_de_banda.append(max(cerca - distancia, distancia - lejos, 0.0))
+
+    politica = crear()
+    _, _, motores, perdidos = simular(politica, segundos, mover, al_frame)
+    rms = lambda v: math.sqrt(sum(e * e for e in v) / len(v))
+    return {
+        "rumbo_rms": rms(errores),
+        "distancia_rms": rms(fuera_de_banda),
+        "perdidos": perdidos / (segundos * FPS),
+        "escrituras": motores.escrituras / segundos,
+    }
+
+
+def main():
+    segundos = float(sys.argv[1]) if len(sys.argv) > 1 else 20.0
+    velocidad = float(sys.argv[2]) if len(sys.argv) > 2 else 0.15
+    cv2.setNumThreads(1)
+    cerca, lejos = distancia_deseada(CamaraSimulada(MundoSimulado()))
+    print(f"Cámara simulada 320x240 a {FPS:.0f} fps, distancia deseada {cerca:.2f}-{lejos:.2f} m\n")
+    print(f"salto de 25° a la derecha (centrada = error < {CENTRADO:.0f}°)")
+    for crear in (Rafagas, Proporcional):
+        r = salto(crear)
+        fmt = lambda v: f"{v * 1000:6.0f} ms" if v is not None else "     nunca"
+        print(f"  {crear().nombre:<14} reacción {fmt(r['reaccion'])}  asentada en {fmt(r['asentada'])}  "
+              f"sobrepaso {r['sobrepaso']:5.1f}°")
+    print(f"\npaseo: círculo de 0.6 m a {velocidad:.2f} m/s durante {segundos:.0f} s")
+    for crear in (Rafagas, Proporcional):
+        r = paseo(crear, segundos, velocidad)
+        print(f"  {crear().nombre:<14} error de rumbo RMS {r['rumbo_rms']:5.1f}°  "
+              f"fuera de la banda de distancia RMS {r['distancia_rms'] * 100:5.1f} cm  "
+              f"sin pelota {r['perdidos'] * 100:4.1f}% de los frames  {r['escrituras']:5.1f} cambios de ruedas/s")
+
+
+if __name__ == "__main__":
+    main()
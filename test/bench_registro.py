@@ -0,0 +1,150 @@
+import io
+import logging
+import os
+import sys
+import tempfile
+import threading
+import time
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import registro
+
+"""
+Mide la frecuencia de un lazo de control que en cada vuelta reporta su estado como lo
+hacían Ferb.move y perrito_mode (tres print por comando más una línea con floats), con la
+salida en una consola serial de 115200 baudios (la escritura bloquea lo que tarda el
+puerto en sacar los bytes). Compara sin mensajes, con print, con logging estándar
+sincrónico y con registro.configurar (cola + hilo escritor + límite por mensaje + archivo
+JSON lines), con los mensajes del lazo en DEBUG desactivado y activado.
+Uso: python test/bench_registro.py [segundos] [trabajo_ms] [baudios]
+"""
+
+
+class ConsolaSerial(io.TextIOBase):
+    """
+    stdout sobre un puerto serial: write() bloquea 10 bits por byte a baudios.
+    """
+
+    def __init__(self, baudios):
+        self.segundos_por_byte = 10 / baudios
+        self.bytes = 0
+        self._lock = threading.Lock()  # Un solo puerto: las escrituras se serializan
+
+    def write(self, texto):
+        with self._lock:
+            datos = len(texto.encode())
+            self.bytes += datos
+            time.sleep(datos * self.segundos_por_byte)
+        return len(texto)
+
+    def flush(self):
+        pass
+
+
+def trabajo(segundos):
+    fin = time.perf_counter() + segundos
+    while time.perf_counter() < fin:
+        pass
+
+
+def lazo(reportar, segundos, trabajo_s):
+    """
+    Vueltas por segundo del lazo: trabajo_s de cómputo y un reporte por vuelta.
+    """
+    vueltas = 0
+    inicio = time.perf_counter()
+    fin = inicio + segundos
+    x, y, r = 312.4, 188.9, 74.2
+    while time.perf_counter() < fin:
+        trabajo(trabajo_s)
+        reportar("forward", 1.0, x, y, r)
+        vueltas += 1
+        x += 0.1
+    return vueltas / (time.perf_counter() - inicio)
+
+
+def con_print(consola):
+    def reportar(direccion, speed, x, y, r):
+        print("Current mode:", "dog", file=consola)
+        print("Direction:", direccion, file=consola)
+        print("Speed:", speed, file=consola)
+        print(f"CONTROL: Pelota en ({x:.0f}, {y:.0f}), radio {r:.0f}px.", file=consola)
+
+    return reportar
+
+
+def con_logger(logger):
+    def reportar(direccion, speed, x, y, r):
+        logger.debug("move %s speed=%s (modo %s)", direccion, speed, "dog")
+        logger.debug("CONTROL: Pelota en (%.0f, %.0f), radio %.0fpx.", x, y, r)
+
+    return reportar
+
+
+def comprobar_filtro(intervalo=10.0):
+    """
+    El filtro solo descarta repeticiones exactas (misma plantilla y mismos argumentos) de
+    DEBUG e INFO; nunca un WARNING o un error.
+    """
+    filtro = registro.FiltroFrecuencia(intervalo)
+
+    def pasa(nivel, mensaje, *args):
+        return filtro.filter(logging.LogRecord("ferb.banco", nivel, __file__, 0, mensaje, args, None))
+
+    assert pasa(logging.INFO, "Punto %d/%d alcanzado.", 1, 4)
+    assert pasa(logging.INFO, "Punto %d/%d alcanzado.", 2, 4), "mismo formato con otros argumentos"
+    assert not pasa(logging.INFO, "Punto %d/%d alcanzado.", 2, 4), "repetición exacta"
+    assert pasa(logging.INFO, "Pose %s", [1, 2]) and not pasa(logging.INFO, "Pose %s", [1, 2])
+    for nivel in (logging.WARNING, logging.ERROR, logging.CRITICAL):
+        assert pasa(nivel, "Error en %s", "gps") and pasa(nivel, "Error en %s", "gps")
+    print(f"filtro: repeticiones exactas de INFO suprimidas ({filtro.suprimidos}), WARNING y superiores siempre\n")
+
+
+def main():
+    segundos = float(sys.argv[1]) if len(sys.argv) > 1 else 3.0
+    trabajo_ms = float(sys.argv[2]) if len(sys.argv) > 2 else 2.0
+    baudios = int(sys.argv[3]) if len(sys.argv) > 3 else 115200
+    trabajo_s = trabajo_ms / 1000
+    comprobar_filtro()
+    print(f"Lazo con {trabajo_ms:.1f} ms de cómputo por vuelta, consola serial a {baudios} baudios\n")
+
+    def reporte(nombre, hz, consola=None, extra=""):
+        bytes_s = f"{consola.bytes / segundos:7.0f} B/s a la consola" if consola else ""
+        print(f"{nombre:<34} {hz:7.1f} vueltas/s  {bytes_s} {extra}")
+
+    reporte("sin mensajes", lazo(lambda *a: None, segundos, trabajo_s))
+
+    consola = ConsolaSerial(baudios)
+    reporte("print", lazo(con_print(consola), segundos, trabajo_s), consola)
+
+    consola = ConsolaSerial(baudios)
+    sincronico = logging.getLogger("banco.sincronico")
+    handler = logging.StreamHandler(consola)
+    handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+    sincronico.addHandler(handler)
+    sincronico.setLevel(logging.DEBUG)
+    sincronico.propagate = False
+    reporte("logging sincrónico, DEBUG", lazo(con_logger(sincronico), segundos, trabajo_s), consola)
+
+    with tempfile.TemporaryDirectory() as carpeta:
+        archivo = os.path.join(carpeta, "ferb.log.jsonl")
+        logger = logging.getLogger("ferb.banco")
+        for nivel in ("INFO", "DEBUG"):
+            consola = ConsolaSerial(baudios)
+            stderr, sys.stderr = sys.stderr, consola  # StreamHandler() toma sys.stderr al crearse
+            try:
+                instalado = registro.configurar(nivel, archivo)
+            finally:
+                sys.stderr = stderr
+            hz = lazo(con_logger(logger), segundos, trabajo_s)
+            stats = instalado.stats()
+            registro.close()
+            reporte(f"registro, {nivel}", hz, consola,
+                    f"({stats['suprimidos']} suprimidos, {stats['descartados_cola_llena']} perdidos)")
+        with open(archivo, encoding="utf-8") as f:
+            lineas = f.readlines()
+        print(f"\n{archivo.split(os.sep)[-1]}: {len(lineas)} líneas, p. ej. {lineas[-1].strip()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+import os
+import sys
+import threading
+import time
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from ferb import Ferb
+from hardware import HardwareSimulado
+from models import Coordenada
+from modo_obstaculos import modo_obstaculos
+from perrito import perrito_mode
+
+"""
+Corre los lazos de control de Ferb sobre el backend simulado, sin hardware:
+navigate sobre una ruta cuadrada y perrito_mode/modo_obstaculos durante unos segundos,
+reportando duración, jitter del lazo y fps de cada consumidor de frames.
+Uso: python test/bench_simulador.py [segundos_por_modo] [gps_hz]
+"""
+
+
+def correr_modo(robot, modo, funcion, segundos):
+    robot.current_mode = modo
+    hilo = threading.Thread(target=funcion, args=(robot,))
+    hilo.daemon = True
+    hilo.start()
+    time.sleep(segundos)
+    stats = robot.frame_stats()
+    robot.current_mode = "manual"
+    hilo.join(timeout=5)
+    robot.robot.stop()
+    print(f"\n{modo}: captura {stats.get('capture_fps', 0):.1f} fps")
+    for sub in stats.get("subscribers", []):
+        print(f"  {sub['name']}: {sub['fps']:.1f} fps, {sub['dropped']} frames descartados")
+
+
+def cambio_de_modo_cancela_cola(robot, ruta):
+    """
+    Dos rutas en cola y el usuario pasa a manual durante la primera: ninguna de las dos
+    debe volver a tomar el control ni a cambiar el modo.
+    """
+    trabajos = [robot.start_navigation(ruta), robot.start_navigation(ruta)]
+    while trabajos[0].estado != "en_curso":
+        time.sleep(0.05)
+    time.sleep(1.0)
+    robot.set_mode("manual")
+    for trabajo in trabajos:
+        while not trabajo.terminado_ok:
+            time.sleep(0.05)
+    time.sleep(0.5)
+    estados = [t.estado for t in trabajos]
+    assert estados == ["cancelado", "cancelado"], estados
+    assert robot.current_mode == "manual", robot.current_mode
+    print(f"cambio de modo durante la navegación: rutas {estados}, modo {robot.current_mode}")
+
+
+def camara_caida_termina_modo(robot, modo="dog"):
+    """
+    Si el hilo de captura muere, el comportamiento no debe quedarse girando sin frames:
+    termina con el error y el supervisor pasa a manual.
+    """
+    robot.set_mode(modo)
+    while robot.frame_bus is None or robot.frame_bus.frames_captured < 30:
+        time.sleep(0.05)
+
+    def fallar():
+        raise OSError("cámara desconectada")
+
+    robot.camera.capture_array = fallar
+    t0 = time.monotonic()
+    while robot.current_mode == modo and time.monotonic() - t0 < 3:
+        time.sleep(0.05)
+    assert robot.current_mode == "manual", robot.current_mode
+    error = robot.frame_stats()["error"]
+    print(f"\ncámara caída en {modo}: modo manual a los {(time.monotonic() - t0) * 1000:.0f} ms ({error})")
+    robot.stop_camera()
+
+
+def main():
+    segundos = float(sys.argv[1]) if len(sys.argv) > 1 else 5.0
+    gps_hz = float(sys.argv[2]) if len(sys.argv) > 2 else 5.0
+    hardware = HardwareSimulado(gps_rate_hz=gps_hz, seed=0)
+    robot = Ferb(hardware=hardware)
+    mundo = hardware.mundo
+    mundo.pelota = (0.4, 1.2, 0.05)
+    mundo.obstaculos = [(-0.6, 1.5, 0.4, 0.3)]
+
+    lado = 4.0
+    esquinas = [(0, lado), (lado, lado), (lado, 0), (0, 0)]
+    ruta = []
+    for x, y in esquinas:
+        lat, lon = mundo.proyeccion.to_latlon(x, y)
+        ruta.append(Coordenada(lat=float(lat), lng=float(lon)))
+    print(f"navigate: cuadrado de {lado} m, GPS a {gps_hz} Hz")
+    t0 = time.monotonic()
+    robot.navigate(ruta)
+    print(f"navigate: {time.monotonic() - t0:.1f} s, pose final {mundo.pose()}")
+    cambio_de_modo_cancela_cola(robot, ruta)
+
+    mundo.x, mundo.y, mundo.rumbo = 0.0, 0.0, 0.0
+    correr_modo(robot, "dog", perrito_mode, segundos)
+    mundo.x, mundo.y, mundo.rumbo = 0.0, 0.0, 0.0
+    correr_modo(robot, "obstaculos", modo_obstaculos, segundos)
+    camara_caida_termina_modo(robot)
+    robot.cleanup()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+import asyncio
+import os
+import sys
+import threading
+import time
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import httpx
+import uvicorn
+import main
+from async_feed import AsyncFeed
+from ferb import Ferb
+
+"""
+Prueba de carga de los streams SSE contra un robot simulado.
+Abre muchos clientes en /compass/stream y mide la latencia entre la lectura del sensor
+y la llegada del evento a cada cliente.
+Uso: python test/bench_sse.py [clientes] [segundos]
+"""
+
+PORT = 8765
+
+
+class SensorSimulado:
+    """
+    Brújula simulada: cada lectura devuelve un valor único para poder medir la latencia.
+    """
+
+    def __init__(self):
+        self.lecturas = 0
+        self.timestamps = {}
+
+    def get_bearing(self):
+        time.sleep(0.002)  # Simula la transacción I2C
+        self.lecturas += 1
+        valor = (self.lecturas % 36000) / 100
+        self.timestamps[f"{valor:.2f}"] = time.perf_counter()
+        return valor
+
+
+class BrujulaSimulada:
+    def __init__(self):
+        self.sensor = SensorSimulado()
+
+
+def robot_simulado():
+    robot = Ferb.__new__(Ferb)
+    robot.brujula = BrujulaSimulada()
+    robot._compass_feed = AsyncFeed(robot.brujula.sensor.get_bearing, period=0.05)
+    return robot
+
+
+async def cliente(http, latencias, stop):
+    async with http.stream("GET", f"http://127.0.0.1:{PORT}/compass/stream") as response:
+        async for line in response.aiter_lines():
+            if stop.is_set():
+                break
+            if not line.startswith("data: "):
+                continue
+            t = main.robot.brujula.sensor.timestamps.get(line[6:])
+            if t is not None:
+                latencias.append(time.perf_counter() - t)
+
+
+async def correr(clientes, duracion):
+    latencias = []
+    stop = asyncio.Event()
+    limits = httpx.Limits(max_connections=clientes + 10)
+    async with httpx.AsyncClient(limits=limits, timeout=None) as http:
+        tareas = [asyncio.create_task(cliente(http, latencias, stop)) for _ in range(clientes)]
+        await asyncio.sleep(duracion)
+        hilos = threading.active_count()
+        stop.set()
+        for t in tareas:
+            t.cancel()
+        await asyncio.gather(*tareas, return_exceptions=True)
+    return latencias, hilos
+
+
+if __name__ == "__main__":
+    clientes = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    duracion = float(sys.argv[2]) if len(sys.argv) > 2 else 5
+    main.robot = robot_simulado()
+    server = uvicorn.Server(uvicorn.Config(main.app, port=PORT, lifespan="off", log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    latencias, hilos = asyncio.run(correr(clientes, duracion))
+    server.should_exit = True
+    latencias.sort()
+    if not latencias:
+        print("No se recibieron eventos.")
+        sys.exit(1)
+    n = len(latencias)
+    print(f"clientes={clientes} eventos={n} ({n / duracion:.0f}/s) hilos={hilos}")
+    print(
+        f"latencia p50={latencias[n // 2] * 1000:.1f}ms p95={latencias[int(n * 0.95)] * 1000:.1f}ms "
+        f"max={latencias[-1] * 1000:.1f}ms"
+    )
+    print(f"lecturas del sensor: {main.robot.brujula.sensor.lecturas}")
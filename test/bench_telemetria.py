@@ -0,0 +1,127 @@
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import numpy as np
+from telemetria import GrabadorTelemetria, REGISTRO, leer_sesion
+
+"""
+Mide el costo de GrabadorTelemetria en los lazos de control: µs por registro (un hilo y
+varios hilos a la vez, como el planificador de motores, el muestreador de la brújula y el
+lector del GPS), la peor escritura (incluye abrir el segmento siguiente al rotar) y el
+ritmo de un lazo de 1 kHz que escribe las ruedas con y sin grabador. Como referencia, lo
+mismo escribiendo cada registro como una línea JSON en un archivo de texto (como
+log_gps_stream.py). Al final carga la sesión con leer_sesion y reporta el tiempo de carga.
+Uso: python test/bench_telemetria.py [registros] [hilos]
+"""
+
+
+def por_registro(escribir, n):
+    """
+    µs promedio por llamada y la peor llamada en µs.
+    """
+    peor = 0.0
+    t0 = time.perf_counter()
+    for i in range(n):
+        t = time.perf_counter()
+        escribir(0.5, -0.5)
+        peor = max(peor, time.perf_counter() - t)
+    return (time.perf_counter() - t0) / n * 1e6, peor * 1e6
+
+
+def en_hilos(escribir, n, hilos):
+    """
+    Registros por segundo con varios hilos escribiendo a la vez.
+    """
+    def correr():
+        for _ in range(n // hilos):
+            escribir(0.5, -0.5)
+
+    lista = [threading.Thread(target=correr) for _ in range(hilos)]
+    t0 = time.perf_counter()
+    for hilo in lista:
+        hilo.start()
+    for hilo in lista:
+        hilo.join()
+    return n / (time.perf_counter() - t0)
+
+
+def lazo_1khz(escribir, segundos=1.0):
+    """
+    Vueltas por segundo logradas y p99 del atraso respecto al periodo de 1 ms.
+    """
+    periodo = 0.001
+    atrasos = []
+    proxima = time.perf_counter()
+    fin = proxima + segundos
+    vueltas = 0
+    while proxima < fin:
+        ahora = time.perf_counter()
+        if ahora < proxima:
+            time.sleep(proxima - ahora)
+        atrasos.append(time.perf_counter() - proxima)
+        if escribir is not None:
+            escribir(0.5, -0.5)
+        vueltas += 1
+        proxima += periodo
+    atrasos.sort()
+    return vueltas / segundos, atrasos[int(len(atrasos) * 0.99)] * 1000
+
+
+class LineasJSON:
+    def __init__(self, ruta):
+        self.f = open(ruta, "a")
+
+    def __call__(self, izq, der):
+        self.f.write(json.dumps({"t": time.time(), "tipo": "motores", "izq": izq, "der": der}) + "\n")
+        self.f.flush()
+
+    def close(self):
+        self.f.close()
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    hilos = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+    with tempfile.TemporaryDirectory() as carpeta:
+        grabador = GrabadorTelemetria(carpeta, max_bytes=4_000_000, max_archivos=8)
+        texto = LineasJSON(os.path.join(carpeta, "motores.jsonl"))
+        print(f"{n} registros de {REGISTRO.size} bytes, segmentos de 4 MB\n")
+
+        for nombre, escribir in (("GrabadorTelemetria", grabador.motores), ("líneas JSON", texto)):
+            us, peor = por_registro(escribir, n)
+            rps = en_hilos(escribir, n, hilos)
+            print(f"{nombre:<20} {us:5.2f} µs/registro (peor {peor:7.1f} µs)  "
+                  f"{rps / 1000:6.0f} k registros/s con {hilos} hilos")
+        texto.close()
+
+        print()
+        for nombre, escribir in (("sin grabar", None), ("GrabadorTelemetria", grabador.motores)):
+            hz, atraso = lazo_1khz(escribir)
+            print(f"lazo de 1 kHz, {nombre:<20} {hz:6.0f} vueltas/s, atraso p99 {atraso:5.2f} ms")
+
+        stats = grabador.stats()
+        grabador.close()
+        bytes_disco = sum(
+            os.path.getsize(os.path.join(stats["sesion"], f)) for f in os.listdir(stats["sesion"])
+        )
+        t0 = time.perf_counter()
+        sesion = leer_sesion(stats["sesion"])
+        ms = (time.perf_counter() - t0) * 1000
+        motores = sesion["motores"]
+        print(f"\nSesión: {stats['registros']} registros en {stats['segmentos']} segmentos "
+              f"({bytes_disco / 1e6:.1f} MB en disco, se conservan los últimos 8)")
+        print(f"leer_sesion: {len(motores['t'])} registros de motores en {ms:.1f} ms, "
+              f"izq medio {np.mean(motores['izq']):.2f}, "
+              f"{np.mean(np.diff(motores['t'])) * 1e6:.2f} µs entre registros")
+        # Un día típico: GPS 5 Hz, brújula 10 Hz, motores ~20 Hz
+        por_dia = (5 + 10 + 20) * REGISTRO.size * 86400 / 1e6
+        print(f"GPS 5 Hz + brújula 10 Hz + motores 20 Hz: {por_dia:.0f} MB por día sin frames")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+import os
+import sys
+import threading
+import time
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from traza import Trazador
+
+"""
+Mide el costo de trazar un frame (cinco marcas, como los modos) y después corre los modos
+perrito, obstáculos y gestos (con el detector de manos falso de bench_gestos) sobre un Ferb
+simulado, sin carga y con hilos de Python que compiten por la CPU, e imprime la latencia
+por etapa que expone /metrics: entrega del frame, inferencia, decisión, motores y total
+desde la captura, más el despacho del planificador de movimiento.
+Uso: python test/bench_traza.py [segundos_por_modo] [hilos_de_carga]
+"""
+
+
+def costo_traza(frames=100000):
+    trazador = Trazador()
+    t0 = time.perf_counter()
+    for _ in range(frames):
+        traza = trazador.frame("banco", time.monotonic())
+        traza.marca("entrega")
+        traza.marca("inferencia")
+        traza.marca("decision")
+        traza.fin()
+    us = (time.perf_counter() - t0) / frames * 1e6
+    t0 = time.perf_counter()
+    trazador.metricas()
+    ms = (time.perf_counter() - t0) * 1000
+    print(f"Trazar un frame: {us:.2f} µs ({us / 33333 * 100:.3f}% de un frame a 30 fps); "
+          f"resumir /metrics: {ms:.2f} ms")
+
+
+def cargar(hilos, fin):
+    def quemar():
+        while not fin.is_set():
+            sum(i * i for i in range(10000))
+
+    for _ in range(hilos):
+        hilo = threading.Thread(target=quemar)
+        hilo.daemon = True
+        hilo.start()
+
+
+def imprimir(metricas):
+    for pipeline, etapas in metricas.items():
+        print(f"  {pipeline}")
+        for etapa, h in etapas.items():
+            print(f"    {etapa:<11} n {h['n']:5d}  p50 {h['p50']:7.2f}  p95 {h['p95']:7.2f}  "
+                  f"p99 {h['p99']:7.2f}  máx {h['max']:7.2f} ms")
+
+
+def correr(segundos, hilos):
+    from ferb import Ferb
+    from bench_gestos import ManosFalsas
+    import modo_gestos_control
+
+    robot = Ferb(backend="sim")
+    robot.hardware.mundo.pelota = (0.3, 0.6, 0.05)
+    robot.modos.comportamientos["gestos"] = lambda r, token: modo_gestos_control.modo_gestos_control(
+        r, hands_factory=lambda: ManosFalsas(30, time.monotonic()), token=token
+    )
+    fin = threading.Event()
+    cargar(hilos, fin)
+    try:
+        for modo in ("dog", "obstaculos", "gestos"):
+            robot.set_mode(modo)
+            time.sleep(segundos)
+        robot.set_mode("manual")
+        robot.modos.esperar(timeout=2)
+        metricas = robot.metrics()
+    finally:
+        fin.set()
+        robot.cleanup()
+    print(f"\nFerb simulado, {hilos} hilos de carga (ms)")
+    imprimir(metricas)
+
+
+def main():
+    segundos = float(sys.argv[1]) if len(sys.argv) > 1 else 3.0
+    hilos = int(sys.argv[2]) if len(sys.argv) > 2 else 2
+    costo_traza()
+    correr(segundos, 0)
+    if hilos:
+        correr(segundos, hilos)
+
+
+if __name__ == "__main__":
+    main()
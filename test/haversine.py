@@ -1,21 +1,17 @@
-import math
+import os
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-def haversine(lat1, lon1, lat2, lon2):
-    """
-    Calculate the great circle distance in kilometers between two points 
-    on the earth (specified in decimal degrees)
-    """
-    # convert decimal degrees to radians 
-    lon1, lat1, lon2, lat2 = map(math.radians, [lon1, lat1, lon2, lat2])
+import numpy as np
+import geodesia
 
-    # haversine formula 
-    dlon = lon2 - lon1 
-    dlat = lat2 - lat1 
-    a = math.sin(dlat/2)**2 + math.cos(lat1) * math.cos(lat2) * math.sin(dlon/2)**2
-    c = 2 * math.asin(math.sqrt(a)) 
-    r = 6371 * 1000 # Radius of earth in kilometers. Use 3956 for miles. Determines return value units.
-    return c * r
+# print(geodesia.haversine(8.2959462, -62.7119729, 8.295995, -62.712056))  # Should be 0
+print(geodesia.haversine(8.295925, -62.711975, 8.295995, -62.712056))  # Should be 0
 
-
-# print(haversine(8.2959462, -62.7119729, 8.295995, -62.712056))  # Should be 0
-print(haversine(8.295925, -62.711975, 8.295995, -62.712056))  # Should be 0
\ No newline at end of file
+# Ruta completa de una vez: longitud y rumbo de cada tramo
+lats = np.array([8.295925, 8.295995, 8.296100, 8.296150])
+lons = np.array([-62.711975, -62.712056, -62.712000, -62.711900])
+print(geodesia.haversine(lats[:-1], lons[:-1], lats[1:], lons[1:]))
+print(geodesia.bearing(lats[:-1], lons[:-1], lats[1:], lons[1:]))
+ruta = geodesia.Ruta(lats, lons)
+print(ruta.longitudes, ruta.rumbos, ruta.restante_desde)
@@ -1,6 +1,9 @@
+import os
+import sys
 import time
-import math
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 # from gps import GPS
+import geodesia
 import raspy_qmc5883l
 from gpiozero import Robot, Motor
 import serial
@@ -118,21 +121,6 @@ def get_current_position():
         time.sleep(0.2)
 
 
-def get_bearing_to_target(lat1, lon1, lat2, lon2):
-    # Fórmula de rumbo entre dos puntos
-    lat1 = math.radians(lat1)
-    lat2 = math.radians(lat2)
-    diffLong = math.radians(lon2 - lon1)
-    x = math.sin(diffLong) * math.cos(lat2)
-    y = math.cos(lat1) * math.sin(lat2) - (
-        math.sin(lat1) * math.cos(lat2) * math.cos(diffLong)
-    )
-    initial_bearing = math.atan2(x, y)
-    initial_bearing = math.degrees(initial_bearing)
-    compass_bearing = (initial_bearing + 360) % 360
-    return compass_bearing
-
-
 def get_current_heading():
     return sensor.get_bearing()
 
@@ -152,37 +140,6 @@ def turn_to_heading(target_heading, tolerance=5):
     robot.stop()
 
 
-def haversine(lat1, lon1, lat2, lon2):
-    """
-    Calculate the great circle distance in kilometers between two points 
-    on the earth (specified in decimal degrees)
-    """
-    # convert decimal degrees to radians 
-    lon1, lat1, lon2, lat2 = map(math.radians, [lon1, lat1, lon2, lat2])
-
-    # haversine formula 
-    dlon = lon2 - lon1 
-    dlat = lat2 - lat1 
-    a = math.sin(dlat/2)**2 + math.cos(lat1) * math.cos(lat2) * math.sin(dlon/2)**2
-    c = 2 * math.asin(math.sqrt(a)) 
-    r = 6371 * 1000 # Radius of earth in kilometers. Use 3956 for miles. Determines return value units.
-    return c * r
-
-
-# def haversine(lat1, lon1, lat2, lon2):
-#     # Calcula la distancia en metros entre dos coordenadas
-#     R = 6371000  # Radio de la Tierra en metros
-#     phi1 = math.radians(lat1)
-#     phi2 = math.radians(lat2)
-#     dphi = math.radians(lat2 - lat1)
-#     dlambda = math.radians(lon2 - lon1)
-#     a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(
-#         dlambda / 2
-#     ) ** 2
-#     c = 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
-#     return R * c
-
-
 def main():
     # Coordenadas objetivo (ejemplo)
     target_lat = float(input("Latitud objetivo: "))
@@ -191,14 +148,14 @@ def main():
     while True:
         print("Obteniendo posición actual...")
         lat, lon = get_current_position()
-        dist = haversine(lat, lon, target_lat, target_lon)
+        dist = geodesia.haversine(lat, lon, target_lat, target_lon)
         print(f"Posición actual: {lat}, {lon} (distancia al objetivo: {dist:.2f} m)")
         if dist < threshold:
             print("¡Objetivo alcanzado!")
             robot.stop()
             break
         print("Calculando rumbo...")
-        bearing = get_bearing_to_target(lat, lon, target_lat, target_lon)
+        bearing = geodesia.bearing(lat, lon, target_lat, target_lon)
         print(f"Rumbo objetivo: {bearing:.2f}°")
         print("Girando hacia el objetivo...")
         turn_to_heading(bearing)
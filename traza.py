@@ -0,0 +1,115 @@
+"""
+Trazas de latencia por etapa de los pipelines cámara -> percepción -> motores. Cada frame
+lleva una Traza que marca el fin de cada etapa (entrega, inferencia, decisión, motores...)
+midiendo desde la marca anterior, y la captura del frame es la marca inicial. Las
+duraciones se acumulan en un buffer circular por (pipeline, etapa) y se resumen en
+percentiles para el endpoint /metrics.
+"""
+
+import threading
+import time
+from collections import deque
+
+
+def percentil(valores, p, ordenados=False):
+    """
+    Percentil p (en [0, 1]) de valores, 0.0 si está vacío. Con ordenados=True no se
+    vuelven a ordenar (para sacar varios percentiles de la misma lista).
+    """
+    if not valores:
+        return 0.0
+    if not ordenados:
+        valores = sorted(valores)
+    return valores[min(len(valores) - 1, int(len(valores) * p))]
+
+
+class Histograma:
+    """
+    Últimas historial duraciones en ms de una etapa y la cantidad total registrada.
+    """
+
+    def __init__(self, historial=1000):
+        self.valores = deque(maxlen=historial)
+        self.n = 0
+
+    def agregar(self, ms):
+        self.valores.append(ms)
+        self.n += 1
+
+    def resumen(self):
+        ordenados = sorted(self.valores)
+        return {
+            "n": self.n,
+            "p50": percentil(ordenados, 0.5, ordenados=True),
+            "p95": percentil(ordenados, 0.95, ordenados=True),
+            "p99": percentil(ordenados, 0.99, ordenados=True),
+            "max": ordenados[-1] if ordenados else 0.0,
+        }
+
+
+class Traza:
+    """
+    Marcas de tiempo de un frame a lo largo de un pipeline. Se crea con Trazador.frame().
+    """
+
+    __slots__ = ("trazador", "pipeline", "inicio", "ultima")
+
+    def __init__(self, trazador, pipeline, ts_captura):
+        self.trazador = trazador
+        self.pipeline = pipeline
+        self.inicio = ts_captura
+        self.ultima = ts_captura
+
+    def marca(self, etapa):
+        """
+        Termina la etapa: registra el tiempo desde la marca anterior.
+        """
+        ahora = time.monotonic()
+        self.trazador.registrar(self.pipeline, etapa, (ahora - self.ultima) * 1000)
+        self.ultima = ahora
+
+    def fin(self, etapa="motores"):
+        """
+        Marca la última etapa (el comando llegó a los motores) y registra el total desde la
+        captura.
+        """
+        self.marca(etapa)
+        self.trazador.registrar(self.pipeline, "total", (self.ultima - self.inicio) * 1000)
+
+
+class Trazador:
+    """
+    Registro de histogramas por (pipeline, etapa). registrar() es seguro desde cualquier hilo.
+    """
+
+    def __init__(self, historial=1000):
+        self.historial = historial
+        self._histogramas = {}  # {pipeline: {etapa: Histograma}}, en orden de aparición
+        self._lock = threading.Lock()
+
+    def frame(self, pipeline, ts_captura=None):
+        """
+        Traza de un frame capturado en ts_captura (time.monotonic, como el bus de frames).
+        """
+        return Traza(self, pipeline, time.monotonic() if ts_captura is None else ts_captura)
+
+    def registrar(self, pipeline, etapa, ms):
+        etapas = self._histogramas.get(pipeline)
+        histograma = etapas.get(etapa) if etapas is not None else None
+        if histograma is None:
+            with self._lock:
+                etapas = self._histogramas.setdefault(pipeline, {})
+                histograma = etapas.setdefault(etapa, Histograma(self.historial))
+        histograma.agregar(ms)
+
+    def metricas(self):
+        """
+        {pipeline: {etapa: {"n", "p50", "p95", "p99", "max"}}} en ms.
+        """
+        with self._lock:
+            pipelines = {p: dict(etapas) for p, etapas in self._histogramas.items()}
+        return {p: {e: h.resumen() for e, h in etapas.items()} for p, etapas in pipelines.items()}
+
+    def reset(self):
+        with self._lock:
+            self._histogramas = {}